@@ -0,0 +1,4 @@
+"""
+Benchmark suite: synthetic datasets (see generators), the timed operations (see suite) and a runner that
+compares the timings and peak memory with a stored JSON baseline. Run it with `python -m benchmarks --help`.
+"""
@@ -0,0 +1,141 @@
+"""
+Synthetic datasets for the benchmarks. Every generator is deterministic for a given size and seed. Files are
+written chunk by chunk, so that even the largest sizes are generated in bounded memory.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Rows generated and written per chunk.
+CHUNK_ROWS = 100_000
+# First timestamp of the generated series (2024-01-01T00:00:00Z, in epoch milliseconds).
+START_MS = 1_704_067_200_000
+# Values of the categorical columns: a typical handful of endpoints or hosts.
+CATEGORIES = [f"endpoint-{i}" for i in range(10)]
+
+
+def _chunks(n_rows):
+    for start in range(0, n_rows, CHUNK_ROWS):
+        yield start, min(CHUNK_ROWS, n_rows - start)
+
+
+def _series_chunk(rng, start, n):
+    """Columns of a long time series: one sample per second, a random walk, latencies and an endpoint."""
+    return pd.DataFrame({
+        "timestamp": START_MS + (start + np.arange(n, dtype=np.int64)) * 1000,
+        "value": np.cumsum(rng.normal(0, 1, n)).round(4),
+        "latency": rng.lognormal(3, 0.5, n).round(3),
+        "cat": np.asarray(CATEGORIES)[rng.integers(0, len(CATEGORIES), n)],
+    })
+
+
+def _wide_chunk(rng, start, n, n_cols):
+    """Columns of a wide table: an id and a timestamp, then float, integer and string columns in turn."""
+    columns = {"id": start + np.arange(n), "timestamp": START_MS + (start + np.arange(n, dtype=np.int64)) * 1000}
+    for i in range(n_cols - 2):
+        kind = i % 3
+        if kind == 0:
+            columns[f"f{i}"] = rng.normal(100, 25, n).round(4)
+        elif kind == 1:
+            columns[f"i{i}"] = rng.integers(0, 1_000_000, n)
+        else:
+            columns[f"s{i}"] = np.asarray(CATEGORIES)[rng.integers(0, len(CATEGORIES), n)]
+    return pd.DataFrame(columns)
+
+
+def _nested(rng, depth):
+    """A nested object `depth` levels deep, each level with two scalar values and the next level."""
+    level = {"value": round(float(rng.normal()), 4), "flag": bool(rng.integers(0, 2))}
+    for i in range(depth - 1):
+        level = {"name": f"level-{depth - 1 - i}", "count": int(rng.integers(0, 100)), "next": level}
+    return level
+
+
+def _records(rng, start, n, depth):
+    """Table rows with an id, a timestamp, a value and a nested "meta" object `depth` levels deep."""
+    values = np.cumsum(rng.normal(0, 1, n)).round(4)
+    return [{"id": start + i, "timestamp": START_MS + (start + i) * 1000, "value": float(values[i]),
+             "meta": _nested(rng, depth)} for i in range(n)]
+
+
+def write_csv(path, chunk, n_rows, seed=0):
+    """Write `n_rows` rows made by `chunk(rng, start, n)` to the CSV file `path`."""
+    rng = np.random.default_rng(seed)
+    with open(path, "w", encoding="utf-8", newline="") as sink:
+        for start, n in _chunks(n_rows):
+            chunk(rng, start, n).to_csv(sink, index=False, header=start == 0)
+
+
+def time_series_csv(path, n_rows, seed=0):
+    """A long time series: timestamp (epoch ms), value, latency and cat columns."""
+    write_csv(path, _series_chunk, n_rows, seed)
+
+
+def wide_csv(path, n_rows, n_cols=50, seed=0):
+    """A wide table of `n_cols` columns: id, timestamp, and float, integer and string columns in turn."""
+    write_csv(path, lambda rng, start, n: _wide_chunk(rng, start, n, n_cols), n_rows, seed)
+
+
+def nested_json(path, n_rows, depth=6, seed=0):
+    """A JSON document with one "records" table whose rows hold a "meta" object nested `depth` levels deep."""
+    write_json(path, {"records": n_rows}, depth, seed)
+
+
+def tables_json(path, n_rows, n_tables=20, seed=0):
+    """A large JSON dump of `n_tables` tables sharing `n_rows` rows, each row with a two-level "meta" object."""
+    sizes = np.diff(np.linspace(0, n_rows, n_tables + 1).astype(np.int64))
+    write_json(path, {f"table_{i:02d}": int(size) for i, size in enumerate(sizes)}, 2, seed)
+
+
+def write_json(path, tables, depth, seed=0):
+    """Write a JSON object with one table of generated rows (see _records) per {name: row count} of `tables`."""
+    rng = np.random.default_rng(seed)
+    with open(path, "w", encoding="utf-8") as sink:
+        sink.write("{")
+        for t, (name, n_rows) in enumerate(tables.items()):
+            sink.write(f'{"," if t else ""}{json.dumps(name)}: [')
+            for start, n in _chunks(n_rows):
+                text = json.dumps(_records(rng, start, n, depth))[1:-1]
+                sink.write(("," if start else "") + text)
+            sink.write("]")
+        sink.write("}")
+
+
+def series_frame(n_rows, seed=0):
+    """A long time series as loaded by the pages: datetime timestamps, value, latency and a categorical cat."""
+    rng = np.random.default_rng(seed)
+    df = pd.concat([_series_chunk(rng, start, n) for start, n in _chunks(n_rows)], ignore_index=True)
+    df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
+    df["cat"] = df["cat"].astype("category")
+    return df
+
+
+def nested_frame(n_rows, depth=6, as_text=False, seed=0):
+    """
+    A frame with a "meta" column of objects nested `depth` levels deep: dicts, as in loaded JSON tables, or
+    JSON text with `as_text`, as in CSV files.
+    """
+    rng = np.random.default_rng(seed)
+    records = [row for start, n in _chunks(n_rows) for row in _records(rng, start, n, depth)]
+    df = pd.DataFrame(records)
+    if as_text:
+        df["meta"] = [json.dumps(meta) for meta in df["meta"]]
+    return df
+
+
+def dataset(data_dir, writer, n_rows, **kwargs):
+    """
+    Return the path of the file `writer(path, n_rows, **kwargs)` writes into `data_dir`, writing it only if an
+    earlier run has not already done so.
+    """
+    suffix = ".csv" if writer in (time_series_csv, wide_csv) else ".json"
+    params = "".join(f"-{name}{value}" for name, value in sorted(kwargs.items()))
+    path = os.path.join(data_dir, f"{writer.__name__}-{n_rows}{params}{suffix}")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        partial = path + ".partial"
+        writer(partial, n_rows, **kwargs)
+        os.replace(partial, path)
+    return path
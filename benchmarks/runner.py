@@ -0,0 +1,226 @@
+"""
+Run the benchmarks, compare them with a JSON baseline and save new baselines.
+
+Each benchmark is run once untimed (imports and first-use setup), then `repeat` times; the fastest run is the
+benchmark's time, as it is the least disturbed by the rest of the machine. Peak memory is measured in one more
+run, since tracing allocations slows the code down: it is the peak of the allocations traced by tracemalloc
+(Python objects and NumPy arrays) plus the peak growth of pyarrow's memory pool, sampled every millisecond.
+"""
+import argparse
+import datetime
+import fnmatch
+import gc
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import suite
+from visualizer.utils import disk_cache
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# Baselines of each tier, committed with the code they measure.
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+# Generated datasets are kept between runs; the largest take minutes to write.
+DATA_DIR = os.environ.get("VISUALIZER_BENCH_DATA_DIR", os.path.join(disk_cache.CACHE_DIR, "bench"))
+# A benchmark regresses when it is slower than its baseline by more than this fraction ...
+TIME_TOLERANCE = 0.25
+# ... plus this many seconds, which keeps timer noise on sub-millisecond runs from failing the suite.
+TIME_SLACK_SECONDS = 0.005
+# Same for its peak memory.
+MEMORY_TOLERANCE = 0.10
+MEMORY_SLACK_BYTES = 1024 * 1024
+# Timed runs per benchmark.
+REPEAT = 5
+# How often the pyarrow memory pool is sampled while measuring peak memory.
+ARROW_SAMPLE_SECONDS = 0.001
+
+
+def environment():
+    """Describe the machine and library versions, which baselines are only comparable within."""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "pyarrow": pa.__version__ if pa is not None else None,
+    }
+
+
+def time_run(run, repeat):
+    """Return the fastest and the median wall time of `repeat` runs of `run()`, in seconds."""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - started)
+    return min(times), float(np.median(times))
+
+
+def peak_memory(run):
+    """Return the peak memory allocated while running `run()`, in bytes (see the module docstring)."""
+    gc.collect()
+    arrow_start = arrow_peak = pa.total_allocated_bytes() if pa is not None else 0
+    done = threading.Event()
+
+    def sample():
+        nonlocal arrow_peak
+        while not done.wait(ARROW_SAMPLE_SECONDS):
+            arrow_peak = max(arrow_peak, pa.total_allocated_bytes())
+
+    sampler = threading.Thread(target=sample, daemon=True) if pa is not None else None
+    tracemalloc.start()
+    if sampler is not None:
+        sampler.start()
+    try:
+        run()
+        _, traced_peak = tracemalloc.get_traced_memory()
+    finally:
+        done.set()
+        tracemalloc.stop()
+        if sampler is not None:
+            sampler.join()
+    if pa is not None:
+        arrow_peak = max(arrow_peak, pa.total_allocated_bytes())
+    return traced_peak + arrow_peak - arrow_start
+
+
+def run_benchmark(name, n_rows, repeat=REPEAT, data_dir=DATA_DIR, memory=True):
+    """
+    Run benchmark `name` at `n_rows` rows. Returns {"seconds", "median_seconds", "peak_bytes"} (without the
+    peak unless `memory`), or {"skipped": reason} for sizes above the benchmark's limit.
+    """
+    setup, max_rows = suite.BENCHMARKS[name]
+    if max_rows is not None and n_rows > max_rows:
+        return {"skipped": f"above {max_rows:,} rows"}
+    suite.isolate_caches()
+    run = setup(n_rows, data_dir)
+    run()
+    seconds, median = time_run(run, repeat)
+    result = {"seconds": round(seconds, 6), "median_seconds": round(median, 6)}
+    if memory:
+        result["peak_bytes"] = peak_memory(run)
+    return result
+
+
+def run_suite(sizes, patterns=("*",), repeat=REPEAT, data_dir=DATA_DIR, on_result=None):
+    """
+    Run the benchmarks whose names match any of `patterns` at each row count of `sizes` (see run_benchmark).
+    Returns the results by "<benchmark>/<rows>"; `on_result(key, result)` is called as each one finishes.
+    """
+    results = {}
+    for name in suite.BENCHMARKS:
+        if not any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns):
+            continue
+        for n_rows in sizes:
+            key = f"{name}/{n_rows}"
+            results[key] = run_benchmark(name, n_rows, repeat, data_dir)
+            if on_result is not None:
+                on_result(key, results[key])
+    return results
+
+
+def confirm(results, regressions, repeat, data_dir=DATA_DIR):
+    """
+    Time the benchmarks with a time regression again, with twice the runs, and keep the faster of the two
+    measurements in `results`: a slowdown caused by the rest of the machine rarely lasts through both.
+    """
+    for key in sorted({key for key, metric, _, _ in regressions if metric == "seconds"}):
+        name, n_rows = key.rsplit("/", 1)
+        again = run_benchmark(name, int(n_rows), repeat * 2, data_dir, memory=False)
+        if again["seconds"] < results[key]["seconds"]:
+            results[key] = {**results[key], **again}
+
+
+def compare(results, baseline, time_tolerance=TIME_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE):
+    """
+    Compare `results` with the results of a `baseline`. Returns a list of regressions, one
+    (key, metric, baseline value, current value) per benchmark and metric beyond its tolerance.
+    """
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None or "skipped" in result or "skipped" in base:
+            continue
+        if result["seconds"] > base["seconds"] * (1 + time_tolerance) + TIME_SLACK_SECONDS:
+            regressions.append((key, "seconds", base["seconds"], result["seconds"]))
+        if result["peak_bytes"] > base["peak_bytes"] * (1 + memory_tolerance) + MEMORY_SLACK_BYTES:
+            regressions.append((key, "peak_bytes", base["peak_bytes"], result["peak_bytes"]))
+    return regressions
+
+
+def _format(result):
+    if "skipped" in result:
+        return f"skipped ({result['skipped']})"
+    return f"{result['seconds'] * 1000:10.1f} ms {result['peak_bytes'] / 1024 ** 2:10.1f} MB"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Time and memory-profile the parsers, flattening, statistics and chart builders on synthetic "
+                    "datasets, and fail on regressions against a baseline.")
+    parser.add_argument("--tier", choices=sorted(suite.TIERS), default="quick",
+                        help="row counts to run: quick (10^3-10^5) or full (10^3-10^7) (default: %(default)s)")
+    parser.add_argument("--sizes", help="comma-separated row counts instead of the tier's, e.g. 1e3,1e6")
+    parser.add_argument("-k", dest="patterns", action="append",
+                        help="only run benchmarks matching this glob pattern, e.g. 'auto_read_csv*' (repeatable; match "
+                             "the brackets in names with ?, as in 'build_plotly_chart?Pie*')")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="timed runs per benchmark (default: %(default)s)")
+    parser.add_argument("--baseline", help="baseline to compare with (default: baselines/<tier>.json, if present)")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a baseline to PATH")
+    parser.add_argument("--tolerance", type=float, default=TIME_TOLERANCE,
+                        help="allowed slowdown as a fraction of the baseline (default: %(default)s)")
+    parser.add_argument("--memory-tolerance", type=float, default=MEMORY_TOLERANCE,
+                        help="allowed growth of peak memory as a fraction of the baseline (default: %(default)s)")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="where generated datasets are kept (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(float(size)) for size in args.sizes.split(",")] if args.sizes else suite.TIERS[args.tier]
+    baseline_path = args.baseline or os.path.join(BASELINE_DIR, f"{args.tier}.json")
+    baseline = None
+    if args.baseline or os.path.exists(baseline_path):
+        with open(baseline_path, encoding="utf-8") as source:
+            baseline = json.load(source)
+        if baseline["environment"] != environment():
+            print(f"Note: {baseline_path} was recorded on a different machine or library versions; timings may "
+                  "not be comparable.", file=sys.stderr)
+
+    def on_result(key, result):
+        base = (baseline or {}).get("results", {}).get(key)
+        change = ""
+        if base and "skipped" not in base and "skipped" not in result:
+            change = (f" {result['seconds'] / base['seconds'] - 1:+7.0%} time "
+                      f"{result['peak_bytes'] / max(base['peak_bytes'], 1) - 1:+7.0%} memory")
+        print(f"{key:60} {_format(result)}{change}", flush=True)
+
+    results = run_suite(sizes, args.patterns or ("*",), args.repeat, args.data_dir, on_result)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as sink:
+            json.dump({"environment": environment(), "created": datetime.date.today().isoformat(),
+                       "repeat": args.repeat, "results": results}, sink, indent=2)
+            sink.write("\n")
+        print(f"Saved {len(results)} results to {args.save}")
+    if baseline is None:
+        return 0
+    regressions = compare(results, baseline["results"], args.tolerance, args.memory_tolerance)
+    if regressions:
+        confirm(results, regressions, args.repeat, args.data_dir)
+        regressions = compare(results, baseline["results"], args.tolerance, args.memory_tolerance)
+    for key, metric, base, current in regressions:
+        print(f"REGRESSION {key}: {metric} {base:,} -> {current:,} ({current / max(base, 1e-12) - 1:+.0%})")
+    print(f"{len(regressions)} regressions against {baseline_path}")
+    return 1 if regressions else 0
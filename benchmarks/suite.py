@@ -0,0 +1,151 @@
+"""
+The benchmarked operations. Each benchmark prepares its input for a row count outside the measurement and
+returns the operation to time. The loaders run cold: the dataset cache is emptied before every run, and the
+on-disk parse cache and spilling are disabled, so that every run parses the file again.
+"""
+from benchmarks import generators
+from visualizer.utils import (
+    chart_utils,
+    csv_parser,
+    disk_cache,
+    downsample,
+    json_parser,
+    stats_utils,
+)
+from visualizer.utils.data_utils import comparison_chart_frame, flatten_json_column
+from visualizer.utils.dataset_cache import dataset_cache
+
+# Row counts of each tier.
+TIERS = {
+    "quick": [10 ** 3, 10 ** 4, 10 ** 5],
+    "full": [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7],
+}
+
+# Chart types of the pages, with the options the pages select by default and the axes charted.
+CHART_OPTIONS = {
+    "Line Chart": {"show_markers": True, "smooth_lines": False, "fill_area": False},
+    "Bar Chart": {"barmode": "group", "aggregate": True},
+    "Scatter Chart": {"show_markers": True, "opacity": 0.8},
+    "Area Chart": {"smooth_lines": False},
+    "Box Plot": {"notched": False, "points": "outliers", "aggregate": True},
+    "Histogram": {"histnorm": "count", "aggregate": True},
+    "Violin Plot": {"box": True, "points": "outliers", "meanline": False, "aggregate": True},
+    "Pie Chart": {"donut": 0.0, "aggregate": True},
+}
+CHART_AXES = {"Line Chart": ("timestamp", "value"), "Scatter Chart": ("timestamp", "value"),
+              "Area Chart": ("timestamp", "value"), "Histogram": ("latency", "value")}
+for _chart_type, _options in CHART_OPTIONS.items():
+    if _chart_type in chart_utils.DOWNSAMPLED_CHART_TYPES:
+        _options.update(downsample="lttb", max_points=downsample.DEFAULT_MAX_POINTS)
+
+# Benchmarks by name: (setup(n_rows, data_dir) -> operation, largest row count or None).
+BENCHMARKS = {}
+
+
+def benchmark(name, max_rows=None):
+    """
+    Register `setup` as benchmark `name`. Sizes above `max_rows` are skipped: their inputs do not fit in the
+    memory of a typical machine (a JSON document is parsed into Python objects of about ten times its size).
+    """
+    def register(setup):
+        BENCHMARKS[name] = (setup, max_rows)
+        return setup
+    return register
+
+
+def isolate_caches():
+    """Disable the on-disk parse cache and the dataset cache's spilling, so that loads are measured cold."""
+    disk_cache.frame_cache.max_bytes = 0
+    dataset_cache.spill_max_bytes = 0
+
+
+class BytesUpload:
+    """An in-memory upload without a file id, so that its content digest is computed on every load."""
+
+    def __init__(self, name, data):
+        self.name = name
+        self.size = len(data)
+        self._data = data
+
+    def getbuffer(self):
+        return memoryview(self._data)
+
+
+def _upload(path):
+    with open(path, "rb") as source:
+        return BytesUpload(path.rsplit("/", 1)[-1], source.read())
+
+
+def _cold(load, upload):
+    def run():
+        dataset_cache.clear()
+        return load(upload)
+    return run
+
+
+@benchmark("auto_read_csv[wide]", max_rows=10 ** 6)
+def _read_wide_csv(n_rows, data_dir):
+    return _cold(csv_parser.auto_read_csv, _upload(generators.dataset(data_dir, generators.wide_csv, n_rows)))
+
+
+@benchmark("auto_read_csv[series]")
+def _read_series_csv(n_rows, data_dir):
+    return _cold(csv_parser.auto_read_csv, _upload(generators.dataset(data_dir, generators.time_series_csv, n_rows)))
+
+
+def _load_json_tables(upload):
+    return json_parser.extract_json_tables(json_parser.load_json_data(upload))
+
+
+@benchmark("load_json_data+extract_json_tables[nested]", max_rows=10 ** 6)
+def _load_nested_json(n_rows, data_dir):
+    return _cold(_load_json_tables, _upload(generators.dataset(data_dir, generators.nested_json, n_rows)))
+
+
+@benchmark("load_json_data+extract_json_tables[tables]", max_rows=10 ** 6)
+def _load_tables_json(n_rows, data_dir):
+    return _cold(_load_json_tables, _upload(generators.dataset(data_dir, generators.tables_json, n_rows)))
+
+
+@benchmark("flatten_json_column[dicts]", max_rows=10 ** 6)
+def _flatten_dicts(n_rows, data_dir):
+    df = generators.nested_frame(n_rows)
+    return lambda: flatten_json_column(df, "meta")
+
+
+@benchmark("flatten_json_column[text]", max_rows=10 ** 6)
+def _flatten_text(n_rows, data_dir):
+    df = generators.nested_frame(n_rows, as_text=True)
+    return lambda: flatten_json_column(df, "meta")
+
+
+@benchmark("comparison_stats")
+def _comparison_stats(n_rows, data_dir):
+    df1, df2 = generators.series_frame(n_rows, seed=0), generators.series_frame(n_rows, seed=1)
+    columns = stats_utils.common_numeric_columns(df1, df2)
+    return lambda: stats_utils.comparison_stats(df1, df2, columns)
+
+
+def _chart_benchmark(chart_type):
+    x_col, y_col = CHART_AXES.get(chart_type, ("cat", "value"))
+
+    @benchmark(f"build_plotly_chart[{chart_type}]")
+    def _single(n_rows, data_dir):
+        df = generators.series_frame(n_rows)[[x_col, y_col]]
+        return lambda: chart_utils.build_plotly_chart(df, x_col, y_col, chart_type, dict(CHART_OPTIONS[chart_type]))
+
+    if chart_type == "Pie Chart":
+        # The comparison pages draw one pie per file with build_plotly_chart.
+        return
+
+    @benchmark(f"build_comparison_chart[{chart_type}]")
+    def _comparison(n_rows, data_dir):
+        # Two files of half the rows each, combined as the comparison pages combine them.
+        dfs = [generators.series_frame(n_rows // 2, seed=seed) for seed in (0, 1)]
+        df, _, _ = comparison_chart_frame(dfs, x_col, y_col, ["a", "b"])
+        return lambda: chart_utils.build_comparison_chart(df, x_col, y_col, chart_type,
+                                                          dict(CHART_OPTIONS[chart_type]))
+
+
+for _chart_type in CHART_OPTIONS:
+    _chart_benchmark(_chart_type)
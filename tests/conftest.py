@@ -0,0 +1,16 @@
+import pytest
+
+from visualizer.utils import dataset_cache, disk_cache
+
+
+@pytest.fixture(autouse=True)
+def isolated_frame_cache(tmp_path, monkeypatch):
+    """Keep the on-disk frame cache inside the test's temporary directory."""
+    monkeypatch.setattr(disk_cache.frame_cache, "directory", str(tmp_path / "frame-cache"))
+
+
+@pytest.fixture(autouse=True)
+def isolated_dataset_cache(tmp_path, monkeypatch):
+    """Start every test with an empty dataset cache that spills inside the test's temporary directory."""
+    monkeypatch.setattr(dataset_cache.dataset_cache, "spill_dir", str(tmp_path / "spill"))
+    dataset_cache.dataset_cache.clear()
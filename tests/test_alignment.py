@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from visualizer.utils import alignment, compact
+
+
+def test_key_positions_pair_duplicate_keys_by_occurrence():
+    df1 = pd.DataFrame({"k": ["a", "b", "a", "c"], "v": [1, 2, 3, 4]})
+    df2 = pd.DataFrame({"k": ["a", "a", "b", "d"], "v": [10, 30, 20, 40]})
+    pos1, pos2 = alignment.align_positions(df1, df2, "Key columns", keys=("k",))
+
+    assert pos1.tolist() == [0, 1, 2]
+    assert pos2.tolist() == [0, 2, 1]
+
+
+def test_asof_positions_respect_tolerance():
+    df1 = pd.DataFrame({"timestamp": [0, 100, 200, 300], "v": [1.0, 2.0, 3.0, 4.0]})
+    df2 = pd.DataFrame({"timestamp": [298, 2, 104, 500], "v": [4.5, 1.5, 2.5, 9.0]})
+    positions = alignment.align_positions(df1, df2, "As-of (timestamp)", on="timestamp", tolerance="5")
+
+    assert positions[0].tolist() == [0, 1, 3]
+    assert positions[1].tolist() == [1, 2, 0]
+    diff_df, diff_col = alignment.difference_frame(df1, df2, positions, "timestamp", "v")
+    assert np.allclose(diff_df[diff_col], [0.5, 0.5, 0.5])
+
+
+def test_alignment_of_files_compacted_to_different_dtypes():
+    df1, _ = compact.compact_frame(pd.DataFrame({"t": [0, 50, 100], "v": [1.0, 2.0, 3.0]}))
+    df2, _ = compact.compact_frame(pd.DataFrame({"t": [1, 99, 400], "v": [1.5, 2.5, 0.5]}))
+    assert (df1["t"].dtype, df2["t"].dtype) == (np.int8, np.int16)
+    pos1, pos2 = alignment.align_positions(df1, df2, "As-of (timestamp)", on="t", tolerance="2")
+    assert (pos1.tolist(), pos2.tolist()) == ([0, 2], [0, 1])
+    df3, _ = compact.compact_frame(pd.DataFrame({"t": [0, 100, 300]}))
+    pos1, pos2 = alignment.align_positions(df1, df3, "Key columns", keys=["t"])
+    assert (pos1.tolist(), pos2.tolist()) == ([0, 2], [0, 1])
@@ -0,0 +1,44 @@
+from benchmarks import generators, runner, suite
+from visualizer.utils import (
+    csv_parser,
+    dataset_cache,
+    disk_cache,
+    json_parser,
+    upload_io,
+)
+
+
+def test_generated_datasets_load_with_the_app_parsers(tmp_path):
+    wide = csv_parser.load_csv(upload_io.FileUpload(generators.dataset(tmp_path, generators.wide_csv, 250,
+                                                                        n_cols=8)))
+    assert wide.shape == (250, 8) and wide["id"].is_monotonic_increasing
+    series = csv_parser.load_csv(upload_io.FileUpload(generators.dataset(tmp_path, generators.time_series_csv, 250)))
+    assert list(series.columns) == ["timestamp", "value", "latency", "cat"]
+    nested = json_parser.load_json_data(upload_io.FileUpload(generators.dataset(tmp_path, generators.nested_json, 50)))
+    assert len(nested["records"]) == 50 and "next" in nested["records"][0]["meta"]
+    tables = json_parser.extract_json_tables(json_parser.load_json_data(
+        upload_io.FileUpload(generators.dataset(tmp_path, generators.tables_json, 100, n_tables=3))))
+    assert sorted(tables) == ["table_00", "table_01", "table_02"] and sum(map(len, tables.values())) == 100
+    # Generated files are reused, and generation is deterministic.
+    path = generators.dataset(tmp_path, generators.time_series_csv, 250)
+    generators.time_series_csv(tmp_path / "again.csv", 250)
+    with open(path, "rb") as source:
+        assert (tmp_path / "again.csv").read_bytes() == source.read()
+
+
+def test_run_and_compare_flag_regressions_beyond_tolerance(tmp_path, monkeypatch):
+    # The runner disables the shared caches' disk use; restore them for the other tests.
+    monkeypatch.setattr(disk_cache.frame_cache, "max_bytes", disk_cache.frame_cache.max_bytes)
+    monkeypatch.setattr(dataset_cache.dataset_cache, "spill_max_bytes", dataset_cache.dataset_cache.spill_max_bytes)
+    results = runner.run_suite([100], ["comparison_stats", "build_plotly_chart?Pie*"], repeat=1, data_dir=tmp_path)
+    assert sorted(results) == ["build_plotly_chart[Pie Chart]/100", "comparison_stats/100"]
+    assert all(result["seconds"] > 0 and result["peak_bytes"] > 0 for result in results.values())
+    assert runner.run_benchmark("flatten_json_column[text]", suite.TIERS["full"][-1]) == \
+        {"skipped": "above 1,000,000 rows"}
+
+    baseline = {"a/10": {"seconds": 1.0, "peak_bytes": 100_000_000}, "b/10": {"seconds": 1.0, "peak_bytes": 0}}
+    current = {"a/10": {"seconds": 1.2, "peak_bytes": 105_000_000}, "b/10": {"seconds": 1.5, "peak_bytes": 0},
+               "c/10": {"seconds": 9.0, "peak_bytes": 0}}
+    assert runner.compare(current, baseline) == [("b/10", "seconds", 1.0, 1.5)]
+    current["a/10"]["peak_bytes"] = 120_000_000
+    assert runner.compare(current, baseline, time_tolerance=1.0) == [("a/10", "peak_bytes", 100_000_000, 120_000_000)]
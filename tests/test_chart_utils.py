@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 from visualizer.utils import chart_utils
@@ -23,3 +24,52 @@ def test_build_comparison_chart_histogram():
     # Ensure the histnorm is set to the empty string (for "count")
     for trace in fig.data:
         assert trace.histnorm == ""
+
+
+def test_aggregated_box_plot_uses_precomputed_quartiles():
+    df = pd.DataFrame({"x": ["a"] * 5 + ["b"] * 4, "y": [1, 2, 3, 4, 100, 5, 6, 7, 8]})
+    fig = chart_utils.build_plotly_chart(df, "x", "y", "Box Plot", {"aggregate": True, "points": "outliers"})
+    box, points = fig.data[0], fig.data[1]
+    assert list(box.x) == ["a", "b"]
+    assert list(box.q1) == [2.0, 5.75]
+    assert list(box.median) == [3.0, 6.5]
+    assert list(box.upperfence) == [4.0, 8.0]
+    assert list(points.y) == [100.0]
+
+
+def test_aggregated_comparison_histogram_and_hover_without_customdata():
+    df = pd.DataFrame({
+        "x": [1.0, 2.0, 2.0, 3.0, 1.0, 1.0],
+        "y": [1, 1, 1, 1, 1, 1],
+        "File": ["File 1"] * 4 + ["File 2"] * 2,
+    })
+    fig = chart_utils.build_comparison_chart(df, "x", "y", "Histogram", {"aggregate": True, "histnorm": "percent"})
+    assert [trace.name for trace in fig.data] == ["File 1", "File 2"]
+    assert sum(fig.data[0].y) == 100
+    assert fig.data[0].customdata is None
+    assert "%{fullData.name}" in fig.data[0].hovertemplate
+
+
+def test_webgl_above_threshold(monkeypatch):
+    monkeypatch.setattr(chart_utils, "WEBGL_THRESHOLD", 10)
+    df = pd.DataFrame({"x": range(20), "y": range(20), "File": ["a", "b"] * 10})
+    assert chart_utils.build_plotly_chart(df, "x", "y", "Scatter Chart", {}).data[0].type == "scattergl"
+    assert chart_utils.build_comparison_chart(df, "x", "y", "Line Chart", {}).data[0].type == "scattergl"
+    assert chart_utils.build_plotly_chart(df.head(10), "x", "y", "Line Chart", {}).data[0].type == "scatter"
+    # WebGL traces cannot draw splines.
+    assert chart_utils.build_plotly_chart(df, "x", "y", "Line Chart", {"smooth_lines": True}).data[0].type == "scatter"
+
+
+def test_compact_payload_sends_dates_as_millis_and_narrows_floats():
+    times = pd.date_range("2024-01-01", periods=4, freq="s")
+    df = pd.DataFrame({"t": times, "y": [0.5, 1.5, np.nan, 3.5], "epoch": times.asi8 / 1e6})
+    fig = chart_utils.build_plotly_chart(df, "t", "y", "Line Chart", {})
+    assert fig.layout.xaxis.type == "date"
+    assert fig.data[0].x.dtype == np.float64 and fig.data[0].x[1] - fig.data[0].x[0] == 1000
+    assert fig.data[0].y.dtype == np.float64
+
+    fig = chart_utils.compact_payload(chart_utils.build_plotly_chart(df, "epoch", "y", "Line Chart", {}), "float32")
+    assert fig.data[0].y.dtype == np.float32
+    # Epoch timestamps would lose their seconds as float32, so they are kept.
+    assert fig.data[0].x.dtype == np.float64
+    assert '"dtype":"f4"' in fig.to_json()
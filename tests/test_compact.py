@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from visualizer.utils import compact
+
+
+def test_compact_frame_downcasts_numbers_without_changing_values():
+    df = pd.DataFrame({
+        "small": [1, 2, 3],
+        "wide": [0, 2 ** 40, -5],
+        "halves": [0.5, 1.25, np.nan],
+        "precise": [0.1, 0.2, 0.3],
+    })
+    compacted, report = compact.compact_frame(df)
+    assert compacted["small"].dtype == np.int8
+    assert compacted["wide"].dtype == np.int64
+    assert compacted["halves"].dtype == np.float32
+    assert compacted["precise"].dtype == np.float64
+    pd.testing.assert_frame_equal(compacted.astype(df.dtypes.to_dict()), df)
+    assert set(report["columns"]) == {"small", "halves"}
+    assert report["after"] < report["before"]
+
+
+def test_compact_frame_stores_repetitive_strings_as_categories():
+    df = pd.DataFrame({
+        "cat": pd.Series(["a", "b"] * 50, dtype=object),
+        "id": pd.Series([f"id-{i}" for i in range(100)], dtype=object),
+        "mixed": pd.Series([1, "x"] * 50, dtype=object),
+    })
+    compacted, report = compact.compact_frame(df)
+    assert isinstance(compacted["cat"].dtype, pd.CategoricalDtype)
+    assert isinstance(compacted["id"].dtype, pd.StringDtype)
+    assert compacted["mixed"].dtype == object
+    assert compacted["cat"].tolist() == df["cat"].tolist()
+    assert compact.format_report(report).startswith("Memory: ")
@@ -1,6 +1,6 @@
 import io
 
-from visualizer.utils import csv_parser
+from visualizer.utils import csv_parser, pushdown
 
 
 def test_auto_read_csv():
@@ -9,3 +9,51 @@ def test_auto_read_csv():
     df = csv_parser.auto_read_csv(file_obj)
     assert list(df.columns) == ["a", "b", "c"]
     assert df.shape == (2, 3)
+
+
+def test_sniff_csv_detects_dialect():
+    dialect = csv_parser.sniff_csv(b"name;value\nfoo;1.5\nbar;2.5\n")
+    assert dialect["sep"] == ";"
+    assert dialect["header"] == 0
+    assert dialect["dtype"]["value"] == "float64"
+
+
+def test_read_csv_bytes_headerless_and_hint_fallback():
+    df = csv_parser.read_csv_bytes(b"1,2,3\n4,5,6\n")
+    assert df.shape == (2, 3)
+    # The float hint from the sample does not hold for the last row; the parse must still succeed.
+    raw = b"a,b\n" + b"1.5,2\n" * (csv_parser.SNIFF_BYTES // 6 + 10) + b"oops,3\n"
+    df = csv_parser.read_csv_bytes(raw)
+    assert df["a"].iloc[-1] == "oops"
+
+
+def test_read_csv_bytes_renames_duplicate_header_names():
+    df = csv_parser.read_csv_bytes(b"a,a,b,a\n1,2,3,4\n")
+    assert list(df.columns) == ["a", "a.1", "b", "a.2"]
+    assert df.iloc[0].tolist() == [1, 2, 3, 4]
+    filtered = csv_parser.read_csv_bytes(b"a,a,b\n1,2,3\n5,6,7\n",
+                                         filters=pushdown.make_filters(["a.1"], None, None, [("a.1", ">=", "5")]))
+    assert list(filtered.columns) == ["a.1"] and filtered["a.1"].tolist() == [6]
+
+
+def test_read_csv_bytes_pushes_filters_into_both_engines(monkeypatch):
+    raw = b"t,v,cat,wide\n" + b"".join(f"{i},{i * 0.5},{'ab'[i % 2]},{i * 7}\n".encode() for i in range(1000))
+    filters = pushdown.make_filters(["v", "t"], 10, 500, [("cat", "=", "a"), ("v", ">=", "100")])
+    for engine in (True, False):
+        monkeypatch.setattr(csv_parser, "HAS_PYARROW", engine)
+        df = csv_parser.read_csv_bytes(raw, filters=filters)
+        assert list(df.columns) == ["v", "t"]
+        assert df["t"].tolist() == list(range(200, 500, 2))
+    assert csv_parser.sniff_csv(raw)["columns"] == ["t", "v", "cat", "wide"]
+
+
+def test_sample_csv_bytes_draws_from_the_whole_file(monkeypatch):
+    raw = b"t,v\n" + b"".join(f"{i},{i % 3}\n".encode() for i in range(5000))
+    for engine in (True, False):
+        monkeypatch.setattr(csv_parser, "HAS_PYARROW", engine)
+        sample, total = csv_parser.sample_csv_bytes(raw, k=100)
+        assert total == 5000 and len(sample) == 100
+        assert sample["t"].is_monotonic_increasing and sample["t"].max() > 2500
+        sample, total = csv_parser.sample_csv_bytes(raw, k=100, filters=pushdown.make_filters(
+            ["t"], predicates=[("v", "=", "0")]))
+        assert total == 1667 and list(sample.columns) == ["t"] and (sample["t"] % 3 == 0).all()
@@ -0,0 +1,47 @@
+import pandas as pd
+
+from visualizer.utils import dataset_cache
+
+
+def test_dataset_cache_evicts_by_bytes_and_restores_spilled_entries(tmp_path):
+    df = pd.DataFrame({"a": range(10_000)})
+    size = dataset_cache.footprint(df)
+    cache = dataset_cache.DatasetCache(max_bytes=int(size * 1.5), spill_dir=str(tmp_path))
+    cache.put("first", df)
+    cache.put("second", df + 1)
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["spills"] == 1
+
+    calls = []
+    restored = cache.get_or_load("first", lambda: calls.append(1))
+    assert not calls
+    pd.testing.assert_frame_equal(restored, df)
+    stats = cache.stats()
+    assert (stats["spill_hits"], stats["misses"], stats["evictions"]) == (1, 0, 2)
+    assert cache.get("missing") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_dataset_cache_without_spilling_drops_entries(tmp_path):
+    cache = dataset_cache.DatasetCache(max_bytes=1, spill_dir=str(tmp_path), spill_max_bytes=0)
+    cache.put("rows", [{"a": 1}, {"a": 2}])
+    assert cache.get("rows") is None
+    assert not list(tmp_path.iterdir())
+
+
+def test_footprint_of_parsed_json_is_extrapolated_from_a_sample():
+    rows = [{"key": "x" * 100, "value": i} for i in range(10 * dataset_cache.FOOTPRINT_SAMPLE_ITEMS)]
+    small = rows[:dataset_cache.FOOTPRINT_SAMPLE_ITEMS]
+    assert abs(dataset_cache.footprint(rows) / dataset_cache.footprint(small) - 10) < 0.5
+
+
+def test_dataset_cache_does_not_hold_values_larger_than_its_budget(tmp_path):
+    small = pd.DataFrame({"a": range(10)})
+    cache = dataset_cache.DatasetCache(max_bytes=dataset_cache.footprint(small) * 10, spill_dir=str(tmp_path))
+    cache.put("small", small)
+    cache.put("large", pd.DataFrame({"a": range(10_000)}))
+    assert cache.get("small") is small
+    assert cache.get("large") is None
+    stats = cache.stats()
+    assert (stats["entries"], stats["evictions"], stats["spills"]) == (1, 0, 0)
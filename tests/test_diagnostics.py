@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+
+from visualizer.utils import diagnostics
+from visualizer.utils.dataset_cache import dataset_cache
+
+
+@pytest.fixture
+def instrumented():
+    """Record spans for one test, starting from empty totals."""
+    diagnostics.reset()
+    diagnostics.enable(memory=True)
+    yield
+    diagnostics.disable()
+    diagnostics.reset()
+
+
+@diagnostics.stage("Load")
+def _load(key):
+    return dataset_cache.get_or_load(("diagnostics-test", key), lambda: pd.DataFrame({"x": range(key)}))
+
+
+def test_spans_record_time_rows_cache_and_allocations(instrumented):
+    _load(10)
+    _load(10)
+    with diagnostics.span("Outer") as outer:
+        outer.rows = 3
+        with diagnostics.span("Inner"):
+            data = list(range(100_000))
+        del data
+    totals = diagnostics.totals()
+    assert (totals["Load"]["calls"], totals["Load"]["rows"]) == (2, 20)
+    assert (totals["Load"]["hits"], totals["Load"]["misses"]) == (1, 1)
+    # The inner span's peak counts for the outer span as well.
+    assert totals["Outer"]["max_alloc_bytes"] >= totals["Inner"]["max_alloc_bytes"] > 100_000 * 8
+    assert [span["stage"] for span in diagnostics.recent()][:2] == ["Outer", "Inner"]
+
+    text = diagnostics.prometheus_text()
+    assert 'visualizer_stage_calls_total{stage="Load"} 2' in text
+    assert 'visualizer_stage_cache_total{stage="Load",result="hit"} 1' in text
+    assert 'visualizer_stage_cache_total{stage="Outer"' not in text
+    frame = diagnostics.stage_frame()
+    assert frame["Total (s)"].is_monotonic_decreasing and "Peak alloc (MB)" in frame.columns
+
+
+def test_nothing_is_recorded_while_disabled():
+    diagnostics.reset()
+    assert not diagnostics.is_enabled()
+    _load(5)
+    with diagnostics.span("Render") as span:
+        span.rows = 1
+    assert diagnostics.totals() == {} and diagnostics.recent() == []
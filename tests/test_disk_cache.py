@@ -0,0 +1,46 @@
+import os
+from collections import OrderedDict
+from types import SimpleNamespace
+
+import pandas as pd
+
+from visualizer.utils import disk_cache
+
+
+def test_disk_frame_cache_roundtrip(tmp_path):
+    cache = disk_cache.DiskFrameCache(str(tmp_path), max_bytes=10 * 1024 * 1024)
+    df = pd.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "z"]})
+    key = disk_cache.content_key(b"a,b\n1,x\n", "csv")
+    assert cache.get(key) is None
+    assert cache.put(key, df)
+    pd.testing.assert_frame_equal(cache.get(key), df, check_dtype=False)
+
+    calls = []
+    cache.get_or_build(key, lambda: calls.append(1))
+    assert not calls
+
+
+def test_disk_frame_cache_evicts_least_recently_used(tmp_path):
+    df = pd.DataFrame({"a": range(10_000)})
+    cache = disk_cache.DiskFrameCache(str(tmp_path), max_bytes=10 * 1024 * 1024)
+    cache.put("old", df)
+    cache.put("new", df)
+    os.utime(os.path.join(str(tmp_path), "old.arrow"), (0, 0))
+    cache.max_bytes = cache.size_bytes() - 1
+    cache.evict()
+    assert cache.get("old") is None
+    assert cache.get("new") is not None
+
+
+def test_disk_frame_cache_skips_unsupported_frames(tmp_path):
+    cache = disk_cache.DiskFrameCache(str(tmp_path))
+    df = pd.DataFrame({"mixed": [{"a": 1}, "text", 3]})
+    assert not cache.put("mixed", df)
+
+
+def test_upload_digests_are_remembered_for_recent_uploads(monkeypatch):
+    monkeypatch.setattr(disk_cache, "_upload_digests", OrderedDict())
+    monkeypatch.setattr(disk_cache, "MAX_UPLOAD_DIGESTS", 2)
+    for file_id in ("a", "b", "a", "c"):
+        assert disk_cache.upload_digest(SimpleNamespace(file_id=file_id), b"data") == disk_cache.content_key(b"data")
+    assert list(disk_cache._upload_digests) == [("a", 4), ("c", 4)]
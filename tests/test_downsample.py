@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from visualizer.utils import chart_utils, downsample
+
+
+def test_lttb_indices_keeps_endpoints_and_peak():
+    x = np.arange(1000, dtype="float64")
+    y = np.zeros(1000)
+    y[500] = 100.0
+    idx = downsample.lttb_indices(x, y, 50)
+    assert len(idx) == 50
+    assert idx[0] == 0 and idx[-1] == 999
+    assert 500 in idx
+    assert np.all(np.diff(idx) > 0)
+
+
+def test_minmax_indices_keeps_extremes():
+    y = np.sin(np.linspace(0, 20, 10_000))
+    y[1234] = -5.0
+    y[8765] = 5.0
+    idx = downsample.minmax_indices(y, 200)
+    assert len(idx) <= 202
+    assert 1234 in idx and 8765 in idx
+
+
+def test_downsample_frame_per_group_and_range():
+    df = pd.DataFrame({
+        "x": np.tile(np.arange(5000), 2),
+        "y": np.random.default_rng(0).normal(size=10_000),
+        "File": ["File 1"] * 5000 + ["File 2"] * 5000,
+    })
+    sampled, total = downsample.downsample_frame(df, "x", "y", max_points=100, group_col="File")
+    assert total == 10_000
+    assert sampled["File"].value_counts().to_dict() == {"File 1": 100, "File 2": 100}
+
+    zoomed, total = downsample.downsample_frame(df, "x", "y", max_points=100, x_range=(0, 49))
+    assert total == 100
+    assert len(zoomed) == 100
+
+
+def test_downsample_frame_sorts_by_x_and_strides_per_group():
+    x = np.arange(5000)
+    shuffled = np.random.default_rng(1).permutation(x)
+    df = pd.DataFrame({"x": shuffled, "y": np.sin(shuffled / 300)})
+    sampled, _ = downsample.downsample_frame(df, "x", "y", max_points=100)
+    assert sampled["x"].is_monotonic_increasing and sampled["x"].iloc[[0, -1]].tolist() == [0, 4999]
+    expected, _ = downsample.downsample_frame(df.sort_values("x"), "x", "y", max_points=100)
+    assert sampled["x"].tolist() == expected["x"].tolist()
+
+    labels = pd.DataFrame({"x": np.arange(5050), "y": ["a"] * 5050, "File": ["big"] * 5000 + ["small"] * 50})
+    sampled, _ = downsample.downsample_frame(labels, "x", "y", max_points=100, group_col="File")
+    assert sampled["File"].value_counts().to_dict() == {"big": 100, "small": 50}
+
+
+def test_build_plotly_chart_adds_sampling_note():
+    df = pd.DataFrame({"x": np.arange(5000), "y": np.arange(5000) % 7})
+    fig = chart_utils.build_plotly_chart(df, "x", "y", "Line Chart", {"max_points": 500})
+    assert len(fig.data[0].x) == 500
+    assert "Showing 500 of 5,000 points" in fig.layout.annotations[0].text
@@ -0,0 +1,31 @@
+import pandas as pd
+import plotly.graph_objects as go
+
+from visualizer.utils import figure_cache
+
+
+def test_fingerprint_follows_content_and_identity():
+    df = pd.DataFrame({"x": [1, 2, 3], "y": [1.0, 2.0, 3.0]})
+    assert figure_cache.fingerprint(df) == figure_cache.fingerprint(df.copy())
+    assert figure_cache.fingerprint(df) != figure_cache.fingerprint(df.assign(y=[1.0, 2.0, 4.0]))
+    assert figure_cache.fingerprint(df) != figure_cache.fingerprint(df.rename(columns={"y": "z"}))
+    assert figure_cache.fingerprint(df) != figure_cache.fingerprint(df.astype({"x": "float64"}))
+    nested = pd.DataFrame({"x": [{"a": 1}, [1, 2]]})
+    assert figure_cache.fingerprint(nested) != figure_cache.fingerprint(pd.DataFrame({"x": [{"a": 2}, [1, 2]]}))
+
+
+def test_figure_cache_is_byte_bounded_lru_with_counters():
+    figures = [go.Figure(go.Scatter(x=list(range(100)), y=[i] * 100)) for i in range(3)]
+    size = len(figures[0].to_json())
+    cache = figure_cache.FigureCache(max_bytes=int(size * 2.5))
+    for i, fig in enumerate(figures[:2]):
+        cache.put(i, fig)
+    assert cache.get(0).data[0].y[0] == 0  # 0 becomes the most recently used
+    cache.put(2, figures[2])
+    assert cache.get(1) is None and cache.get(2) is not None
+    # Each hit is a new figure, so changing it does not change the cached one.
+    cache.get(0).update_layout(title="changed")
+    assert cache.get(0).layout.title.text is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["entries"]) == (4, 1, 1, 2)
+    assert stats["bytes"] <= cache.max_bytes
@@ -2,9 +2,10 @@ import io
 import json
 
 import pandas as pd
+import pytest
 
-from visualizer.utils import json_parser
-from visualizer.utils.data_utils import flatten_json_column
+from visualizer.utils import json_parser, pushdown
+from visualizer.utils.data_utils import flatten_json_column, flatten_json_columns
 
 
 def test_load_json_data():
@@ -39,3 +40,85 @@ def test_flatten_json_column():
     assert "meta.version" in new_cols
     assert "meta" not in df_flat.columns
     assert df_flat["meta.updated_at"].iloc[0] == 1740570440135
+
+
+def test_index_json_tables_and_load_table():
+    doc = {
+        "table1": [{"a": 1, "b": "x,]\"}"}, {"a": 2, "b": "y\\"}],
+        "notatable": "foo [",
+        "numbers": [1, 2],
+        "table2": [{"c": [1, {"d": 2}]}] * 5,
+    }
+    raw = json.dumps(doc).encode()
+    index = json_parser.index_json_tables(raw)
+    assert set(index) == {"table1", "table2"}
+    assert index["table2"]["rows"] == 5
+    assert json_parser.load_json_table(raw, index["table1"]) == doc["table1"]
+    assert json_parser.load_json_table(raw, index["table2"], max_rows=3) == doc["table2"][:3]
+    chunks = list(json_parser.iter_json_table_chunks(raw, index["table2"], 2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+
+
+@pytest.mark.parametrize("truncated", [b'{"t": [', b'{"t": [{"a": 1}, {"a": 2', b'{"t": [{"a": 1}], "u": {'])
+def test_index_json_tables_rejects_truncated_documents(truncated):
+    with pytest.raises(ValueError, match="Unexpected end"):
+        json_parser.index_json_tables(truncated)
+
+
+def test_flatten_json_columns_unions_keys_and_recurses():
+    df = pd.DataFrame({
+        "meta": ['{"a": 1, "nested": {"b": 2}}', '{"a": 3, "extra": "x"}', None],
+        "obj": [{"k": 1}, {"k": 2}, {"k": 3}],
+        "text": ["plain", "{not json", "x"],
+    })
+    df_flat, mapping = flatten_json_columns(df)
+    assert mapping == {"meta": ["meta.a", "meta.nested.b", "meta.extra"], "obj": ["obj.k"]}
+    assert "text" in df_flat.columns
+    assert df_flat["meta.extra"].iloc[1] == "x"
+
+    df_shallow, mapping = flatten_json_columns(df, max_depth=1)
+    assert mapping["meta"] == ["meta.a", "meta.nested", "meta.extra"]
+    assert df_shallow["meta.nested"].iloc[0] == {"b": 2}
+
+
+def test_read_ndjson_in_chunks_with_row_cap():
+    records = [{"a": i, "b": f"x{i}", "c": {"d": i % 2}} for i in range(50)]
+    raw = ("\n".join(json.dumps(r) for r in records[:20]) + "\n\n" +
+           "\n".join(json.dumps(r) for r in records[20:])).encode()
+    assert json_parser.is_ndjson(raw)
+    assert not json_parser.is_ndjson(json.dumps({"table": records}, indent=1).encode())
+    assert len(json_parser.ndjson_chunks(raw, chunk_bytes=100)) > 1
+    df = json_parser.read_ndjson(raw, workers=1, chunk_bytes=100)
+    pd.testing.assert_frame_equal(df, pd.DataFrame(records))
+    assert json_parser.read_ndjson(raw, max_rows=7, workers=1, chunk_bytes=100)["a"].tolist() == list(range(7))
+
+
+def test_read_ndjson_reports_invalid_records():
+    with pytest.raises(ValueError, match="byte 9"):
+        json_parser.read_ndjson(b'{"a": 1}\n{"a": 2\n', workers=1)
+
+
+def test_json_readers_push_filters_down():
+    records = [{"a": i, "b": "xy"[i % 2], "c": {"d": i}} for i in range(100)]
+    filters = pushdown.make_filters(["a"], 5, 60, [("b", "=", "y")])
+    expected = list(range(5, 60, 2))
+    raw = "\n".join(json.dumps(r) for r in records).encode()
+    assert json_parser.read_ndjson(raw, workers=1, chunk_bytes=200, filters=filters).columns.tolist() == ["a"]
+    assert json_parser.read_ndjson(raw, workers=1, chunk_bytes=200, filters=filters)["a"].tolist() == expected
+    doc = json.dumps({"table": records}).encode()
+    entry = json_parser.index_json_tables(doc)["table"]
+    assert json_parser.read_json_table(doc, entry, filters, chunk_rows=7)["a"].tolist() == expected
+    assert json_parser.read_json_table(doc, entry, filters, max_rows=10)["a"].tolist() == [5, 7, 9, 11, 13]
+
+
+def test_json_samples_parse_only_sampled_rows():
+    records = [{"a": i, "b": "xy"[i % 2]} for i in range(1000)]
+    raw = ("\n".join(json.dumps(r) for r in records[:500]) + "\n\n" +
+           "\n".join(json.dumps(r) for r in records[500:])).encode()
+    sample, total = json_parser.sample_ndjson(raw, k=50, chunk_bytes=1000)
+    assert total == 1000 and len(sample) == 50 and sample["a"].is_monotonic_increasing
+    doc = json.dumps({"table": records}).encode()
+    entry = json_parser.index_json_tables(doc)["table"]
+    filters = pushdown.make_filters(["a"], 100, 200, [("b", "=", "x")])
+    sample, total = json_parser.sample_json_table(doc, entry, k=1000, filters=filters)
+    assert total == 100 and sample["a"].tolist() == list(range(100, 200, 2))
@@ -0,0 +1,44 @@
+import threading
+import time
+
+import pytest
+
+from visualizer.utils import parallel
+
+
+def test_run_parallel_overlaps_tasks_and_reports_progress():
+    barrier = threading.Barrier(2, timeout=5)
+
+    def task(value):
+        def run(progress):
+            progress("start")
+            # Both tasks must be running at once to pass the barrier.
+            barrier.wait()
+            time.sleep(0.05)
+            return value
+        return run
+
+    events = []
+    results = parallel.run_parallel([task(1), task(2)], lambda i, stage: events.append((i, stage)))
+    assert results == [1, 2]
+    for i in (0, 1):
+        assert events.index((i, "start")) < events.index((i, None))
+
+
+def test_run_parallel_reraises_task_errors():
+    def fail(progress):
+        raise ValueError("bad file")
+
+    with pytest.raises(ValueError, match="bad file"):
+        parallel.run_parallel([lambda progress: 1, fail])
+
+
+def test_run_parallel_can_run_tasks_in_the_calling_thread():
+    def task(progress):
+        progress("start")
+        return threading.current_thread()
+
+    events = []
+    results = parallel.run_parallel([task, task], lambda i, stage: events.append((i, stage)), concurrent=False)
+    assert results == [threading.current_thread()] * 2
+    assert events == [(0, "start"), (0, None), (1, "start"), (1, None)]
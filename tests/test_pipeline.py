@@ -0,0 +1,54 @@
+import pandas as pd
+
+from visualizer.utils import pipeline
+
+
+def test_chart_frame_projects_and_converts_timestamps():
+    df = pd.DataFrame({"timestamp": [1740570440135, 1740570441135, None], "value": [1, 2, 3], "other": [0, 0, 0]})
+    chart_df, error = pipeline.chart_frame("test-chart-frame", "timestamp", "value", df)
+    assert error is None
+    assert list(chart_df.columns) == ["timestamp", "value"]
+    assert len(chart_df) == 2
+    assert pd.api.types.is_datetime64_any_dtype(chart_df["timestamp"])
+    # The cached input frame is never modified.
+    assert pd.api.types.is_numeric_dtype(df["timestamp"])
+
+
+def test_comparison_frame_tags_files_and_tolerates_missing_columns():
+    df1 = pd.DataFrame({"x": [1, 2], "y": [3, 4]})
+    df2 = pd.DataFrame({"z": [5]})
+    chart_df, parts, error = pipeline.comparison_frame(("test-a", "test-b"), "x", "y", (df1, df2))
+    assert error is None
+    assert chart_df["File"].tolist() == ["File 1", "File 1"]
+    assert parts[1].empty
+
+
+def test_comparison_frame_tags_n_files_with_categorical_names():
+    dfs = tuple(pd.DataFrame({"x": [1, 2], "y": [i, i + 1]}) for i in range(3))
+    names = ("run-a.csv", "run-b.csv", "run-c.csv")
+    chart_df, parts, error = pipeline.comparison_frame(("test-n1", "test-n2", "test-n3"), "x", "y", dfs, names)
+    assert error is None
+    assert isinstance(chart_df["File"].dtype, pd.CategoricalDtype)
+    assert list(chart_df["File"].cat.categories) == list(names)
+    assert chart_df["File"].tolist() == ["run-a.csv"] * 2 + ["run-b.csv"] * 2 + ["run-c.csv"] * 2
+    assert [part["y"].tolist() for part in parts] == [[0, 1], [1, 2], [2, 3]]
+
+
+def test_baseline_stats_compare_every_file_with_the_baseline():
+    dfs = (pd.DataFrame({"v": [1.0, 2.0]}), pd.DataFrame({"v": [1.0, 2.0]}), pd.DataFrame({"v": [2.0, 4.0]}))
+    frame_keys = ("test-b1", "test-b2", "test-b3")
+    positions, errors = pipeline.baseline_alignment(frame_keys, 1, "Row position", (), None, "", dfs)
+    assert not errors
+    assert sorted(positions) == [0, 2]
+    stats_df = pipeline.baseline_stats((frame_keys, 1), ("v",), ("a", "b", "c"), 1, dfs, positions)
+    assert stats_df["File"].tolist() == ["a", "c"]
+    assert stats_df["MAE"].tolist() == [0.0, 1.5]
+
+
+def test_file_labels_number_duplicate_names():
+    class Upload:
+        def __init__(self, name):
+            self.name = name
+
+    labels = pipeline.file_labels([Upload("run.csv"), Upload("run.csv"), Upload("other.csv")])
+    assert labels == ["run.csv", "run.csv (2)", "other.csv"]
@@ -0,0 +1,38 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from visualizer.utils import preview
+
+
+def test_reservoir_is_uniform_and_keeps_stream_order():
+    counts = np.zeros(100)
+    for seed in range(300):
+        reservoir = preview.Reservoir(10, seed)
+        for start in range(0, 100, 25):
+            reservoir.add(25, lambda idx, start=start: pd.DataFrame({"v": start + idx}))
+        sample, positions = reservoir.sample()
+        assert sample["v"].tolist() == positions.tolist() == sorted(positions)
+        counts[positions] += 1
+    assert reservoir.seen == 100
+    # Every row is drawn with probability 1/10, i.e. about 30 times in 300 samples.
+    assert counts.min() > 10 and counts.max() < 50
+    schema = preview.schema_frame(pd.DataFrame({"a": [np.nan, 2.0], "b": ["x", "y"]}))
+    assert schema["Non-null"].tolist() == ["50%", "100%"] and schema["Example"].tolist() == ["2.0", "x"]
+
+
+def test_load_in_background_runs_once_per_key():
+    release, calls = threading.Event(), []
+
+    def loader():
+        calls.append(1)
+        release.wait(5)
+
+    key = ("test-background", id(calls))
+    future = preview.load_in_background(key, loader)
+    assert preview.load_in_background(key, loader) is future
+    assert not preview.is_loaded(key)
+    release.set()
+    future.result(timeout=5)
+    assert preview.is_loaded(key) and calls == [1]
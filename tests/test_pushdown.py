@@ -0,0 +1,32 @@
+import pandas as pd
+import pytest
+
+from visualizer.utils import pushdown
+
+
+def test_parse_condition():
+    columns = ["value", "cat", "start time", "start"]
+    assert pushdown.parse_condition("value >= 10", columns) == ("value", ">=", "10")
+    assert pushdown.parse_condition("cat in a, 'b c'", columns) == ("cat", "in", ("a", "b c"))
+    assert pushdown.parse_condition("start time between 1 AND 5", columns) == ("start time", "between", ("1", "5"))
+    assert pushdown.parse_condition("start != x", columns) == ("start", "!=", "x")
+    with pytest.raises(ValueError, match="Cannot parse"):
+        pushdown.parse_condition("missing > 1", columns)
+
+
+def test_filter_chunk_rows_conditions_and_time_window():
+    df = pd.DataFrame({
+        "timestamp": 1_700_000_000_000 + pd.RangeIndex(10).to_numpy() * 60_000,  # one row per minute, in ms
+        "value": range(10),
+        "cat": list("abababcabc"),
+    })
+    filters = pushdown.make_filters(
+        ["value"], 12, 18,
+        [("cat", "in", ("a", "c")), ("timestamp", "between", ("2023-11-14 22:15", "2023-11-14 22:20"))])
+    # The chunk starts at row 10 of the file, so the row range keeps its positions 2 to 7.
+    out = pushdown.filter_chunk(df, filters, offset=10)
+    assert out.columns.tolist() == ["value"]
+    assert out["value"].tolist() == [2, 4, 6]
+    assert pushdown.filters_key(pushdown.make_filters()) is None
+    with pytest.raises(ValueError, match="expected a number or a date"):
+        pushdown.filter_chunk(df, pushdown.make_filters(predicates=[("value", ">", "oops")]))
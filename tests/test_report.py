@@ -0,0 +1,43 @@
+import json
+
+import pandas as pd
+import pytest
+
+from visualizer import cli
+from visualizer.utils import report
+
+
+def _write_runs(directory):
+    base = pd.DataFrame({"t": range(50), "value": [float(i) for i in range(50)]})
+    base.to_csv(directory / "a.csv", index=False)
+    base.assign(value=base["value"] + 1).to_csv(directory / "b.csv", index=False)
+    (directory / "c.json").write_text(json.dumps({"rows": base.to_dict(orient="records")}))
+
+
+def test_load_spec_validates_and_fills_defaults():
+    spec = report.load_spec({"charts": [{"x": "t", "y": "value"}], "align": {"mode": "Key columns"}})
+    assert spec["flatten"] is True and spec["align"]["keys"] == []
+    with pytest.raises(ValueError):
+        report.load_spec({"chart": []})
+    with pytest.raises(ValueError):
+        report.load_spec({"baseline": "a.csv", "pairs": [["a.csv", "b.csv"]]})
+    with pytest.raises(ValueError):
+        report.load_spec({"charts": [{"x": "t"}]})
+
+
+def test_run_reports_writes_reports_and_index(tmp_path):
+    _write_runs(tmp_path)
+    out = tmp_path / "out"
+    spec = {"baseline": "a.csv", "charts": [{"x": "t", "y": "value"}, {"x": "t", "y": "missing"}]}
+    assert [name for name, _ in report.plan_reports(tmp_path, report.load_spec(spec))] == \
+        ["a.csv_vs_b.csv", "a.csv_vs_c.json"]
+    results = report.run_reports(tmp_path, {**spec, "charts": spec["charts"][:1]}, out, workers=1)
+    assert [r["status"] for r in results] == ["ok", "ok"] and results[0]["rows"] == [50, 50]
+    page = (out / "a.csv_vs_b.csv.html").read_text()
+    assert "Plotly.newPlot" in page and "<h2>Statistics</h2>" in page
+    assert json.loads((out / "index.json").read_text()) == results
+    assert (out / report.PLOTLY_JS).exists()
+    # One failing report is recorded in the index; the command then exits with 1.
+    (tmp_path / "spec.json").write_text(json.dumps(spec))
+    assert cli.main([str(tmp_path), "--spec", str(tmp_path / "spec.json"), "--out", str(out), "--workers", "1"]) == 1
+    assert all(r["status"] == "error" for r in json.loads((out / "index.json").read_text()))
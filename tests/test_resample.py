@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from visualizer.utils import chart_utils, resample
+from visualizer.utils.data_utils import convert_timestamp_axis, epoch_unit
+
+
+def test_epoch_unit_uses_whole_column():
+    assert epoch_unit(pd.Series([1.7e9, 1.7e9 + 1])) == "s"
+    assert epoch_unit(pd.Series([1.7e12, 1.7e12 + 1])) == "ms"
+    assert epoch_unit(pd.Series([1.7e15, 1.7e15 + 1])) == "us"
+    # A leading zero or missing value no longer decides the unit.
+    assert epoch_unit(pd.Series([0.0, np.nan, 1.7e12, 1.7e12 + 1000])) == "ms"
+    df = convert_timestamp_axis(pd.DataFrame({"timestamp": [0, 1_700_000_000_000, 1_700_000_001_000]}), "timestamp")
+    assert df["timestamp"].iloc[-1] == pd.Timestamp("2023-11-14 22:13:21")
+
+
+def test_resample_frame_per_group_aggregations():
+    times = 1_699_999_980_000 + np.arange(0, 120_000, 1000)  # two minutes at one row per second, in ms
+    df = pd.DataFrame({
+        "t": np.concatenate([times, times[::-1]]),
+        "v": np.concatenate([np.arange(120.0), np.arange(120.0)[::-1] * 2]),
+        "File": pd.Categorical(["a"] * 120 + ["b"] * 120),
+    })
+    band, bucket = resample.resample_frame(df, "t", "v", "1min", "min/max band", group_col="File")
+    assert bucket == "1min"
+    low, high = resample.band_columns("v")
+    a = band[band["File"] == "a"]
+    assert a["v"].tolist() == [29.5, 89.5]
+    assert a[low].tolist() == [0.0, 60.0] and a[high].tolist() == [59.0, 119.0]
+    # The reversed rows of "b" are sorted before resampling.
+    assert band.loc[band["File"] == "b", high].tolist() == [118.0, 238.0]
+    assert isinstance(band["File"].dtype, pd.CategoricalDtype)
+
+    p99, _ = resample.resample_frame(df, "t", "v", "1min", "p99", group_col="File")
+    assert np.allclose(p99.loc[p99["File"] == "a", "v"], [58.41, 118.41])
+    counts, _ = resample.resample_frame(df, "t", "v", "1min", "count", group_col="File", x_range=(1_699_999_980_000, 1_700_000_039_000))
+    assert counts["v"].tolist() == [60, 60]
+
+
+def test_resample_auto_bucket_keeps_gaps_and_draws_band():
+    times = pd.to_datetime(["2024-01-01 00:00:00", "2024-01-01 00:00:30", "2024-01-03 00:00:00"])
+    df = pd.DataFrame({"t": times, "v": [1, 3, 5]})
+    out, bucket = resample.resample_frame(df, "t", "v", "auto", "min/max band")
+    assert bucket == "10min"
+    assert len(out) == 289 and out["v"].isna().sum() == 287
+    fig = chart_utils.build_plotly_chart(out, "t", "v", "Line Chart", {})
+    assert len(fig.data) == 3 and fig.data[-1].fill == "tonexty"
+
+
+def test_resample_coarsens_buckets_that_would_exceed_the_cap():
+    df = pd.DataFrame({"t": pd.to_datetime(["2024-01-01", "2024-03-01"]), "v": [1.0, 2.0]})
+    # 60 days hold 5 million seconds; hourly buckets are the finest within the cap.
+    out, bucket = resample.resample_frame(df, "t", "v", "1s")
+    assert bucket == "1h" and len(out) == 60 * 24 + 1
+    assert resample.resample_frame(df, "t", "v", "1D")[1] == "1D"
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from visualizer.utils import compact, row_diff
+
+
+def test_diff_rows_by_key_with_mixed_dtypes():
+    a = pd.DataFrame({"id": [1, 2, 3, 3, 4], "v": [1.0, 2.0, 3.0, 4.0, np.nan], "s": ["x", "y", "z", "w", "q"]})
+    # Narrower dtypes and categorical strings compare equal to the same values in `a`.
+    b = pd.DataFrame({
+        "id": np.array([2, 3, 3, 5, 4], dtype="int32"),
+        "v": np.array([2, 3, 9, 5, np.nan], dtype="float32"),
+        "s": pd.Categorical(["y", "z", "w", "r", "Q"]),
+    })
+    diff = row_diff.diff_rows(a, b, keys=["id"])
+    assert diff["removed"].tolist() == [0] and diff["added"].tolist() == [3]
+    # The repeated key 3 pairs in order of occurrence.
+    assert diff["modified_a"].tolist() == [3, 4] and diff["modified_b"].tolist() == [2, 4]
+    assert diff["changes"].to_numpy().tolist() == [[True, False], [False, True]]
+    assert diff["unchanged"] == 2 and diff["columns"] == ["v", "s"]
+
+    page = row_diff.diff_page(a, b, diff, "Modified", ["id"], ["A", "B"], 1, 25)
+    assert page["Changed columns"].tolist() == ["v", "s"]
+    assert page["v (B)"].tolist()[0] == 9.0 and page["s (A)"].tolist() == ["w", "q"]
+    assert row_diff.diff_page(a, b, diff, "Added", ["id"], ["A", "B"], 1, 25)["id"].tolist() == [5]
+
+
+def test_diff_rows_without_keys_matches_whole_rows():
+    a = pd.DataFrame({"k": [1, 1, 2], "v": ["a", "a", "b"]})
+    b = pd.DataFrame({"k": [2, 1, 3], "v": ["b", "a", "c"]})
+    diff = row_diff.diff_rows(a, b)
+    # One of the two identical rows has no partner left.
+    assert diff["removed"].tolist() == [1] and diff["added"].tolist() == [2]
+    assert diff["unchanged"] == 2 and not len(diff["modified_a"])
+
+
+def test_diff_rows_of_negative_integers_compacted_to_different_widths():
+    a, _ = compact.compact_frame(pd.DataFrame({"id": [-1, -2, 3], "v": [-1, -2, 5]}))
+    b, _ = compact.compact_frame(pd.DataFrame({"id": [-1, -2, 3], "v": [-1, -2, 500]}))
+    assert (a["v"].dtype, b["v"].dtype) == (np.int8, np.int16)
+    diff = row_diff.diff_rows(a, b, keys=["id"])
+    assert diff["modified_a"].tolist() == [2] and diff["unchanged"] == 2
+    assert not len(diff["added"]) and not len(diff["removed"])
+    nullable = row_diff.diff_rows(a, b.astype({"v": "Int32"}).assign(id=b["id"].astype("int64")), keys=["id"])
+    assert nullable["modified_a"].tolist() == [2] and nullable["unchanged"] == 2
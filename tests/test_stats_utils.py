@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from visualizer.utils import stats_utils
+
+
+def test_comparison_stats_matches_reference_metrics():
+    df1 = pd.DataFrame({"a": [1.0, 2.0, 4.0, np.nan], "b": [0.0, 1.0, 2.0, 3.0], "s": ["x", "y", "z", "w"]})
+    df2 = pd.DataFrame({"a": [2.0, 2.0, 3.0, 5.0], "b": [1.0, 1.0, 2.0, 3.0], "s": ["x", "y", "z", "w"]})
+    stats = stats_utils.comparison_stats(df1, df2, stats_utils.common_numeric_columns(df1, df2)).set_index("Column")
+
+    assert list(stats.index) == ["a", "b"]
+    a = stats.loc["a"]
+    assert a["Count"] == 3
+    assert np.isclose(a["MAE"], 2 / 3)
+    assert np.isclose(a["RMSE"], np.sqrt(2 / 3))
+    assert np.isclose(a["Bias"], 0.0)
+    assert np.isclose(a["Max Error"], 1.0)
+    assert np.isclose(a["MAPE (%)"], (1 + 0 + 0.25) / 3 * 100)
+    assert np.isclose(a["Correlation"], np.corrcoef([1, 2, 4], [2, 2, 3])[0, 1])
+    # The zero in "b" is excluded from MAPE but not from the other metrics.
+    assert np.isclose(stats.loc["b", "MAPE (%)"], 0.0)
+    assert np.isclose(stats.loc["b", "MAE"], 0.25)
+
+
+def test_compare_arrays_matches_per_column_metrics():
+    rng = np.random.default_rng(1)
+    actual = rng.normal(size=(5000, 4)) + 1e9
+    forecast = actual + rng.normal(scale=0.5, size=actual.shape)
+    forecast[::7, 1] = np.nan
+    metrics = stats_utils.compare_arrays(actual, forecast)
+    valid = ~np.isnan(forecast[:, 1])
+    a, f = actual[valid, 1], forecast[valid, 1]
+    assert metrics["Count"].tolist() == [5000, valid.sum(), 5000, 5000]
+    assert np.isclose(metrics["MAE"][1], np.abs(f - a).mean())
+    assert np.isclose(metrics["RMSE"][1], np.sqrt(((f - a) ** 2).mean()))
+    # The shifted moments keep the correlation accurate despite the 1e9 offset.
+    assert np.isclose(metrics["Correlation"][1], np.corrcoef(a - 1e9, f - 1e9)[0, 1])
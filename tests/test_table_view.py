@@ -0,0 +1,20 @@
+import pandas as pd
+
+from visualizer.utils import table_view
+
+
+def test_view_positions_filter_then_sort():
+    df = pd.DataFrame({"v": [5.0, None, 1.0, 3.0, 8.0], "s": ["a", "b", "A", "c", "a"]})
+    positions = table_view.view_positions(df, sort_by="v", ascending=False, filter_col="s", operator="contains",
+                                          value="a")
+    assert positions.tolist() == [4, 0, 2]
+    assert table_view.view_positions(df, sort_by="v").tolist() == [2, 3, 0, 4, 1]
+    assert table_view.view_positions(df, filter_col="v", operator=">=", value="3").tolist() == [0, 3, 4]
+    assert table_view.view_positions(df) is None
+
+
+def test_page_slice_returns_one_projected_page():
+    df = pd.DataFrame({"a": range(250), "b": range(250)})
+    page = table_view.page_slice(df, None, ["b"], 3, 100)
+    assert list(page.columns) == ["b"]
+    assert page.index.tolist() == list(range(200, 250))
@@ -0,0 +1,28 @@
+import io
+import mmap
+
+from visualizer.utils import csv_parser, json_parser, upload_io
+
+
+def test_spool_stream_switches_to_memory_map_past_threshold():
+    text = "a,b\n" + "1,é\n" * 1000
+    small = upload_io.spool_stream(io.StringIO(text), threshold=1 << 20)
+    large = upload_io.spool_stream(io.StringIO(text), threshold=100)
+    assert isinstance(small, bytes)
+    assert isinstance(large, mmap.mmap)
+    assert large[:] == small == text.encode("utf-8")
+    assert csv_parser.read_csv_bytes(large).shape == (1000, 2)
+
+
+def test_buffer_reader_reads_without_copying_the_source():
+    buf = bytearray(b"0123456789")
+    with upload_io.open_buffer(memoryview(buf)) as reader:
+        assert reader.read(4) == b"0123"
+        reader.seek(-2, io.SEEK_END)
+        assert reader.read() == b"89"
+
+
+def test_decode_buffer_detects_json_encodings():
+    doc = '{"t": [{"a": "é"}]}'
+    assert json_parser.decode_buffer(memoryview(doc.encode("utf-16"))) == doc
+    assert json_parser.decode_buffer(b"\xef\xbb\xbf" + doc.encode("utf-8")) == doc
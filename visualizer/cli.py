@@ -0,0 +1,48 @@
+"""
+The `visualizer` command: render comparison reports for a directory of CSV and JSON files without the web app,
+e.g. for nightly runs. See visualizer.utils.report for the spec format.
+"""
+import argparse
+import sys
+
+from visualizer.utils import report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="visualizer",
+        description="Render standalone HTML charts and statistics for a directory of CSV/JSON files, with an "
+                    "index of the reports.")
+    parser.add_argument("directory", help="directory holding the CSV, JSON and JSON Lines files")
+    parser.add_argument("--spec", help="JSON file with the charts, baseline or pairs and statistics to render "
+                                       "(default: one report per file, without charts)")
+    parser.add_argument("--baseline", help="compare every other file with this one (overrides the spec)")
+    parser.add_argument("--out", default="report", help="output directory (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=report.REPORT_WORKERS,
+                        help="worker processes (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    try:
+        spec = report.load_spec(args.spec or {})
+        if args.baseline:
+            spec = {**spec, "baseline": args.baseline, "pairs": None}
+        total = len(report.plan_reports(args.directory, spec))
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    done = 0
+
+    def on_result(summary):
+        nonlocal done
+        done += 1
+        status = summary["error"] or summary["status"]
+        print(f"[{done}/{total}] {' vs '.join(summary['files'])}: {status} ({summary['seconds']:.1f}s)", flush=True)
+
+    results = report.run_reports(args.directory, spec, args.out, workers=args.workers, on_result=on_result)
+    failed = sum(summary["status"] != "ok" for summary in results)
+    print(f"{len(results) - failed} of {len(results)} reports rendered; index: {args.out}/index.html")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
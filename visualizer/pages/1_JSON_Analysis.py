@@ -1,32 +1,85 @@
 import streamlit as st
-import pandas as pd
-from visualizer.utils import json_parser, chart_utils
-from visualizer.utils.data_utils import flatten_json_column
+from visualizer.utils import (aggregate, compact, dataset_cache, diagnostics, figure_cache, json_parser, pipeline,
+                              preview, pushdown, resample, table_view)
 
 st.title("JSON File Analysis")
 
 # Upload one JSON file.
-json_file = st.file_uploader("Upload a JSON File", type=["json"], key="ja_json")
+json_file = st.file_uploader("Upload a JSON or JSON Lines File", type=["json", "jsonl", "ndjson"], key="ja_json")
 if json_file:
-    data = json_parser.load_json_data(json_file)
-    tables = json_parser.extract_json_tables(data)
+    file_key = pipeline.upload_key(json_file)
+    if json_parser.is_ndjson_file(json_file):
+        # JSON Lines files hold a single table, which is parsed in parallel chunks.
+        streaming = True
+    else:
+        # Streaming mode indexes the tables in one scan and parses only the selected one.
+        streaming = st.checkbox("Load only the selected table (streaming)",
+                                value=getattr(json_file, "size", 0) > json_parser.STREAMING_THRESHOLD_BYTES,
+                                key="ja_streaming")
+    try:
+        tables = pipeline.json_tables(file_key, streaming, json_file)
+    except ValueError as e:
+        st.error(f"Failed to index JSON file: {e}")
+        tables = {}
     if tables:
-        selected_table = st.selectbox("Select Table", list(tables.keys()), key="ja_table")
-        table_data = tables[selected_table]
-        df = pd.DataFrame(table_data)
+        max_rows = None
+        previewing = False
+        if streaming:
+            selected_table = st.selectbox("Select Table", list(tables.keys()),
+                                          format_func=lambda name: f"{name} ({tables[name]['rows']:,} rows)",
+                                          key="ja_table")
+            max_rows = st.number_input("Max rows to load (0 = all)", min_value=0, value=0, step=10_000,
+                                       key="ja_max_rows") or None
+            # Preview mode starts from a random sample while the full table loads in the background.
+            previewing = st.checkbox("Preview mode (start from a random sample while the full table loads)",
+                                     value=getattr(json_file, "size", 0) > preview.PREVIEW_THRESHOLD_BYTES,
+                                     key="ja_preview")
+        else:
+            selected_table = st.selectbox("Select Table", list(tables.keys()), key="ja_table")
+        # Optional load filter: only the selected keys and matching rows of the table become a frame.
+        filters = pushdown.render_filter_panel(pipeline.table_columns(file_key, selected_table, streaming, json_file),
+                                               "ja_load")
+        frame_key = (file_key, selected_table, streaming, max_rows, pushdown.filters_key(filters))
+        previewing = previewing and not preview.is_loaded(frame_key)
+        try:
+            if previewing:
+                df, total_rows = pipeline.table_preview(file_key, selected_table, max_rows, filters, json_file)
+                preview.load_in_background(frame_key, lambda: pipeline.table_frame(
+                    file_key, selected_table, streaming, max_rows, filters, json_file))
+            else:
+                df = pipeline.table_frame(file_key, selected_table, streaming, max_rows, filters, json_file)
+        except ValueError as e:
+            st.error(f"Failed to load table: {e}")
+            st.stop()
+        if previewing:
+            st.info(f"Preview: {len(df):,} rows sampled at random from {total_rows:,}. The full table is loading "
+                    "in the background; the page updates when it is ready.")
+            with st.expander("Schema (from the sample)"):
+                st.dataframe(preview.schema_frame(df))
+            preview.refresh_when_loaded(frame_key)
+            frame_key = ("preview",) + frame_key
         st.subheader("Data Table")
-        st.dataframe(df)
+        table_view.render_table(df, "ja_data", frame_key)
 
         # Checkbox: Ask user whether to flatten nested JSON columns.
         flatten = st.checkbox("Flatten nested JSON columns", value=True, key="ja_flatten")
 
-        # If flattening is enabled, iterate through columns and flatten any JSON string columns.
+        # If flattening is enabled, flatten all JSON columns in one pass.
+        max_depth = None
+        if flatten:
+            max_depth = st.number_input("Max flatten depth (0 = unlimited)", min_value=0, value=0,
+                                        key="ja_depth") or None
+        df, flat_mapping = pipeline.flattened_frame(frame_key, flatten, max_depth, df)
+        frame_key += (flatten, max_depth)
         if flatten:
-            new_flat_cols = []
-            for col in list(df.columns):
-                df, flat_cols = flatten_json_column(df, col)
-                new_flat_cols.extend(flat_cols)
-            st.write("Flattened columns:", new_flat_cols)
+            st.write("Flattened columns:", [col for cols in flat_mapping.values() for col in cols])
+        # Optional compaction: smaller numeric types and categorical strings.
+        compact_frames = st.checkbox("Compact column types (downcast numbers, categorical strings)", value=True,
+                                     key="ja_compact")
+        df, report = pipeline.compacted_frame(frame_key, compact_frames, df)
+        frame_key = (frame_key, compact_frames)
+        if report:
+            st.caption(compact.format_report(report))
 
         # Use updated DataFrame columns for axis selection.
         available_columns = list(df.columns)
@@ -36,19 +89,41 @@ if json_file:
                               ["Line Chart", "Bar Chart", "Scatter Chart", "Area Chart",
                                "Box Plot", "Histogram", "Violin Plot", "Pie Chart"],
                               key="ja_chart")
+        options = {}
+        # Distributional and categorical charts can be drawn from summaries computed on the server.
+        if chart_type in aggregate.AGGREGATED_CHART_TYPES:
+            options["aggregate"] = st.checkbox("Aggregate on the server", value=True, key="ja_aggregate")
+
+        # Time-series mode: resample timestamps into buckets instead of plotting every sample.
+        time_series = False
+        if chart_type in resample.RESAMPLED_CHART_TYPES:
+            time_series = st.checkbox("Time-series mode (resample into time buckets)", value=False, key="ja_resample")
+        if time_series:
+            bucket = st.selectbox("Bucket", resample.RESAMPLE_BUCKETS, key="ja_bucket")
+            rollup = st.selectbox("Aggregation", resample.RESAMPLE_AGGREGATIONS, key="ja_rollup")
 
         if x_axis != "(none)" and y_axis != "(none)":
-            chart_df = df[[x_axis, y_axis]].dropna().copy()
-            # If x-axis appears to be a timestamp and is numeric, convert it.
-            if "timestamp" in x_axis.lower() and pd.api.types.is_numeric_dtype(chart_df[x_axis]):
-                try:
-                    unit = "ms" if chart_df[x_axis].iloc[0] > 1e10 else "s"
-                    chart_df[x_axis] = pd.to_datetime(chart_df[x_axis], unit=unit)
-                except Exception as e:
-                    st.error(f"Timestamp conversion failed: {e}")
-            fig = chart_utils.build_plotly_chart(chart_df, x_axis, y_axis, chart_type, options={})
-            st.plotly_chart(fig, use_container_width=True)
+            # Projection and timestamp conversion are cached per axis pair.
+            chart_df, error = pipeline.chart_frame(frame_key, x_axis, y_axis, df)
+            if error:
+                st.error(error)
+            if time_series:
+                chart_df, used_bucket, error = pipeline.resampled_frame(frame_key, x_axis, y_axis, bucket, rollup,
+                                                                        None, None, chart_df)
+                if error:
+                    st.error(f"Resampling failed: {error}")
+                else:
+                    st.caption(f"Resampled to {used_bucket} buckets ({rollup}): {len(chart_df):,} points")
+            fig = pipeline.chart_figure(x_axis, y_axis, chart_type, options, False, chart_df)
+            with diagnostics.span("Render chart"):
+                st.plotly_chart(fig, use_container_width=True)
         else:
             st.info("Please select both X and Y axes to generate a chart.")
     else:
         st.error("No valid table found in the JSON file.")
+
+# Dataset and figure cache usage and hit/miss/eviction counters.
+dataset_cache.render_cache_stats()
+figure_cache.render_cache_stats()
+# Per-stage timings, rows and cache use, when diagnostics are enabled.
+diagnostics.render_panel()
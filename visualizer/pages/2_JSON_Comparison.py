@@ -1,49 +1,70 @@
 import streamlit as st
-import pandas as pd
-from visualizer.utils import json_parser, chart_utils
-from visualizer.utils.data_utils import flatten_json_column
+from visualizer.utils import (aggregate, alignment, chart_utils, compact, dataset_cache, diagnostics, downsample,
+                              figure_cache, parallel, pipeline, pushdown, resample, row_diff, stats_utils, table_view)
 
 st.title("JSON Files Comparison")
 
-# Upload two JSON files.
-json_file1 = st.file_uploader("Upload JSON File 1", type=["json"], key="jc_json1")
-json_file2 = st.file_uploader("Upload JSON File 2", type=["json"], key="jc_json2")
-
-if json_file1 and json_file2:
-    data1 = json_parser.load_json_data(json_file1)
-    data2 = json_parser.load_json_data(json_file2)
-
-    tables1 = json_parser.extract_json_tables(data1)
-    tables2 = json_parser.extract_json_tables(data2)
-
-    selected_table = st.selectbox("Select Table", list(tables1.keys()), key="jc_table")
-    table_data1 = tables1[selected_table]
-    table_data2 = tables2.get(selected_table, [])
-
-    df1 = pd.DataFrame(table_data1)
-    df2 = pd.DataFrame(table_data2) if table_data2 else pd.DataFrame()
-
-    st.subheader("File 1 Data")
-    st.dataframe(df1)
-    st.subheader("File 2 Data")
-    st.dataframe(df2)
-
+# Upload the JSON files to compare.
+json_files = st.file_uploader("Upload JSON or JSON Lines Files (two or more)", type=["json", "jsonl", "ndjson"],
+                              accept_multiple_files=True, key="jc_jsons")
+
+if len(json_files) == 1:
+    st.info("Upload at least two JSON files to compare.")
+elif json_files:
+    names = tuple(pipeline.file_labels(json_files))
+    file_keys = [pipeline.upload_key(f) for f in json_files]
+    # All files are parsed, and then prepared, one after another: JSON parsing holds the GIL, so threads would
+    # not overlap it (see parallel.MAX_WORKERS).
+    try:
+        tables = parallel.run_with_progress(
+            [lambda progress, k=k, f=f: pipeline.json_tables(k, False, f) for k, f in zip(file_keys, json_files)],
+            names, ["Parsing"], concurrent=False)
+    except ValueError as e:
+        st.error(f"Failed to parse JSON file: {e}")
+        st.stop()
+
+    selected_table = st.selectbox("Select Table", list(tables[0].keys()), key="jc_table")
+    # Optional load filter on the keys shared by all files: only those selected and matching rows are read.
+    file_columns = [pipeline.table_columns(k, selected_table, False, f) for k, f in zip(file_keys, json_files)]
+    shared_columns = [col for col in file_columns[0] if all(col in columns for columns in file_columns[1:])]
+    filters = pushdown.render_filter_panel(shared_columns, "jc_load")
     # Checkbox: Option to flatten nested JSON columns.
     flatten = st.checkbox("Flatten nested JSON columns", value=True, key="jc_flatten")
+    max_depth = None
     if flatten:
-        new_cols_1 = []
-        for col in list(df1.columns):
-            df1, flat_cols = flatten_json_column(df1, col)
-            new_cols_1.extend(flat_cols)
-        new_cols_2 = []
-        for col in list(df2.columns):
-            df2, flat_cols = flatten_json_column(df2, col)
-            new_cols_2.extend(flat_cols)
-        st.write("Flattened columns in File 1:", new_cols_1)
-        st.write("Flattened columns in File 2:", new_cols_2)
-
-    # For axis selection, we use the updated columns from File 1.
-    available_columns = list(df1.columns)
+        max_depth = st.number_input("Max flatten depth (0 = unlimited)", min_value=0, value=0,
+                                    key="jc_depth") or None
+    # Optional compaction: smaller numeric types and categorical strings.
+    compact_frames = st.checkbox("Compact column types (downcast numbers, categorical strings)", value=True,
+                                 key="jc_compact")
+    try:
+        prepared = parallel.run_with_progress(
+            [lambda progress, k=k, f=f: pipeline.prepared_json_frame(k, selected_table, filters, flatten,
+                                                                      max_depth, compact_frames, f, progress)
+             for k, f in zip(file_keys, json_files)],
+            names, pipeline.JSON_STAGES, concurrent=False)
+    except ValueError as e:
+        st.error(f"Failed to load table: {e}")
+        st.stop()
+    frame_keys = tuple(frame_key for _, _, frame_key, _, _, _ in prepared)
+    dfs = tuple(df for _, _, _, df, _, _ in prepared)
+
+    st.subheader("File Data")
+    shown_file = names.index(st.selectbox("Show file", names, key="jc_data_file"))
+    table_df, table_key, _, _, flat_mapping, _ = prepared[shown_file]
+    table_view.render_table(table_df, "jc_data", table_key)
+    if flatten:
+        st.write("Flattened columns:", [col for cols in flat_mapping.values() for col in cols])
+    for name, (_, _, _, _, _, report) in zip(names, prepared):
+        if report:
+            st.caption(f"{name}: " + compact.format_report(report))
+
+    # Statistics and differences are computed against the baseline file.
+    baseline = names.index(st.selectbox("Baseline file", names, key="jc_baseline"))
+
+    # For axis selection, we use the updated columns from the first file.
+    available_columns = list(dfs[0].columns)
+    common_cols = sorted(set.intersection(*(set(df.columns) for df in dfs)), key=str)
     x_axis = st.selectbox("Select X Axis (optional)", ["(none)"] + available_columns, key="jc_x")
     y_axis = st.selectbox("Select Y Axis (optional)", ["(none)"] + available_columns, key="jc_y")
     chart_type = st.radio("Chart Type",
@@ -78,81 +99,129 @@ if json_file1 and json_file2:
     elif chart_type == "Pie Chart":
         options["donut"] = st.slider("Donut Hole Size", 0.0, 1.0, 0.0, step=0.1, key="jc_donut")
 
+    # Distributional and categorical charts can be drawn from summaries computed on the server.
+    if chart_type in aggregate.AGGREGATED_CHART_TYPES:
+        options["aggregate"] = st.checkbox("Aggregate on the server", value=True, key="jc_aggregate")
+
+    # Downsampling options for point-based charts.
+    zoom = False
+    if chart_type in chart_utils.DOWNSAMPLED_CHART_TYPES:
+        options["downsample"] = st.selectbox("Downsampling", downsample.DOWNSAMPLE_METHODS, index=0,
+                                             key="jc_downsample")
+        options["max_points"] = st.number_input("Max points per trace", min_value=100,
+                                                value=downsample.DEFAULT_MAX_POINTS, step=100,
+                                                key="jc_max_points")
+        zoom = st.checkbox("Re-sample on zoom range", value=False, key="jc_zoom")
+
+    # Time-series mode: resample timestamps into buckets instead of plotting every sample.
+    time_series = False
+    if chart_type in resample.RESAMPLED_CHART_TYPES:
+        time_series = st.checkbox("Time-series mode (resample into time buckets)", value=False, key="jc_resample")
+    if time_series:
+        bucket = st.selectbox("Bucket", resample.RESAMPLE_BUCKETS, key="jc_bucket")
+        rollup = st.selectbox("Aggregation", resample.RESAMPLE_AGGREGATIONS, key="jc_rollup")
+
     if x_axis != "(none)" and y_axis != "(none)":
-        # Build DataFrames and add a "File" column.
-        df1_chart = pd.DataFrame(table_data1)[[x_axis, y_axis]].dropna().copy()
-        df1_chart["File"] = "File 1"
-        df2_chart = pd.DataFrame(table_data2)[[x_axis, y_axis]].dropna().copy() if table_data2 else pd.DataFrame()
-        if not df2_chart.empty:
-            df2_chart["File"] = "File 2"
-        chart_df = pd.concat([df1_chart, df2_chart], ignore_index=True)
-
-        # Convert x-axis to datetime if its name suggests a timestamp.
-        if "timestamp" in x_axis.lower() and pd.api.types.is_numeric_dtype(chart_df[x_axis]):
-            unit = "ms" if chart_df[x_axis].iloc[0] > 1e10 else "s"
-            chart_df[x_axis] = pd.to_datetime(chart_df[x_axis], unit=unit)
+        # Build the combined frame with a categorical "File" column (cached per axis pair).
+        chart_df, chart_parts, error = pipeline.comparison_frame(frame_keys, x_axis, y_axis, dfs, names)
+        if error:
+            st.error(error)
+
+        x_range = None
+        # Identifies the resampling applied to chart_df, e.g. for the combined table's cached row order.
+        resampling = None
+        bounds = downsample.zoom_bounds(chart_df[x_axis]) if zoom else None
+        if bounds is not None and bounds[0] < bounds[1]:
+            x_range = st.slider("Zoom range", min_value=bounds[0], max_value=bounds[1], value=bounds,
+                                key="jc_zoom_range")
+        if time_series:
+            resampling = (bucket, rollup, x_range)
+            # Each file is resampled on its own; the zoom range is applied first, for a finer automatic bucket.
+            chart_df, used_bucket, error = pipeline.resampled_frame(
+                frame_keys, x_axis, y_axis, bucket, rollup, "File", x_range, chart_df)
+            if error:
+                st.error(f"Resampling failed: {error}")
+            else:
+                st.caption(f"Resampled to {used_bucket} buckets ({rollup}): {len(chart_df):,} points")
+        elif x_range is not None:
+            options["x_range"] = x_range
 
         if chart_type != "Pie Chart":
-            fig = chart_utils.build_comparison_chart(chart_df, x_axis, y_axis, chart_type, options)
-            st.plotly_chart(fig, use_container_width=True, key="jc_chart_nonpie")
+            fig = pipeline.chart_figure(x_axis, y_axis, chart_type, options, True, chart_df)
+            with diagnostics.span("Render chart"):
+                st.plotly_chart(fig, use_container_width=True, key="jc_chart_nonpie")
         else:
-            fig1 = chart_utils.build_plotly_chart(df1_chart, x_axis, y_axis, "Pie Chart", options)
-            fig2 = chart_utils.build_plotly_chart(df2_chart, x_axis, y_axis, "Pie Chart", options)
-            st.write("#### File 1 - Pie Chart")
-            st.plotly_chart(fig1, use_container_width=True, key="jc_pie_chart1")
-            st.write("#### File 2 - Pie Chart")
-            st.plotly_chart(fig2, use_container_width=True, key="jc_pie_chart2")
+            for i, (name, part) in enumerate(zip(names, chart_parts)):
+                fig = pipeline.chart_figure(x_axis, y_axis, "Pie Chart", options, False, part)
+                st.write(f"#### {name} - Pie Chart")
+                with diagnostics.span("Render chart"):
+                    st.plotly_chart(fig, use_container_width=True, key=f"jc_pie_chart{i}")
 
         st.subheader("Combined Data Table")
-        st.dataframe(chart_df)
+        table_view.render_table(chart_df, "jc_combined", (frame_keys, x_axis, y_axis, resampling))
+        # Row alignment used by the statistics and the difference chart.
+        st.subheader("Row Alignment")
+        align_mode = st.radio("Align rows by", alignment.ALIGNMENT_MODES, index=0, horizontal=True,
+                              key="jc_align")
+        align_keys, align_on, tolerance = (), None, ""
+        if align_mode == "Key columns":
+            align_keys = tuple(st.multiselect("Key columns", common_cols, key="jc_align_keys"))
+        elif align_mode == "As-of (timestamp)":
+            align_on = st.selectbox("Align on column", common_cols, key="jc_align_on")
+            tolerance = st.text_input("Tolerance (e.g. 5, 500ms, 1s; empty for none)", key="jc_align_tol")
+        align_key = (frame_keys, baseline, align_mode, align_keys, align_on, tolerance)
+        positions, align_errors = pipeline.baseline_alignment(frame_keys, baseline, align_mode, align_keys, align_on,
+                                                              tolerance, dfs)
+        if align_errors:
+            for i, align_error in align_errors.items():
+                st.error(f"Row alignment of {names[i]} failed: {align_error}")
+        else:
+            st.write("Aligned rows with the baseline: " +
+                     ", ".join(f"{names[i]}: {len(pair[0]):,}" for i, pair in positions.items()))
+            if st.checkbox("Show difference chart (each file - baseline)", value=False, key="jc_diff"):
+                diff_df, diff_col, error = pipeline.baseline_difference_frame(align_key, x_axis, y_axis, names,
+                                                                              baseline, dfs, positions)
+                if error:
+                    st.error(error)
+                diff_fig = pipeline.chart_figure(x_axis, diff_col, "Line Chart", {}, True, diff_df)
+                with diagnostics.span("Render chart"):
+                    st.plotly_chart(diff_fig, use_container_width=True, key="jc_diff_chart")
+
         # Statistical Analysis Section.
         st.subheader("Statistical Analysis")
-
-        # Use the original DataFrames (df1 and df2) defined earlier.
-        if 'df1' in globals() and 'df2' in globals():
-            # Identify numeric columns in each file (excluding any non-data columns like "File").
-            numeric_cols_file1 = [col for col in df1.columns if pd.api.types.is_numeric_dtype(df1[col])]
-            numeric_cols_file2 = [col for col in df2.columns if pd.api.types.is_numeric_dtype(df2[col])]
-            # Compute the intersection of numeric columns available in both files.
-            common_numeric_cols = sorted(list(set(numeric_cols_file1).intersection(set(numeric_cols_file2))))
-
-            # Let the user choose numeric columns for analysis; default selection is empty.
-            selected_stats_cols = st.multiselect("Select numeric columns for analysis", common_numeric_cols, default=[],
-                                                 key="jc_stats")
-
-            if selected_stats_cols:
-                stats_results = []
-                for col in selected_stats_cols:
-                    if col in df1.columns and col in df2.columns:
-                        try:
-                            comp_df = pd.concat([
-                                df1[[col]].rename(columns={col: "File 1"}),
-                                df2[[col]].rename(columns={col: "File 2"})
-                            ], axis=1, join="inner").dropna()
-                        except KeyError as e:
-                            st.warning(f"Column {col} is missing in one of the files: {e}")
-                            continue
-                        if not comp_df.empty:
-                            # Convert values to numeric (booleans will be converted to 0/1).
-                            actual = pd.to_numeric(comp_df["File 1"], errors="coerce")
-                            forecast = pd.to_numeric(comp_df["File 2"], errors="coerce")
-                            nonzero = actual != 0
-                            mape = (abs((actual[nonzero] - forecast[nonzero]) / actual[
-                                nonzero])).mean() * 100 if nonzero.sum() > 0 else None
-                            mae = (abs(actual - forecast)).mean()
-                            rmse = ((actual - forecast) ** 2).mean() ** 0.5
-                            stats_results.append({
-                                "Column": col,
-                                "MAPE (%)": mape,
-                                "MAE": mae,
-                                "RMSE": rmse,
-                                "Count": len(comp_df)
-                            })
-                if stats_results:
-                    st.dataframe(pd.DataFrame(stats_results))
-                else:
-                    st.info("No overlapping numeric data found for statistical analysis.")
+        common_numeric_cols = stats_utils.common_numeric_columns(*dfs)
+        # Let the user choose numeric columns for analysis; default selection is empty.
+        selected_stats_cols = st.multiselect("Select numeric columns for analysis", common_numeric_cols, default=[],
+                                             key="jc_stats")
+        if align_errors:
+            st.info("Fix the row alignment to run the statistical analysis.")
+        elif selected_stats_cols:
+            # All selected columns are compared in one vectorized pass per file (cached per selection).
+            stats_df = pipeline.baseline_stats(align_key, tuple(selected_stats_cols), names, baseline, dfs, positions)
+            if not stats_df.empty:
+                st.caption(f"Metrics of each file against the baseline, {names[baseline]}.")
+                with diagnostics.span("Render table", rows=len(stats_df)):
+                    st.dataframe(stats_df)
             else:
-                st.info("No numeric columns selected for analysis.")
+                st.info("No overlapping numeric data found for statistical analysis.")
         else:
-            st.info("Data not loaded properly for statistical analysis.")
+            st.info("No numeric columns selected for analysis.")
+
+    # Row-level diff of one file against the baseline, with rows matched on key columns.
+    st.subheader("Row Differences")
+    others = [name for i, name in enumerate(names) if i != baseline]
+    other = names.index(st.selectbox("Compare with the baseline", others, key="jc_rowdiff_file"))
+    diff_keys = tuple(st.multiselect("Match rows on key columns", common_cols, key="jc_rowdiff_keys"))
+    if st.checkbox("Show row differences", value=False, key="jc_rowdiff"):
+        pair = (dfs[baseline], dfs[other])
+        diff, error = pipeline.row_differences((frame_keys[baseline], frame_keys[other]), diff_keys, pair)
+        if error:
+            st.error(f"Row diff failed: {error}")
+        else:
+            row_diff.render_diff(*pair, diff, diff_keys, (names[baseline], names[other]), "jc_rowdiff")
+
+# Dataset and figure cache usage and hit/miss/eviction counters.
+dataset_cache.render_cache_stats()
+figure_cache.render_cache_stats()
+# Per-stage timings, rows and cache use, when diagnostics are enabled.
+diagnostics.render_panel()
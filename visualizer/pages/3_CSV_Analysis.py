@@ -1,15 +1,45 @@
 import streamlit as st
-import pandas as pd
-from visualizer.utils import csv_parser, chart_utils
+from visualizer.utils import (aggregate, chart_utils, compact, csv_parser, dataset_cache, diagnostics, downsample,
+                              figure_cache, pipeline, preview, pushdown, resample, table_view)
 
 st.title("CSV File Analysis")
 
 # Upload one CSV file (auto-detect delimiter).
 csv_file = st.file_uploader("Upload a CSV File", type=["csv"], key="ca_csv")
 if csv_file:
-    df = csv_parser.auto_read_csv(csv_file)
+    file_key = pipeline.upload_key(csv_file)
+    # Optional load filter: only the selected columns and matching rows are read from the file.
+    filters = pushdown.render_filter_panel(pipeline.csv_columns(file_key, csv_file), "ca_load")
+    frame_key = (file_key, pushdown.filters_key(filters))
+    # Preview mode starts from a random sample while the full file loads in the background.
+    previewing = st.checkbox("Preview mode (start from a random sample while the full file loads)",
+                             value=getattr(csv_file, "size", 0) > preview.PREVIEW_THRESHOLD_BYTES,
+                             key="ca_preview") and not preview.is_loaded(frame_key)
+    try:
+        if previewing:
+            df, total_rows = pipeline.csv_preview(file_key, filters, csv_file)
+            preview.load_in_background(frame_key, lambda: csv_parser.load_csv(csv_file, filters))
+        else:
+            df = pipeline.csv_frame(file_key, filters, csv_file)
+    except ValueError as e:
+        st.error(f"Failed to parse CSV file: {e}")
+        st.stop()
+    if previewing:
+        st.info(f"Preview: {len(df):,} rows sampled at random from {total_rows:,}. The full file is loading in the "
+                "background; the page updates when it is ready.")
+        with st.expander("Schema (from the sample)"):
+            st.dataframe(preview.schema_frame(df))
+        preview.refresh_when_loaded(frame_key)
+        frame_key = ("preview",) + frame_key
+    # Optional compaction: smaller numeric types and categorical strings.
+    compact_frames = st.checkbox("Compact column types (downcast numbers, categorical strings)", value=True,
+                                 key="ca_compact")
+    df, report = pipeline.compacted_frame(frame_key, compact_frames, df)
+    frame_key = (frame_key, compact_frames)
+    if report:
+        st.caption(compact.format_report(report))
     st.subheader("Data Table")
-    st.dataframe(df)
+    table_view.render_table(df, "ca_data", frame_key)
 
     # Get list of columns.
     columns = list(df.columns)
@@ -63,18 +93,57 @@ if csv_file:
         options["donut"] = st.slider(
             "Donut Hole Size", 0.0, 1.0, 0.0, step=0.1, key="ca_donut")
 
+    # Distributional and categorical charts can be drawn from summaries computed on the server.
+    if chart_type in aggregate.AGGREGATED_CHART_TYPES:
+        options["aggregate"] = st.checkbox("Aggregate on the server", value=True, key="ca_aggregate")
+
+    # Downsampling options for point-based charts.
+    zoom = False
+    if chart_type in chart_utils.DOWNSAMPLED_CHART_TYPES:
+        options["downsample"] = st.selectbox(
+            "Downsampling", downsample.DOWNSAMPLE_METHODS, index=0, key="ca_downsample")
+        options["max_points"] = st.number_input(
+            "Max points per trace", min_value=100, value=downsample.DEFAULT_MAX_POINTS, step=100,
+            key="ca_max_points")
+        zoom = st.checkbox("Re-sample on zoom range", value=False, key="ca_zoom")
+
+    # Time-series mode: resample timestamps into buckets instead of plotting every sample.
+    time_series = False
+    if chart_type in resample.RESAMPLED_CHART_TYPES:
+        time_series = st.checkbox("Time-series mode (resample into time buckets)", value=False, key="ca_resample")
+    if time_series:
+        bucket = st.selectbox("Bucket", resample.RESAMPLE_BUCKETS, key="ca_bucket")
+        rollup = st.selectbox("Aggregation", resample.RESAMPLE_AGGREGATIONS, key="ca_rollup")
+
     # Auto-generate chart if both axes are selected.
     if x_axis != "(none)" and y_axis != "(none)":
-        chart_df = df[[x_axis, y_axis]].dropna().copy()
-        # If x-axis appears to be a timestamp and its values are numeric, convert it.
-        if "timestamp" in x_axis.lower() and pd.api.types.is_numeric_dtype(chart_df[x_axis]):
-            try:
-                unit = "ms" if chart_df[x_axis].iloc[0] > 1e10 else "s"
-                chart_df[x_axis] = pd.to_datetime(chart_df[x_axis], unit=unit)
-            except Exception as e:
-                st.error(f"Timestamp conversion failed: {e}")
-        fig = chart_utils.build_plotly_chart(
-            chart_df, x_axis, y_axis, chart_type, options)
-        st.plotly_chart(fig, use_container_width=True)
+        # Projection and timestamp conversion are cached per axis pair.
+        chart_df, error = pipeline.chart_frame(frame_key, x_axis, y_axis, df)
+        if error:
+            st.error(error)
+        x_range = None
+        bounds = downsample.zoom_bounds(chart_df[x_axis]) if zoom else None
+        if bounds is not None and bounds[0] < bounds[1]:
+            x_range = st.slider(
+                "Zoom range", min_value=bounds[0], max_value=bounds[1], value=bounds, key="ca_zoom_range")
+        if time_series:
+            # The zoom range is applied before resampling, so zooming in picks a finer automatic bucket.
+            chart_df, used_bucket, error = pipeline.resampled_frame(frame_key, x_axis, y_axis, bucket, rollup, None,
+                                                                    x_range, chart_df)
+            if error:
+                st.error(f"Resampling failed: {error}")
+            else:
+                st.caption(f"Resampled to {used_bucket} buckets ({rollup}): {len(chart_df):,} points")
+        elif x_range is not None:
+            options["x_range"] = x_range
+        fig = pipeline.chart_figure(x_axis, y_axis, chart_type, options, False, chart_df)
+        with diagnostics.span("Render chart"):
+            st.plotly_chart(fig, use_container_width=True)
     else:
         st.info("Please select both X and Y axes to generate a chart.")
+
+# Dataset and figure cache usage and hit/miss/eviction counters.
+dataset_cache.render_cache_stats()
+figure_cache.render_cache_stats()
+# Per-stage timings, rows and cache use, when diagnostics are enabled.
+diagnostics.render_panel()
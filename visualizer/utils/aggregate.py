@@ -0,0 +1,215 @@
+import numpy as np
+import pandas as pd
+
+# Chart types drawn from server-side summaries instead of raw rows when aggregation is enabled.
+AGGREGATED_CHART_TYPES = ["Bar Chart", "Box Plot", "Histogram", "Violin Plot", "Pie Chart"]
+# Upper bound on histogram bins; "auto" binning on millions of rows can otherwise produce thousands of bins.
+MAX_HISTOGRAM_BINS = 200
+# Individual points drawn per box (outliers, or all points when requested), spread evenly over the sorted values.
+MAX_POINTS_PER_GROUP = 500
+# Quantiles standing in for a group's values in a violin; the kernel density of evenly spaced quantiles follows
+# that of the full data closely.
+VIOLIN_QUANTILES = 512
+
+
+def _group_codes(df, keys):
+    """
+    Factorize the grouping columns.
+    Returns per-row group codes (-1 where a key is missing) and a frame with one row of key values per group,
+    in order of first appearance.
+    """
+    if not keys:
+        return np.zeros(len(df), dtype=np.int64), pd.DataFrame(index=range(1))
+    if len(keys) == 1:
+        codes, uniques = pd.factorize(df[keys[0]])
+        return codes, pd.DataFrame({keys[0]: uniques})
+    # Columns are factorized one at a time and combined; this is much faster than a MultiIndex on strings.
+    combined = np.zeros(len(df), dtype=np.int64)
+    missing = np.zeros(len(df), dtype=bool)
+    for key in keys:
+        key_codes, key_uniques = pd.factorize(df[key])
+        missing |= key_codes < 0
+        combined, _ = pd.factorize(combined * (len(key_uniques) + 1) + key_codes + 1)
+    present = np.flatnonzero(~missing)
+    codes = np.full(len(df), -1, dtype=np.int64)
+    codes[present], _ = pd.factorize(combined[present])
+    _, first = np.unique(codes[present], return_index=True)
+    return codes, df[list(keys)].iloc[present[first]].reset_index(drop=True)
+
+
+def _sorted_groups(df, keys, y_col):
+    """
+    Sort the numeric values of `y_col` by group and value in one pass.
+    Returns the group key frame, the sorted values, the group code of each sorted value, and each group's start
+    offset and size in the sorted values.
+    """
+    codes, labels = _group_codes(df, keys)
+    values = pd.to_numeric(df[y_col], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    valid = (codes >= 0) & ~np.isnan(values)
+    codes, values = codes[valid], values[valid]
+    # Sorting by value and then stably by group is faster than np.lexsort on both keys.
+    order = np.argsort(values)
+    order = order[np.argsort(codes[order], kind="stable")]
+    codes, values = codes[order], values[order]
+    counts = np.bincount(codes, minlength=len(labels))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    return labels, values, codes, starts, counts
+
+
+def _group_quantiles(values, starts, counts, q):
+    """Linearly interpolated quantile `q` of each group of sorted `values` (groups must not be empty)."""
+    position = starts + q * (counts - 1)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, starts + counts - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def _spread_sample(mask, codes, n_groups, limit):
+    """
+    Return the positions where `mask` is set, keeping at most about `limit` per group by taking every k-th one;
+    positions are sorted by value within a group, so the kept points span the group's whole range.
+    """
+    positions = np.flatnonzero(mask)
+    groups = codes[positions]
+    sizes = np.bincount(groups, minlength=n_groups)
+    first = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    rank = np.arange(len(positions)) - first[groups]
+    stride = np.maximum(1, -(-sizes // limit))
+    return positions[rank % stride[groups] == 0]
+
+
+def group_sums(df, x_col, y_col, group_col=None):
+    """
+    Sum `y_col` per value of `x_col` (and per `group_col` if given), in order of first appearance.
+    This is what Plotly draws for stacked bars and pie slices, with one row per group instead of per record.
+    """
+    keys = [group_col, x_col] if group_col else [x_col]
+    values = pd.to_numeric(df[y_col], errors="coerce")
+    sums = values.groupby([df[key] for key in keys], sort=False, observed=True).sum()
+    return sums.reset_index()
+
+
+def box_stats(df, x_col, y_col, group_col=None, points="outliers"):
+    """
+    Compute box plot statistics of `y_col` per value of `x_col` (and per `group_col` if given).
+    Returns a frame with the group keys and q1, median, q3, lowerfence, upperfence, mean, notchspan and count
+    (fences as in Plotly: the most extreme values within 1.5 IQR of the box), and a frame with the individual
+    points to draw: a spread sample of the outliers ("outliers"), of all values ("all"), or none.
+    """
+    keys = [group_col, x_col] if group_col else [x_col]
+    labels, values, codes, starts, counts = _sorted_groups(df, keys, y_col)
+    present = counts > 0
+    labels, starts, counts = labels[present].reset_index(drop=True), starts[present], counts[present]
+    # Renumber the codes so they index the non-empty groups.
+    codes = np.cumsum(present)[codes] - 1
+
+    q1, median, q3 = (_group_quantiles(values, starts, counts, q) for q in (0.25, 0.5, 0.75))
+    iqr = q3 - q1
+    inside = (values >= (q1 - 1.5 * iqr)[codes]) & (values <= (q3 + 1.5 * iqr)[codes])
+    with np.errstate(invalid="ignore"):
+        lowerfence = np.fmin.reduceat(np.where(inside, values, np.nan), starts) if len(starts) else q1
+        upperfence = np.fmax.reduceat(np.where(inside, values, np.nan), starts) if len(starts) else q3
+    stats = labels.assign(
+        q1=q1, median=median, q3=q3, lowerfence=lowerfence, upperfence=upperfence,
+        mean=np.bincount(codes, weights=values, minlength=len(counts)) / counts,
+        notchspan=1.57 * iqr / np.sqrt(counts), count=counts,
+    )
+
+    if points in ("outliers", "suspectedoutliers"):
+        mask = ~inside
+    elif points == "all":
+        mask = np.ones(len(values), dtype=bool)
+    else:
+        mask = np.zeros(len(values), dtype=bool)
+    picked = _spread_sample(mask, codes, len(counts), MAX_POINTS_PER_GROUP)
+    point_df = labels.iloc[codes[picked]].reset_index(drop=True).assign(**{y_col: values[picked]})
+    return stats, point_df
+
+
+def violin_sample(df, x_col, y_col, group_col=None, n_quantiles=VIOLIN_QUANTILES):
+    """
+    Reduce each group of `y_col` (per `x_col`, and per `group_col` if given) to at most `n_quantiles` evenly
+    spaced quantiles, so the browser estimates each violin's density from a bounded number of values.
+    Groups that are already small enough are kept as they are.
+    """
+    keys = [group_col, x_col] if group_col else [x_col]
+    labels, values, codes, starts, counts = _sorted_groups(df, keys, y_col)
+    small = counts[codes] <= n_quantiles
+    q = np.linspace(0.0, 1.0, n_quantiles)
+    large = np.flatnonzero(counts > n_quantiles)
+    sampled = _group_quantiles(values, np.repeat(starts[large], n_quantiles), np.repeat(counts[large], n_quantiles),
+                               np.tile(q, len(large)))
+    group_codes = np.concatenate([codes[small], np.repeat(large, n_quantiles)])
+    sample_values = np.concatenate([values[small], sampled])
+    return labels.iloc[group_codes].reset_index(drop=True).assign(**{y_col: sample_values})
+
+
+def _normalize_counts(counts, widths, histnorm):
+    """Apply a Plotly histnorm to one group's bin counts."""
+    total = counts.sum()
+    if histnorm == "percent":
+        return counts / total * 100 if total else counts.astype("float64")
+    if histnorm == "probability":
+        return counts / total if total else counts.astype("float64")
+    if histnorm == "density":
+        return counts / widths
+    if histnorm == "probability density":
+        return counts / (total * widths) if total else counts.astype("float64")
+    return counts
+
+
+def histogram_counts(df, x_col, group_col=None, histnorm="", max_bins=MAX_HISTOGRAM_BINS):
+    """
+    Bin `x_col` on the server, separately per `group_col` value if given, using bin edges shared by all groups.
+    Numeric and datetime columns get at most `max_bins` equal-width bins; other columns are counted per value.
+    Returns a frame with the group key, "x" (bin centre or value), "width" (bin width; milliseconds for
+    datetimes, as Plotly expects on date axes) and "y" (the count, normalized per group as by Plotly's histnorm).
+    """
+    series = df[x_col]
+    keys = [group_col] if group_col else []
+    codes, labels = _group_codes(df, keys)
+    n_groups = len(labels)
+    is_datetime = pd.api.types.is_datetime64_any_dtype(series)
+    if is_datetime or pd.api.types.is_numeric_dtype(series):
+        if is_datetime:
+            values = series.to_numpy(dtype="datetime64[ns]").astype("int64").astype("float64")
+            values[series.isna().to_numpy()] = np.nan
+        else:
+            values = pd.to_numeric(series, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        valid = (codes >= 0) & np.isfinite(values)
+        values, codes = values[valid], codes[valid]
+        if len(values):
+            edges = np.histogram_bin_edges(values, bins="auto")
+            if len(edges) - 1 > max_bins:
+                edges = np.linspace(edges[0], edges[-1], max_bins + 1)
+        else:
+            edges = np.array([0.0, 1.0])
+        n_bins = len(edges) - 1
+        bins = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, n_bins - 1)
+        counts = np.bincount(codes * n_bins + bins, minlength=n_groups * n_bins).reshape(n_groups, n_bins)
+        centers = (edges[:-1] + edges[1:]) / 2
+        widths = np.diff(edges)
+        if is_datetime:
+            x = pd.to_datetime(centers.astype("int64"))
+            plot_widths = widths / 1e6
+        else:
+            x, plot_widths = centers, widths
+        frames = []
+        for i in range(n_groups):
+            frame = pd.DataFrame({"x": x, "width": plot_widths,
+                                  "y": _normalize_counts(counts[i], widths, histnorm)})
+            frames.append(frame.assign(**labels.iloc[i].to_dict()))
+    else:
+        valid = (codes >= 0) & series.notna().to_numpy()
+        value_codes, uniques = pd.factorize(series[valid])
+        codes = codes[valid]
+        n_values = len(uniques)
+        counts = np.bincount(codes * n_values + value_codes, minlength=n_groups * n_values).reshape(n_groups,
+                                                                                                     n_values)
+        frames = []
+        for i in range(n_groups):
+            present = counts[i] > 0
+            frame = pd.DataFrame({"x": np.asarray(uniques)[present], "width": np.nan,
+                                  "y": _normalize_counts(counts[i][present], np.ones(present.sum()), histnorm)})
+            frames.append(frame.assign(**labels.iloc[i].to_dict()))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=keys + ["x", "width", "y"])
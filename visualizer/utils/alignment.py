@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+ALIGNMENT_MODES = ["Row position", "Key columns", "As-of (timestamp)"]
+
+
+def _occurrence_codes(left_keys, right_keys):
+    """
+    Encode each row's key values, plus how many times that key has already occurred in its frame,
+    as one int64 code shared by both frames. Codes are unique within a frame, so the n-th occurrence of
+    a key in File 1 pairs with its n-th occurrence in File 2.
+    """
+    n_left = len(left_keys)
+    combined = pd.concat([left_keys, right_keys], ignore_index=True)
+    codes = np.zeros(len(combined), dtype=np.int64)
+    for col in combined.columns:
+        col_codes, uniques = pd.factorize(combined[col], use_na_sentinel=False)
+        # Re-factorizing after each column keeps the combined codes dense, so they cannot overflow.
+        codes, _ = pd.factorize(codes * (len(uniques) + 1) + col_codes)
+    left, right = codes[:n_left], codes[n_left:]
+    left_occurrence = pd.Series(left).groupby(left).cumcount().to_numpy()
+    right_occurrence = pd.Series(right).groupby(right).cumcount().to_numpy()
+    radix = max(left_occurrence.max(initial=0), right_occurrence.max(initial=0)) + 1
+    return left * radix + left_occurrence, right * radix + right_occurrence
+
+
+def key_positions(df1, df2, keys):
+    """
+    Exact join on the key columns using a sort-merge over integer key codes.
+    Returns the matching row positions (pos1, pos2), ordered as in File 1.
+    """
+    left, right = _occurrence_codes(df1[list(keys)], df2[list(keys)])
+    _, pos1, pos2 = np.intersect1d(left, right, assume_unique=True, return_indices=True)
+    order = np.argsort(pos1, kind="stable")
+    return pos1[order], pos2[order]
+
+
+def parse_tolerance(text, series):
+    """
+    Convert a tolerance typed by the user into a value matching `series`: a Timedelta for datetime columns
+    (e.g. "500ms", "1s") and a number otherwise. Returns None for an empty string.
+    """
+    text = str(text).strip()
+    if not text:
+        return None
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return pd.Timedelta(text)
+    if pd.api.types.is_integer_dtype(series):
+        return int(float(text))
+    return float(text)
+
+
+def _common_keys(left, right):
+    """
+    Cast two NumPy key arrays to one dtype, as merge_asof requires: files compacted on their own may hold the
+    same column as e.g. int8 and int16, or datetimes in different units.
+    """
+    if left.dtype != right.dtype and left.dtype != object and right.dtype != object:
+        dtype = np.result_type(left.dtype, right.dtype)
+        return left.astype(dtype, copy=False), right.astype(dtype, copy=False)
+    return left, right
+
+
+def asof_positions(df1, df2, on, tolerance=None):
+    """
+    Sorted as-of join on the `on` column: each File 1 row is paired with the File 2 row whose `on` value is
+    nearest, within `tolerance` if given. Rows with no match are dropped.
+    Returns the matching row positions (pos1, pos2), ordered by `on`.
+    """
+    keys1, keys2 = _common_keys(df1[on].to_numpy(), df2[on].to_numpy())
+    left = pd.DataFrame({on: keys1, "_pos1": np.arange(len(df1))}).dropna(subset=[on])
+    right = pd.DataFrame({on: keys2, "_pos2": np.arange(len(df2))}).dropna(subset=[on])
+    merged = pd.merge_asof(left.sort_values(on, kind="stable"), right.sort_values(on, kind="stable"), on=on,
+                           direction="nearest", tolerance=tolerance).dropna(subset=["_pos2"])
+    return merged["_pos1"].to_numpy(dtype=np.int64), merged["_pos2"].to_numpy(dtype=np.int64)
+
+
+def position_positions(df1, df2):
+    """Pair rows that share an index label (the original behaviour for default RangeIndex frames)."""
+    common = df1.index.intersection(df2.index)
+    return df1.index.get_indexer(common), df2.index.get_indexer(common)
+
+
+def align_positions(df1, df2, mode, keys=(), on=None, tolerance=None):
+    """
+    Return the row positions (pos1, pos2) that pair File 1 with File 2 under the given alignment mode
+    (one of ALIGNMENT_MODES).
+    """
+    if mode == "Key columns":
+        if not keys:
+            raise ValueError("Select at least one key column.")
+        return key_positions(df1, df2, keys)
+    if mode == "As-of (timestamp)":
+        if on is None:
+            raise ValueError("Select a column to align on.")
+        return asof_positions(df1, df2, on, parse_tolerance(tolerance, df1[on]) if tolerance else None)
+    return position_positions(df1, df2)
+
+
+def take_aligned(df, positions, columns):
+    """Return the given columns at the aligned row positions, re-indexed from 0."""
+    return df[list(columns)].iloc[positions].reset_index(drop=True)
+
+
+def difference_frame(df1, df2, positions, x_col, y_col):
+    """Return a frame with File 1's x values and the aligned difference File 2 - File 1 of `y_col`."""
+    pos1, pos2 = positions
+    left = take_aligned(df1, pos1, [x_col, y_col])
+    right = take_aligned(df2, pos2, [y_col])
+    diff_col = f"{y_col} difference"
+    # Differences are taken in float64 so that compacted integer columns cannot overflow.
+    diff = (pd.to_numeric(right[y_col], errors="coerce").astype("float64")
+            - pd.to_numeric(left[y_col], errors="coerce").astype("float64"))
+    return pd.DataFrame({x_col: left[x_col], diff_col: diff}).dropna(), diff_col
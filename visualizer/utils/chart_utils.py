@@ -1,4 +1,196 @@
+import os
+
+import numpy as np
+import plotly.colors
 import plotly.express as px
+import plotly.graph_objects as go
+
+from visualizer.utils import aggregate, downsample, resample
+
+# Chart types whose points are thinned by the downsampling stage before being handed to Plotly.
+DOWNSAMPLED_CHART_TYPES = ["Line Chart", "Scatter Chart", "Area Chart"]
+# Line and scatter traces are drawn with WebGL (Scattergl) when the chart has more points than this.
+WEBGL_THRESHOLD = int(os.environ.get("VISUALIZER_WEBGL_THRESHOLD", "1000"))
+# Floating-point arrays are sent to the browser as "float64" or, to halve their size, "float32".
+FLOAT_PRECISION = os.environ.get("VISUALIZER_FLOAT_PRECISION", "float64")
+
+# Per-point trace attributes sent as typed binary arrays.
+_ARRAY_ATTRIBUTES = ("x", "y", "q1", "median", "q3", "lowerfence", "upperfence", "mean", "notchspan", "width",
+                     "values")
+
+
+def render_mode(n_points, options):
+    """
+    Return the Plotly Express render mode for a line or scatter chart of `n_points` points: "webgl" above
+    WEBGL_THRESHOLD, "svg" otherwise. Spline lines stay SVG, since WebGL traces cannot draw them.
+    """
+    if n_points > WEBGL_THRESHOLD and not options.get("smooth_lines", False):
+        return "webgl"
+    return "svg"
+
+
+def _narrow_floats(array):
+    """
+    Return `array` as float32 if that still resolves its values to well below a pixel (a spacing under
+    1/10000 of their range), and unchanged otherwise, e.g. for epoch timestamps, whose range is tiny next to
+    their magnitude.
+    """
+    finite = array[np.isfinite(array)]
+    if array.dtype == np.float32 or not len(finite):
+        return array.astype("float32")
+    low, high = finite.min(), finite.max()
+    if np.spacing(np.float32(max(abs(low), abs(high)))) > (high - low) * 1e-4:
+        return array
+    return array.astype("float32")
+
+
+def compact_payload(fig, precision=None):
+    """
+    Shrink the data arrays of `fig` before it is sent to the browser. Plotly serializes NumPy arrays as typed
+    base64 buffers rather than JSON lists, so every per-point array is made a NumPy array; datetimes of line
+    and scatter traces are sent as epoch milliseconds on a date axis instead of ISO strings; and with
+    `precision` "float32" (default FLOAT_PRECISION) floating-point arrays take half the bytes where float32 keeps
+    them exact to well below a pixel.
+    """
+    precision = precision or FLOAT_PRECISION
+    date_axes = set()
+    for trace in fig.data:
+        for attr in _ARRAY_ATTRIBUTES:
+            values = getattr(trace, attr, None) if hasattr(trace, attr) else None
+            if values is None or isinstance(values, (str, dict)):
+                continue
+            array = np.asarray(values)
+            if array.dtype.kind == "M" and attr in ("x", "y") and trace.type in ("scatter", "scattergl"):
+                millis = array.astype("datetime64[ms]")
+                array = np.where(np.isnat(millis), np.nan, millis.astype("int64").astype("float64"))
+                date_axes.add(attr + "axis" + (getattr(trace, attr + "axis") or attr)[1:])
+            elif array.dtype.kind == "f" and precision == "float32":
+                array = _narrow_floats(array)
+            elif array.dtype.kind not in "iuf":
+                continue
+            trace[attr] = array
+    for axis in date_axes:
+        fig.layout[axis].type = "date"
+    return fig
+
+
+def _downsample_for_chart(df, x_col, y_col, chart_type, options, group_col=None):
+    """
+    Apply the downsampling stage for point-based chart types.
+    Returns the (possibly reduced) DataFrame and the number of points it was sampled from.
+    """
+    if chart_type not in DOWNSAMPLED_CHART_TYPES:
+        return df, len(df)
+    return downsample.downsample_frame(
+        df,
+        x_col,
+        y_col,
+        max_points=options.get("max_points", downsample.DEFAULT_MAX_POINTS),
+        method=options.get("downsample", "lttb"),
+        group_col=group_col,
+        x_range=options.get("x_range"),
+    )
+
+
+def _add_sampling_note(fig, shown, total):
+    """Annotate the figure with a "showing N of M points" note when points were dropped."""
+    if fig is not None and shown < total:
+        fig.add_annotation(
+            text=f"Showing {shown:,} of {total:,} points",
+            xref="paper",
+            yref="paper",
+            x=1,
+            y=1,
+            xanchor="right",
+            yanchor="bottom",
+            showarrow=False,
+            font={"size": 11, "color": "gray"}
+        )
+
+
+def _add_band(fig, df, x_col, y_col, group_col=None):
+    """
+    Shade the min/max band of a resampled frame (see resample.band_columns) behind each trace, in the trace's
+    color. Does nothing if the frame has no band columns.
+    """
+    low, high = resample.band_columns(y_col)
+    if fig is None or low not in df.columns:
+        return
+    for i, trace in enumerate(list(fig.data)):
+        part = df if group_col is None else df[df[group_col] == trace.name]
+        color = trace.line.color or trace.marker.color or px.colors.qualitative.Plotly[i % 10]
+        rgb = plotly.colors.convert_colors_to_same_type([color], colortype="rgb")[0][0]
+        fill = rgb.replace("rgb(", "rgba(").replace(")", ", 0.2)")
+        # The band is drawn as the max line followed by the min line filled up to it.
+        scatter = go.Scattergl if len(part) > WEBGL_THRESHOLD else go.Scatter
+        for col, fill_mode in ((high, None), (low, "tonexty")):
+            fig.add_trace(scatter(
+                x=part[x_col].to_numpy(), y=part[col].to_numpy(), mode="lines", line={"width": 0},
+                fill=fill_mode, fillcolor=fill, legendgroup=trace.name, showlegend=False, hoverinfo="skip"
+            ))
+
+
+def _aggregating(options, chart_type, x_col, y_col):
+    """Whether the chart should be drawn from server-side summaries (see visualizer.utils.aggregate)."""
+    return options.get("aggregate", False) and chart_type in aggregate.AGGREGATED_CHART_TYPES and x_col != y_col
+
+
+def _group_values(df, group_col):
+    """Return the values of `group_col` in order of first appearance, or [None] when there is no grouping."""
+    return list(df[group_col].unique()) if group_col else [None]
+
+
+def _precomputed_box_figure(df, x_col, y_col, options, title, group_col=None):
+    """
+    Draw box plots from quartiles, fences and a bounded sample of points computed on the server, with one
+    box trace (plus a marker trace for its points) per `group_col` value.
+    """
+    points = options.get("points", "outliers")
+    stats, point_df = aggregate.box_stats(df, x_col, y_col, group_col, points=points or "none")
+    notched = options.get("notched", False)
+    colors = px.colors.qualitative.Plotly
+    fig = go.Figure()
+    for i, group in enumerate(_group_values(stats, group_col)):
+        box = stats if group is None else stats[stats[group_col] == group]
+        sample = point_df if group is None else point_df[point_df[group_col] == group]
+        name = y_col if group is None else str(group)
+        color = colors[i % len(colors)]
+        fig.add_trace(go.Box(
+            x=box[x_col].to_numpy(), q1=box["q1"].to_numpy(), median=box["median"].to_numpy(),
+            q3=box["q3"].to_numpy(), lowerfence=box["lowerfence"].to_numpy(),
+            upperfence=box["upperfence"].to_numpy(), mean=box["mean"].to_numpy(),
+            notchspan=box["notchspan"].to_numpy() if notched else None, notched=notched, boxpoints=False,
+            name=name, legendgroup=name, offsetgroup=name, marker_color=color, showlegend=group is not None
+        ))
+        # A marker trace is added for every group, even without points, so the grouped offsets line up.
+        fig.add_trace(go.Scatter(
+            x=sample[x_col].to_numpy(), y=sample[y_col].to_numpy(), mode="markers", name=name, legendgroup=name,
+            offsetgroup=name, marker={"color": color, "size": 4}, showlegend=False
+        ))
+    fig.update_layout(title=title, boxmode="group", scattermode="group", xaxis_title=x_col, yaxis_title=y_col,
+                      legend_title_text=group_col)
+    return fig
+
+
+def _prebinned_histogram_figure(df, x_col, options, title, group_col=None):
+    """Draw a histogram as bars over bin counts computed on the server, one bar trace per `group_col` value."""
+    histnorm = options.get("histnorm", "count")
+    if histnorm == "count":
+        histnorm = ""
+    counts = aggregate.histogram_counts(df, x_col, group_col, histnorm=histnorm)
+    colors = px.colors.qualitative.Plotly
+    fig = go.Figure()
+    for i, group in enumerate(_group_values(counts, group_col)):
+        bins = counts if group is None else counts[counts[group_col] == group]
+        widths = bins["width"].to_numpy()
+        fig.add_trace(go.Bar(
+            x=bins["x"].to_numpy(), y=bins["y"].to_numpy(), width=None if bins["width"].isna().all() else widths,
+            name=x_col if group is None else str(group), marker_color=colors[i % len(colors)],
+            opacity=0.6 if group_col else None, showlegend=group is not None
+        ))
+    fig.update_layout(title=title, barmode="overlay", bargap=0, xaxis_title=x_col, yaxis_title=histnorm or "count",
+                      legend_title_text=group_col)
+    return fig
 
 
 def build_plotly_chart(df, x_col, y_col, chart_type, options):
@@ -13,7 +205,17 @@ def build_plotly_chart(df, x_col, y_col, chart_type, options):
       - "Histogram"
       - "Violin Plot"
       - "Pie Chart"
+    Line, Scatter and Area charts are downsampled to `options["max_points"]` points
+    (see visualizer.utils.downsample). With `options["aggregate"]`, Bar, Box, Histogram, Violin and Pie charts are
+    drawn from summaries computed on the server (see visualizer.utils.aggregate). Frames resampled with a
+    min/max band (see visualizer.utils.resample) are drawn with the band shaded around the line.
     """
+    df, total_points = _downsample_for_chart(df, x_col, y_col, chart_type, options)
+    aggregated = _aggregating(options, chart_type, x_col, y_col)
+    if aggregated and chart_type in ["Bar Chart", "Pie Chart"]:
+        df = aggregate.group_sums(df, x_col, y_col)
+    elif aggregated and chart_type == "Violin Plot":
+        df = aggregate.violin_sample(df, x_col, y_col)
     if chart_type == "Line Chart":
         line_shape = "spline" if options.get(
             "smooth_lines", False) else "linear"
@@ -23,6 +225,7 @@ def build_plotly_chart(df, x_col, y_col, chart_type, options):
             y=y_col,
             markers=options.get("show_markers", False),
             line_shape=line_shape,
+            render_mode=render_mode(len(df), options),
             title=f"{chart_type}: {y_col} vs {x_col}"
         )
     elif chart_type == "Bar Chart":
@@ -40,7 +243,8 @@ def build_plotly_chart(df, x_col, y_col, chart_type, options):
             x=x_col,
             y=y_col,
             title=f"{chart_type}: {y_col} vs {x_col}",
-            opacity=options.get("opacity", 0.8)
+            opacity=options.get("opacity", 0.8),
+            render_mode=render_mode(len(df), options)
         )
     elif chart_type == "Area Chart":
         line_shape = "spline" if options.get(
@@ -52,6 +256,8 @@ def build_plotly_chart(df, x_col, y_col, chart_type, options):
             title=f"{chart_type}: {y_col} vs {x_col}",
             line_shape=line_shape
         )
+    elif chart_type == "Box Plot" and aggregated:
+        fig = _precomputed_box_figure(df, x_col, y_col, options, f"{chart_type}: {y_col} by {x_col}")
     elif chart_type == "Box Plot":
         points = options.get("points", "outliers")
         if points == "none":
@@ -64,6 +270,8 @@ def build_plotly_chart(df, x_col, y_col, chart_type, options):
             notched=options.get("notched", False),
             points=points
         )
+    elif chart_type == "Histogram" and aggregated:
+        fig = _prebinned_histogram_figure(df, x_col, options, f"{chart_type}: {x_col} distribution")
     elif chart_type == "Histogram":
         # Use an empty string as default for histnorm.
         histnorm = options.get("histnorm", "count")
@@ -103,20 +311,33 @@ def build_plotly_chart(df, x_col, y_col, chart_type, options):
             y=y_col,
             markers=options.get("show_markers", False),
             line_shape=line_shape,
+            render_mode=render_mode(len(df), options),
             title=f"Line Chart: {y_col} vs {x_col}"
         )
     # Apply fill area for Line and Area charts if selected.
     if chart_type in ["Line Chart", "Area Chart"] and options.get("fill_area", False):
         fig.for_each_trace(lambda t: t.update(fill="tozeroy"))
-    return fig
+    if chart_type in resample.RESAMPLED_CHART_TYPES:
+        _add_band(fig, df, x_col, y_col)
+    _add_sampling_note(fig, len(df), total_points)
+    return compact_payload(fig)
 
 
 def build_comparison_chart(df, x_col, y_col, chart_type, options):
     """
-    Build a comparison Plotly Express chart for two files.
-    Expects `df` to have a "File" column that distinguishes the data.
+    Build a comparison Plotly Express chart for any number of files.
+    Expects `df` to have a "File" column (categorical or strings) that distinguishes the data, one trace
+    color per file.
     Supported chart types are similar to build_plotly_chart.
+    Line, Scatter and Area charts are downsampled per "File" group; with `options["aggregate"]`, Bar, Box,
+    Histogram and Violin charts are drawn from per-File summaries computed on the server.
     """
+    df, total_points = _downsample_for_chart(df, x_col, y_col, chart_type, options, group_col="File")
+    aggregated = _aggregating(options, chart_type, x_col, y_col)
+    if aggregated and chart_type == "Bar Chart":
+        df = aggregate.group_sums(df, x_col, y_col, group_col="File")
+    elif aggregated and chart_type == "Violin Plot":
+        df = aggregate.violin_sample(df, x_col, y_col, group_col="File")
     if chart_type == "Line Chart":
         line_shape = "spline" if options.get(
             "smooth_lines", False) else "linear"
@@ -127,6 +348,7 @@ def build_comparison_chart(df, x_col, y_col, chart_type, options):
             color="File",
             markers=options.get("show_markers", False),
             line_shape=line_shape,
+            render_mode=render_mode(len(df), options),
             title=f"{chart_type}: {y_col} vs {x_col}"
         )
     elif chart_type == "Bar Chart":
@@ -146,7 +368,8 @@ def build_comparison_chart(df, x_col, y_col, chart_type, options):
             y=y_col,
             color="File",
             title=f"{chart_type}: {y_col} vs {x_col}",
-            opacity=options.get("opacity", 0.8)
+            opacity=options.get("opacity", 0.8),
+            render_mode=render_mode(len(df), options)
         )
     elif chart_type == "Area Chart":
         line_shape = "spline" if options.get(
@@ -159,6 +382,9 @@ def build_comparison_chart(df, x_col, y_col, chart_type, options):
             title=f"{chart_type}: {y_col} vs {x_col}",
             line_shape=line_shape
         )
+    elif chart_type == "Box Plot" and aggregated:
+        fig = _precomputed_box_figure(df, x_col, y_col, options, f"{chart_type}: {y_col} by {x_col}",
+                                      group_col="File")
     elif chart_type == "Box Plot":
         notched = options.get("notched", False)
         points = options.get("points", "outliers")
@@ -173,6 +399,9 @@ def build_comparison_chart(df, x_col, y_col, chart_type, options):
             notched=notched,
             points=points
         )
+    elif chart_type == "Histogram" and aggregated:
+        fig = _prebinned_histogram_figure(df, x_col, options, f"{chart_type}: {x_col} distribution by File",
+                                          group_col="File")
     elif chart_type == "Histogram":
         histnorm = options.get("histnorm", "count")
         if histnorm == "count":
@@ -212,6 +441,7 @@ def build_comparison_chart(df, x_col, y_col, chart_type, options):
             color="File",
             markers=options.get("show_markers", False),
             line_shape=line_shape,
+            render_mode=render_mode(len(df), options),
             title=f"Line Chart: {y_col} vs {x_col}"
         )
 
@@ -220,13 +450,16 @@ def build_comparison_chart(df, x_col, y_col, chart_type, options):
         fig.for_each_trace(lambda t: t.update(fill="tozeroy"))
 
     # Update hover template for each trace if x and y data exist.
+    # The file name is read from the trace itself, so no per-point data is attached.
     if fig is not None:
         for trace in fig.data:
             if hasattr(trace, "x") and trace.x is not None and hasattr(trace, "y") and trace.y is not None:
                 trace.hovertemplate = (
-                    "File: %{customdata}<br>" +
+                    "File: %{fullData.name}<br>" +
                     f"{x_col}: %{{x}}<br>" +
                     f"{y_col}: %{{y}}<extra></extra>"
                 )
-                trace.customdata = [trace.name] * len(trace.x)
-    return fig
+    if chart_type in resample.RESAMPLED_CHART_TYPES:
+        _add_band(fig, df, x_col, y_col, group_col="File")
+    _add_sampling_note(fig, len(df), total_points)
+    return fig if fig is None else compact_payload(fig)
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# String columns whose distinct values make up at most this share of the rows are stored as categoricals.
+CATEGORY_MAX_RATIO = 0.5
+# Rows checked first when deciding on a categorical; columns already too diverse in the sample are not counted
+# in full.
+CATEGORY_SAMPLE_ROWS = 10_000
+
+# Only signed types: unsigned columns would wrap around when differences are taken.
+_INT_TYPES = [np.int8, np.int16, np.int32, np.int64]
+
+
+def _downcast_integers(series):
+    """Return the smallest integer dtype that holds every value of an integer column."""
+    values = series.to_numpy()
+    if not len(values):
+        return series.dtype
+    low, high = values.min(), values.max()
+    for dtype in _INT_TYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(dtype)
+    return series.dtype
+
+
+def _downcast_floats(series):
+    """Return float32 if it represents every value of a float64 column exactly, else the current dtype."""
+    if series.dtype != np.float64:
+        return series.dtype
+    values = series.to_numpy()
+    with np.errstate(over="ignore", invalid="ignore"):
+        narrow = values.astype(np.float32)
+    # Equal values or both NaN; timestamps and other wide values keep their float64 precision.
+    lossless = (narrow == values) | (np.isnan(narrow) & np.isnan(values))
+    return np.dtype(np.float32) if lossless.all() else series.dtype
+
+
+def _string_dtype(series, category_max_ratio):
+    """
+    Return the compact dtype for a column of strings: "category" when few distinct values repeat, else
+    Arrow-backed strings when pyarrow is installed. Returns None for columns that are not purely strings.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return None
+    if not (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)):
+        return None
+    if pd.api.types.is_object_dtype(series) and pd.api.types.infer_dtype(series, skipna=True) != "string":
+        return None
+    n = series.count()
+    if n > CATEGORY_SAMPLE_ROWS:
+        sample = series.iloc[np.linspace(0, len(series) - 1, CATEGORY_SAMPLE_ROWS, dtype=np.int64)]
+        repetitive = sample.nunique() <= category_max_ratio * sample.count()
+    else:
+        repetitive = True
+    if n and repetitive and series.nunique() <= category_max_ratio * n:
+        return "category"
+    if HAS_PYARROW and not isinstance(series.dtype, pd.StringDtype):
+        return pd.StringDtype("pyarrow", na_value=np.nan)
+    return None
+
+
+def compact_dtypes(df, category_max_ratio=CATEGORY_MAX_RATIO):
+    """
+    Return the compact dtype for each column of `df` that can be stored more cheaply: the smallest integer
+    type, float32 where it is exact, categoricals for repetitive strings and Arrow strings for the rest.
+    """
+    dtypes = {}
+    for col in df.columns:
+        series = df[col]
+        kind = series.dtype.kind if isinstance(series.dtype, np.dtype) else None
+        if kind in ("i", "u"):
+            dtype = _downcast_integers(series)
+        elif kind == "f":
+            dtype = _downcast_floats(series)
+        else:
+            dtype = _string_dtype(series, category_max_ratio)
+        if dtype is not None and dtype != series.dtype:
+            dtypes[col] = dtype
+    return dtypes
+
+
+def compact_frame(df, category_max_ratio=CATEGORY_MAX_RATIO):
+    """
+    Compaction stage: downcast numeric columns, store repetitive strings as categoricals and other strings as
+    Arrow-backed strings. Values are unchanged; only their storage is.
+
+    Returns the compacted DataFrame and a report dict with the "before" and "after" sizes in bytes and the
+    dtype change of each converted column ("columns": {column: "old -> new"}).
+    """
+    usage = df.memory_usage(index=True, deep=True)
+    before = int(usage.sum())
+    dtypes = compact_dtypes(df, category_max_ratio)
+    if not dtypes:
+        return df, {"before": before, "after": before, "columns": {}}
+    compacted = df.astype(dtypes)
+    # Only the converted columns are measured again; deep measurement of object columns is slow.
+    changed = list(dtypes)
+    after = before - int(usage[changed].sum()) + int(compacted[changed].memory_usage(index=False, deep=True).sum())
+    columns = {col: f"{df[col].dtype} -> {compacted[col].dtype}" for col in dtypes}
+    return compacted, {"before": before, "after": after, "columns": columns}
+
+
+def format_report(report):
+    """Return a one-line summary of a compaction report, e.g. "Memory: 96.0 MB -> 31.5 MB (saved 67%)"."""
+    before, after = report["before"], report["after"]
+    saved = 1 - after / before if before else 0.0
+    return f"Memory: {before / 1024 ** 2:,.1f} MB -> {after / 1024 ** 2:,.1f} MB (saved {saved:.0%})"
@@ -1,21 +1,362 @@
+import codecs
+import csv
+import hashlib
 import io
 
 import pandas as pd
-import streamlit as st
 
+from visualizer.utils import disk_cache, preview, pushdown, upload_io
+from visualizer.utils.dataset_cache import dataset_cache
 
-@st.cache_data
-def auto_read_csv(uploaded_file):
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# Only this many leading bytes are inspected to detect the encoding, delimiter, header and dtypes.
+SNIFF_BYTES = 64 * 1024
+# Number of sample lines handed to csv.Sniffer; more lines rarely change its answer but cost time.
+SNIFF_LINES = 100
+CANDIDATE_DELIMITERS = ",;\t|"
+# Part of the on-disk cache key; bump it when a parser change would alter the resulting frames.
+CACHE_TAG = "csv-v2"
+# Bytes parsed per pyarrow block; the file is read as a stream of blocks of this size, which bounds the
+# parser's working memory instead of holding a parsed copy of the whole file alongside the input.
+PYARROW_BLOCK_BYTES = 8 * 1024 * 1024
+
+# pandas' default missing value markers, passed to pyarrow so both engines agree on what is missing.
+_NULL_VALUES = ["", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN", "<NA>",
+                "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"]
+
+_BOMS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+
+def _detect_encoding(sample):
+    """
+    Detect the encoding of a byte sample.
+    Returns a tuple (encoding, clean) where `clean` is False if the sample is not valid for that encoding.
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding, True
+    try:
+        # An incremental decoder tolerates a multi-byte character cut off at the end of the sample.
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8", True
+    except UnicodeDecodeError:
+        return "utf-8", False
+
+
+def _is_number(value):
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
+
+def sniff_csv(sample):
+    """
+    Detect how to parse a CSV file from a bounded byte sample of its beginning.
+
+    Returns a dict with:
+      - "encoding": the text encoding,
+      - "clean": False if the sample contains bytes invalid for that encoding,
+      - "sep" / "quotechar": the detected dialect,
+      - "header": 0 if the first row is a header, None if it already holds data,
+      - "duplicate_names": True if the header repeats a column name,
+      - "dtype": per-column dtype hints inferred from the sample,
+      - "columns": the column names (positions if there is no header).
+    """
+    encoding, clean = _detect_encoding(sample)
+    text = sample.decode(encoding, errors="replace")
+    # Drop the (possibly truncated) last line unless the sample is the whole file.
+    if len(sample) >= SNIFF_BYTES and "\n" in text:
+        text = text[:text.rindex("\n") + 1]
+    lines = text.splitlines(keepends=True)
+
+    sep, quotechar = ",", '"'
+    try:
+        dialect = csv.Sniffer().sniff("".join(lines[:SNIFF_LINES]), delimiters=CANDIDATE_DELIMITERS)
+        sep, quotechar = dialect.delimiter, dialect.quotechar or '"'
+    except csv.Error:
+        pass
+
+    # A first row made only of numbers is data, not a header.
+    first_row = next(csv.reader(lines[:1], delimiter=sep, quotechar=quotechar), [])
+    header = None if first_row and all(_is_number(v) for v in first_row) else 0
+    duplicate_names = header is not None and len(set(first_row)) < len(first_row)
+
+    dtype = {}
+    try:
+        sample_df = pd.read_csv(io.StringIO(text), sep=sep, quotechar=quotechar, header=header)
+    except (ValueError, csv.Error):
+        sample_df = pd.DataFrame()
+    for col in sample_df.columns:
+        # Integers are not hinted: a missing value later in the file would make them float.
+        if pd.api.types.is_float_dtype(sample_df[col]):
+            dtype[col] = "float64"
+        elif pd.api.types.is_object_dtype(sample_df[col]) or pd.api.types.is_string_dtype(sample_df[col]):
+            dtype[col] = str
+    return {"encoding": encoding, "clean": clean, "sep": sep, "quotechar": quotechar, "header": header,
+            "duplicate_names": duplicate_names, "dtype": dtype, "columns": list(sample_df.columns)}
+
+
+def _open_pyarrow(raw, dialect, dtype, filters=None):
+    """
+    Open pyarrow's streaming reader over the buffer. Only the columns needed by the load `filters` are converted,
+    and rows before their row range are skipped by the reader.
     """
-    Loads CSV data from an uploaded file by allowing pandas to auto-detect the delimiter.
-    Uses the Python engine by setting sep=None.
+    header = dialect["header"] is not None
+    start, _ = pushdown.row_bounds(filters)
+    # Without a header, pyarrow names the columns f0, f1, ...
+    names = [column if header else f"f{column}" for column in pushdown.read_columns(filters) or []]
+    read_options = pa_csv.ReadOptions(encoding=dialect["encoding"], block_size=PYARROW_BLOCK_BYTES,
+                                      autogenerate_column_names=not header,
+                                      skip_rows=0 if header else start, skip_rows_after_names=start if header else 0)
+    parse_options = pa_csv.ParseOptions(delimiter=dialect["sep"], quote_char=dialect["quotechar"])
+    column_types = {col: pa.float64() if hint == "float64" else pa.string() for col, hint in dtype.items()}
+    convert_options = pa_csv.ConvertOptions(column_types=column_types, null_values=_NULL_VALUES,
+                                            strings_can_be_null=True, include_columns=names)
+    return pa_csv.open_csv(pa.BufferReader(pa.py_buffer(raw)), read_options=read_options,
+                           parse_options=parse_options, convert_options=convert_options)
+
+
+def _read_pyarrow(raw, dialect, dtype, filters=None):
     """
-    raw_data = uploaded_file.getvalue()
-    # If raw_data is bytes, decode it; if it's already a string, use it directly.
-    if isinstance(raw_data, bytes):
-        raw_data = raw_data.decode("utf-8", errors="replace")
+    Parse with pyarrow's streaming reader straight from the buffer, converting the Arrow columns to pandas while
+    releasing them, so that peak memory stays close to the size of the resulting frame.
+    With load filters, only the needed columns are converted, rows before the range are skipped by the reader,
+    and blocks are filtered one at a time as they are read.
+    """
+    header = dialect["header"] is not None
+    start, stop = pushdown.row_bounds(filters)
+    with _open_pyarrow(raw, dialect, dtype, filters) as reader:
+        if filters is None or (not filters["predicates"] and stop is None):
+            table = reader.read_all()
+        else:
+            # Blocks are filtered as they are read, so rows failing the conditions are never kept.
+            chunks, offset = [], start
+            for batch in reader:
+                if stop is not None and offset >= stop:
+                    break
+                chunk = _arrow_to_pandas(pa.Table.from_batches([batch]), header)
+                chunks.append(pushdown.filter_chunk(chunk, filters, offset))
+                offset += batch.num_rows
+            if chunks:
+                return pushdown.concat_chunks(chunks)
+            table = reader.schema.empty_table()
+    return pushdown.filter_chunk(_arrow_to_pandas(table, header), filters, start)
+
+
+def _arrow_to_pandas(table, header):
+    """Convert a parsed Arrow table to pandas, releasing it; all-missing columns become float64 as in the C engine."""
+    schema = table.schema
+    for i, arrow_type in enumerate(schema.types):
+        if pa.types.is_null(arrow_type):
+            schema = schema.set(i, schema.field(i).with_type(pa.float64()))
+    table = table.cast(schema)
+    df = table.to_pandas(self_destruct=True, split_blocks=True)
+    del table
+    if not header:
+        df.columns = [int(name[1:]) for name in df.columns]
+    return df
+
+
+def _c_options(kwargs, dtype, filters=None):
+    """Return the C engine arguments: the dialect, the dtype hints and the column subset and row range of `filters`."""
+    options = dict(kwargs, **({"dtype": dtype} if dtype else {}))
+    start, stop = pushdown.row_bounds(filters)
+    if pushdown.read_columns(filters) is not None:
+        options["usecols"] = pushdown.read_columns(filters)
+    if start:
+        options["skiprows"] = range(1, start + 1) if kwargs["header"] == 0 else range(start)
+    if stop is not None:
+        options["nrows"] = stop - start
+    return options
+
+
+def _read_c(raw, kwargs, dtype, filters=None):
+    """
+    Parse with the C engine through a file object over the buffer. With load filters, only the needed columns
+    are parsed (usecols), rows outside the range are skipped, and rows are filtered CHUNK_ROWS at a time.
+    """
+    options = _c_options(kwargs, dtype, filters)
+    start, _ = pushdown.row_bounds(filters)
+    with upload_io.open_buffer(raw) as source:
+        if filters is None or not filters["predicates"]:
+            df = pd.read_csv(source, engine="c", encoding_errors="replace", **options)
+            return pushdown.filter_chunk(df, filters, start)
+        chunks, offset = [], start
+        with pd.read_csv(source, engine="c", encoding_errors="replace", chunksize=pushdown.CHUNK_ROWS,
+                         **options) as reader:
+            for chunk in reader:
+                chunks.append(pushdown.filter_chunk(chunk, filters, offset))
+                offset += len(chunk)
+        return pushdown.concat_chunks(chunks, filters["columns"])
+
+
+def _plans(dialect):
+    """Return the (engine, dtype hints) attempts for a dialect, fastest first; the last one takes no hints."""
+    if dialect["header"] is None:
+        # Column names are positional; hints keyed by position would not line up with the C engine's names.
+        attempts = []
+    else:
+        attempts = [dialect["dtype"]] if dialect["dtype"] else []
+    attempts.append({})
+    plans = []
+    for dtype in attempts:
+        # pyarrow keeps repeated header names; the C engine renames them a, a.1, a.2, ... so columns stay unique.
+        if HAS_PYARROW and dialect["clean"] and not dialect["duplicate_names"]:
+            plans.append(("pyarrow", dtype))
+        plans.append(("c", dtype))
+    return plans
+
+
+def _dialect_kwargs(dialect):
+    return {
+        "sep": dialect["sep"],
+        "quotechar": dialect["quotechar"],
+        "header": dialect["header"],
+        "encoding": dialect["encoding"],
+    }
+
+
+def read_csv_bytes(raw, dialect=None, filters=None):
+    """
+    Parse CSV content held in a bytes-like buffer (bytes, memoryview or mmap) using a dialect from sniff_csv
+    (detected from the leading bytes if not given). The buffer is never copied as a whole: the pyarrow engine
+    reads it in blocks when it is installed and the encoding is clean, otherwise the C engine reads it through a
+    file object and decodes incrementally. If the sampled dtype hints do not hold for the whole file, the parse
+    is retried without them.
+    Load `filters` (see pushdown.make_filters) are pushed down into the reader: only the matching rows of the
+    needed columns are materialized.
+    """
+    if dialect is None:
+        dialect = sniff_csv(bytes(raw[:SNIFF_BYTES]))
+    last_error = None
+    for engine, dtype in _plans(dialect):
+        try:
+            if engine == "pyarrow":
+                return _read_pyarrow(raw, dialect, dtype, filters)
+            return _read_c(raw, _dialect_kwargs(dialect), dtype, filters)
+        except Exception as e:  # noqa: BLE001 - each engine raises its own error types; try the next plan
+            last_error = e
+    raise last_error
+
+
+def _conditions(filters):
+    """Return only the row conditions of `filters` (None without conditions)."""
+    if filters is None or not filters["predicates"]:
+        return None
+    return {**pushdown.NO_FILTERS, "predicates": filters["predicates"]}
+
+
+def _sample_pyarrow(raw, dialect, dtype, filters, reservoir):
+    """Stream the pyarrow reader's blocks into `reservoir`; only candidate rows are converted to pandas."""
+    header = dialect["header"] is not None
+    start, stop = pushdown.row_bounds(filters)
+    conditions = _conditions(filters)
+    offset = start
+    with _open_pyarrow(raw, dialect, dtype, filters) as reader:
+        for batch in reader:
+            if stop is not None and offset >= stop:
+                break
+            if stop is not None and offset + batch.num_rows > stop:
+                batch = batch.slice(0, stop - offset)
+            offset += batch.num_rows
+            table = pa.Table.from_batches([batch])
+            if conditions is None:
+                reservoir.add(table.num_rows, lambda idx, t=table: _arrow_to_pandas(t.take(idx), header))
+            else:
+                chunk = pushdown.filter_chunk(_arrow_to_pandas(table, header), conditions)
+                reservoir.add(len(chunk), lambda idx, c=chunk: c.iloc[idx])
+
+
+def _sample_c(raw, kwargs, dtype, filters, reservoir):
+    """Stream the C engine's chunks of CHUNK_ROWS rows into `reservoir`."""
+    conditions = _conditions(filters)
+    with upload_io.open_buffer(raw) as source, pd.read_csv(
+            source, engine="c", encoding_errors="replace", chunksize=pushdown.CHUNK_ROWS,
+            **_c_options(kwargs, dtype, filters)) as reader:
+        for chunk in reader:
+            if conditions is not None:
+                chunk = pushdown.filter_chunk(chunk, conditions)
+            reservoir.add(len(chunk), lambda idx, c=chunk: c.iloc[idx])
+
+
+def sample_csv_bytes(raw, k=preview.PREVIEW_ROWS, dialect=None, filters=None, seed=0):
+    """
+    Draw a uniform random sample of `k` rows from CSV content in one streaming pass (see preview.Reservoir),
+    without materializing the whole frame. Load `filters` are applied as in read_csv_bytes; the sample is drawn
+    from the rows that pass them. Returns the sample, in file order, and the number of rows it was drawn from.
+    """
+    if dialect is None:
+        dialect = sniff_csv(bytes(raw[:SNIFF_BYTES]))
+    last_error = None
+    for engine, dtype in _plans(dialect):
+        reservoir = preview.Reservoir(k, seed)
+        try:
+            if engine == "pyarrow":
+                _sample_pyarrow(raw, dialect, dtype, filters, reservoir)
+            else:
+                _sample_c(raw, _dialect_kwargs(dialect), dtype, filters, reservoir)
+            break
+        except Exception as e:  # noqa: BLE001 - as in read_csv_bytes
+            last_error = e
+    else:
+        raise last_error
+    sample, _ = reservoir.sample()
+    if filters is not None and filters["columns"] is not None and len(sample.columns):
+        sample = sample[list(filters["columns"])]
+    return sample, reservoir.seen
+
+
+def csv_columns(uploaded_file):
+    """Return the column names of an uploaded CSV file (positions if it has no header), from its first bytes."""
+    buf = upload_io.upload_buffer(uploaded_file)
+    return sniff_csv(bytes(buf[:SNIFF_BYTES]))["columns"]
+
+
+def sample_csv(uploaded_file, filters=None):
+    """Preview an uploaded CSV file: a random sample of its rows and their total count (see sample_csv_bytes)."""
+    return sample_csv_bytes(upload_io.upload_buffer(uploaded_file), filters=filters)
+
+
+def load_csv(uploaded_file, filters=None):
+    """
+    Loads CSV data from an uploaded file.
+    The encoding, delimiter, header and dtypes are detected once from a bounded sample, and the full parse is
+    handed to the pyarrow or C engine directly from the upload's buffer, without copying or decoding it first.
+    Load `filters` are pushed down into the parse (see read_csv_bytes).
+    Parsed frames are held in the memory-bounded dataset cache and in the on-disk cache, both keyed by the
+    upload's content and the filters, so re-uploading the same file is near-instant, even after a restart.
+    Parse errors are raised; this makes no Streamlit calls, so it can run in a background thread.
+    """
+    buf = upload_io.upload_buffer(uploaded_file)
+    key = f"{disk_cache.upload_digest(uploaded_file, buf)}-{CACHE_TAG}"
+    filter_key = pushdown.filters_key(filters)
+    if filter_key is not None:
+        key += "-" + hashlib.blake2b(repr(filter_key).encode("utf-8"), digest_size=8).hexdigest()
+
+    def parse():
+        return disk_cache.frame_cache.get_or_build(key, lambda: read_csv_bytes(buf, filters=filters))
+
+    return dataset_cache.get_or_load(("csv", key), parse)
+
+
+def auto_read_csv(uploaded_file, filters=None):
+    """Loads CSV data from an uploaded file (see load_csv). Parse errors are shown and give an empty frame."""
+    import streamlit as st
+
     try:
-        df = pd.read_csv(io.StringIO(raw_data), sep=None, engine='python')
+        df = load_csv(uploaded_file, filters)
     except Exception as e:
         st.error(f"Failed to parse CSV file: {e}")
         df = pd.DataFrame()
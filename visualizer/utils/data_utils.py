@@ -1,8 +1,124 @@
+import itertools
 import json
+
+import numpy as np
 import pandas as pd
 
+from visualizer.utils import diagnostics
+
+
+def _batch_parse(strings):
+    """
+    Parse a list of JSON strings with a single json.loads call.
+    Falls back to parsing one value at a time (invalid values become None) if the batch does not
+    split back into exactly one value per input.
+    """
+    try:
+        parsed = json.loads("[" + ",".join(strings) + "]")
+        if len(parsed) == len(strings):
+            return parsed
+    except json.decoder.JSONDecodeError:
+        pass
+    parsed = []
+    for value in strings:
+        try:
+            parsed.append(json.loads(value))
+        except json.decoder.JSONDecodeError:
+            parsed.append(None)
+    return parsed
 
-def flatten_json_column(df, col):
+
+def _parse_json_objects(series):
+    """
+    Parse a column holding dicts or JSON object strings.
+    Returns a list with one dict per row (empty for missing values), or None if the column is not a
+    JSON column, i.e. it has no objects or has a non-empty value that is not an object.
+    """
+    records = [{}] * len(series)
+    found = False
+    if pd.api.types.is_object_dtype(series):
+        # One pass screens the cells and collects the JSON strings, which are then parsed in one batch. It stops
+        # at the first cell that is not an object, so plain text columns are rejected almost for free.
+        string_positions, strings = [], []
+        for i, value in enumerate(series.to_numpy()):
+            if isinstance(value, dict):
+                records[i] = value
+                found = True
+            elif isinstance(value, str):
+                stripped = value.strip()
+                if not stripped:
+                    continue
+                if stripped[0] != "{":
+                    return None
+                string_positions.append(i)
+                strings.append(stripped)
+            elif not (pd.api.types.is_scalar(value) and pd.isna(value)):
+                return None
+    elif pd.api.types.is_string_dtype(series):
+        # Dedicated string columns are screened without a Python-level loop.
+        stripped = series.str.strip()
+        present = (stripped.notna() & (stripped != "")).to_numpy()
+        strings = stripped[present]
+        if not strings.str.startswith("{").all():
+            return None
+        string_positions = np.flatnonzero(present)
+        strings = strings.tolist()
+    else:
+        return None
+    for i, parsed in zip(string_positions, _batch_parse(strings)):
+        if not isinstance(parsed, dict):
+            return None
+        records[i] = parsed
+        found = True
+    return records if found else None
+
+
+def _flatten_records(records, prefix, index, depth, max_depth):
+    """
+    Build a frame from per-row dicts, using the union of keys across all rows, and keep flattening
+    nested objects until `max_depth` levels have been expanded (None for no limit).
+    """
+    frame = pd.DataFrame.from_records(records, index=index) if records else pd.DataFrame(index=index)
+    frame.columns = [f"{prefix}.{key}" for key in frame.columns]
+    if max_depth is not None and depth >= max_depth:
+        return frame
+    pieces = []
+    for col in frame.columns:
+        nested = _parse_json_objects(frame[col])
+        if nested is None:
+            pieces.append(frame[[col]])
+        else:
+            pieces.append(_flatten_records(nested, col, index, depth + 1, max_depth))
+    return pd.concat(pieces, axis=1) if pieces else frame
+
+
+def flatten_json_columns(df, columns=None, max_depth=None):
+    """
+    Flatten every column of `df` (or only `columns`) that holds dicts or JSON object strings.
+    Each JSON column is parsed in one batch, its keys are the union over all rows, and nested objects are
+    expanded recursively up to `max_depth` levels (None for no limit) into columns named <col>.<key>.<subkey>.
+    The original JSON columns are dropped and all new columns are appended in a single concatenation.
+
+    Returns the updated DataFrame and a dict mapping each flattened column to its list of new column names.
+    """
+    if max_depth is not None and max_depth < 1:
+        return df, {}
+    mapping = {}
+    pieces = []
+    for col in list(df.columns if columns is None else columns):
+        records = _parse_json_objects(df[col])
+        if records is None:
+            continue
+        flat_df = _flatten_records(records, col, df.index, 1, max_depth)
+        mapping[col] = flat_df.columns.tolist()
+        pieces.append(flat_df)
+    if not pieces:
+        return df, mapping
+    df = pd.concat([df.drop(columns=list(mapping))] + pieces, axis=1)
+    return df, mapping
+
+
+def flatten_json_column(df, col, max_depth=None):
     """
     Checks if the given DataFrame column contains JSON strings or dicts.
     If so, it flattens that column into new columns with names like <col>.<key>
@@ -10,35 +126,106 @@ def flatten_json_column(df, col):
 
     Returns the updated DataFrame and a list of new column names.
     """
-    new_cols = []
-    # Skip if column is not object type.
-    if df[col].dtype != "object":
-        return df, new_cols
+    df, mapping = flatten_json_columns(df, [col], max_depth=max_depth)
+    return df, mapping.get(col, [])
 
-    # Find the first non-null value.
-    sample_series = df[col].dropna()
-    if sample_series.empty:
-        return df, new_cols
 
-    sample = sample_series.iloc[0]
+# Upper bounds on the typical magnitude of epoch values in each unit: seconds reach 1e10 in the year 2286,
+# and each finer unit multiplies the values by 1000.
+_EPOCH_UNITS = [(1e10, "s"), (1e13, "ms"), (1e16, "us")]
+
+
+def epoch_unit(series):
+    """
+    Detect the unit ("s", "ms", "us" or "ns") of numeric epoch timestamps from the median magnitude of the
+    whole column, so that a few odd values (such as a zero in the first row) cannot mislead it.
+    """
+    values = pd.to_numeric(series, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    values = np.abs(values[np.isfinite(values)])
+    magnitude = float(np.median(values)) if values.size else 0.0
+    for bound, unit in _EPOCH_UNITS:
+        if magnitude < bound:
+            return unit
+    return "ns"
+
+
+@diagnostics.stage("Timestamp conversion")
+def convert_timestamp_axis(df, col):
+    """
+    If `col` looks like a numeric epoch timestamp (its name contains "timestamp"), convert it to datetime,
+    with the unit detected from the whole column (see epoch_unit).
+    Returns a new DataFrame; the input frame is left untouched.
+    """
+    if df.empty or "timestamp" not in str(col).lower() or not pd.api.types.is_numeric_dtype(df[col]):
+        return df
+    unit = epoch_unit(df[col])
+    df = df.copy()
+    df[col] = pd.to_datetime(df[col], unit=unit)
+    return df
+
+
+def concat_tagged(parts, names):
+    """
+    Concatenate `parts` and tag their rows with a categorical "File" column of `names`, built from codes:
+    one small integer per row instead of a repeated string.
+    """
+    combined = pd.concat(parts, ignore_index=True)
+    codes = np.repeat(np.arange(len(parts)), [len(part) for part in parts])
+    combined["File"] = pd.Categorical.from_codes(codes, categories=names)
+    return combined
+
+
+def comparison_chart_frame(dfs, x_col, y_col, names=None):
+    """
+    Project each frame to the two chart columns (dropping rows with missing values), concatenate them, tag the
+    rows with a categorical "File" column (`names`, by default "File 1", "File 2", ...) and convert a timestamp
+    X axis. Returns the combined frame, the per-file slices of it and an error message (None on success).
+    """
+    names = list(names or [f"File {i}" for i in range(1, len(dfs) + 1)])
+    # Only the two chart columns of each frame are copied, once, by the concatenation.
+    parts = [df[[x_col, y_col]].dropna() if x_col in df.columns and y_col in df.columns
+             else pd.DataFrame(columns=[x_col, y_col]) for df in dfs]
+    chart_df = concat_tagged(parts, names)
+    bounds = np.concatenate(([0], np.cumsum([len(part) for part in parts])))
+    error = None
     try:
-        # Parse if the sample is a string.
-        if isinstance(sample, str):
-            sample_dict = json.loads(sample)
-        elif isinstance(sample, dict):
-            sample_dict = sample
-        else:
-            return df, new_cols
-    except json.decoder.JSONDecodeError:
-        # Not a valid JSON, return the DataFrame as is.
-        return df, new_cols
-
-    if isinstance(sample_dict, dict):
-        # Flatten the column using json_normalize.
-        flat_df = pd.json_normalize(df[col].apply(lambda x: json.loads(x) if isinstance(x, str) else x))
-        # Prefix new column names with the original column name.
-        flat_df = flat_df.add_prefix(f"{col}.")
-        new_cols = flat_df.columns.tolist()
-        # Drop the original column and join the new flattened columns.
-        df = df.drop(columns=[col]).join(flat_df)
-    return df, new_cols
+        chart_df = convert_timestamp_axis(chart_df, x_col)
+    except (ValueError, OverflowError) as e:
+        error = f"Timestamp conversion failed: {e}"
+    parts = [chart_df.iloc[start:stop] for start, stop in itertools.pairwise(bounds)]
+    return chart_df, parts, error
+
+
+# Operators of the table filter and of load filter conditions.
+FILTER_OPERATORS = ["contains", "=", "!=", ">", ">=", "<", "<="]
+
+
+def _coerce_filter_value(series, value):
+    """Convert the filter text to the type of `series` so comparisons run vectorized on the column."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return pd.Timestamp(value)
+    if pd.api.types.is_bool_dtype(series):
+        return value.strip().lower() in ("1", "true", "yes")
+    if pd.api.types.is_numeric_dtype(series):
+        return float(value)
+    return value
+
+
+def filter_mask(series, operator, value):
+    """
+    Return a boolean NumPy mask selecting the rows of `series` that satisfy `operator` (one of FILTER_OPERATORS)
+    against the text `value`. "contains" is a case-insensitive substring match on the values as text.
+    Raises ValueError if `value` cannot be compared with the column.
+    """
+    if operator == "contains":
+        text = series if pd.api.types.is_string_dtype(series) else series.astype(str)
+        return text.str.contains(value, case=False, regex=False, na=False).to_numpy(dtype=bool)
+    target = _coerce_filter_value(series, value)
+    comparisons = {
+        "=": series.eq, "!=": series.ne, ">": series.gt, ">=": series.ge, "<": series.lt, "<=": series.le,
+    }
+    try:
+        mask = comparisons[operator](target)
+    except TypeError as e:
+        raise ValueError(f"Cannot compare column with {value!r}: {e}") from e
+    return mask.fillna(False).to_numpy(dtype=bool)
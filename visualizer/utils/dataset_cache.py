@@ -0,0 +1,214 @@
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from visualizer.utils import diagnostics, disk_cache
+
+# Memory budget for loaded datasets, shared by all sessions of the server process.
+MEMORY_BUDGET_BYTES = int(float(os.environ.get("VISUALIZER_DATASET_CACHE_MB", "1024")) * 1024 * 1024)
+# Evicted entries are written here and loaded back on their next use; a size of 0 disables spilling.
+SPILL_DIR = os.environ.get("VISUALIZER_SPILL_DIR", os.path.join(disk_cache.CACHE_DIR, "spill"))
+SPILL_MAX_BYTES = int(float(os.environ.get("VISUALIZER_SPILL_MAX_MB", "4096")) * 1024 * 1024)
+# Containers longer than this are sized from an evenly spaced sample of their items.
+FOOTPRINT_SAMPLE_ITEMS = 1000
+
+_SUFFIX = ".pickle"
+
+
+def _sample(items):
+    """Return `items`, or an evenly spaced sample of FOOTPRINT_SAMPLE_ITEMS of them."""
+    if len(items) <= FOOTPRINT_SAMPLE_ITEMS:
+        return items
+    return [items[i] for i in np.linspace(0, len(items) - 1, FOOTPRINT_SAMPLE_ITEMS, dtype=np.int64)]
+
+
+def footprint(value):
+    """
+    Estimate the memory held by a cached value in bytes: exactly for DataFrames, Series and arrays, and by
+    walking the objects for parsed JSON (lists and dicts longer than FOOTPRINT_SAMPLE_ITEMS are extrapolated
+    from a sample of their items).
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, (np.ndarray, memoryview)):
+        return int(value.nbytes)
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        items = list(value.items())
+        sample = _sample(items)
+        sampled = sum(footprint(k) + footprint(v) for k, v in sample)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        items = value if isinstance(value, (list, tuple)) else list(value)
+        sample = _sample(items)
+        sampled = sum(footprint(item) for item in sample)
+    else:
+        return size
+    return size + (sampled * len(items) // len(sample) if sample else 0)
+
+
+class DatasetCache:
+    """
+    An in-memory LRU cache for loaded datasets (DataFrames and parsed JSON), bounded by the measured footprint
+    of its entries rather than their number. Entries evicted to stay under `max_bytes` are pickled to
+    `spill_dir` (itself bounded by `spill_max_bytes`, oldest files first) and loaded back on their next use.
+    Cached values are shared between sessions: treat them as read-only.
+    """
+
+    def __init__(self, max_bytes=MEMORY_BUDGET_BYTES, spill_dir=SPILL_DIR, spill_max_bytes=SPILL_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = spill_max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "spills": 0, "spill_hits": 0}
+
+    @property
+    def spill_enabled(self):
+        return self.spill_max_bytes > 0
+
+    def _spill_path(self, key):
+        name = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=20).hexdigest()
+        return os.path.join(self.spill_dir, name + _SUFFIX)
+
+    def get(self, key):
+        """Return the cached value for `key` (from memory or the spill directory), or None on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.counters["hits"] += 1
+                diagnostics.record_cache(hit=True)
+                return self._entries[key][0]
+        value = self._restore(key)
+        diagnostics.record_cache(hit=value is not None)
+        with self._lock:
+            if value is None:
+                self.counters["misses"] += 1
+                return None
+            self.counters["spill_hits"] += 1
+        self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        """
+        Store `value` under `key`, evicting (and spilling) the least recently used entries to stay in budget.
+        A value larger than the whole budget is not cached, so that it never flushes the other entries.
+        """
+        size = footprint(value)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._bytes += size
+            evicted = self._evict()
+        for evicted_key, evicted_value in evicted:
+            self._spill(evicted_key, evicted_value)
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for `key`, calling `loader()` and caching its result on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.put(key, value)
+        return value
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in `max_bytes`; returns the evicted items."""
+        evicted = []
+        while self._bytes > self.max_bytes and self._entries:
+            key, (value, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.counters["evictions"] += 1
+            evicted.append((key, value))
+        return evicted
+
+    def _spill(self, key, value):
+        if not self.spill_enabled:
+            return
+        os.makedirs(self.spill_dir, exist_ok=True)
+        # Write to a temporary file first so that a concurrent restore never reads a partial entry.
+        fd, tmp_path = tempfile.mkstemp(dir=self.spill_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as sink:
+                pickle.dump(value, sink, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._spill_path(key))
+        except (OSError, pickle.PicklingError, TypeError, AttributeError):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        with self._lock:
+            self.counters["spills"] += 1
+        self._trim_spill()
+
+    def _restore(self, key):
+        if not self.spill_enabled:
+            return None
+        path = self._spill_path(key)
+        try:
+            with open(path, "rb") as source:
+                value = pickle.load(source)
+            # The file is no longer needed once the value is back in memory; it is re-written if evicted again.
+            os.remove(path)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        return value
+
+    def _trim_spill(self):
+        """Delete the oldest spill files until the spill directory fits in `spill_max_bytes`."""
+        try:
+            scan = [entry for entry in os.scandir(self.spill_dir) if entry.name.endswith(_SUFFIX)]
+            files = sorted(((entry.path, entry.stat()) for entry in scan), key=lambda e: e[1].st_mtime)
+        except OSError:
+            return
+        total = sum(stat.st_size for _, stat in files)
+        for path, stat in files:
+            if total <= self.spill_max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= stat.st_size
+
+    def stats(self):
+        """Return the counters together with the number of entries and the bytes they hold."""
+        with self._lock:
+            return {**self.counters, "entries": len(self._entries), "bytes": self._bytes,
+                    "max_bytes": self.max_bytes}
+
+    def clear(self):
+        """Drop all in-memory entries (spilled files are left to the spill budget)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+# Shared instance used by the loaders and the pipeline.
+dataset_cache = DatasetCache()
+
+
+def render_cache_stats():
+    """Show the dataset cache's usage and hit/miss/eviction counters in the sidebar."""
+    import streamlit as st
+
+    stats = dataset_cache.stats()
+    with st.sidebar.expander("Dataset cache"):
+        st.progress(min(1.0, stats["bytes"] / stats["max_bytes"]) if stats["max_bytes"] else 0.0,
+                    text=f"{stats['bytes'] / 1024 ** 2:,.1f} of {stats['max_bytes'] / 1024 ** 2:,.0f} MB "
+                         f"({stats['entries']} entries)")
+        lookups = stats["hits"] + stats["spill_hits"] + stats["misses"]
+        hit_rate = (stats["hits"] + stats["spill_hits"]) / lookups if lookups else 0.0
+        st.write(f"Hits: {stats['hits']:,} · Restored from disk: {stats['spill_hits']:,} · "
+                 f"Misses: {stats['misses']:,} ({hit_rate:.0%} hit rate)")
+        st.write(f"Evictions: {stats['evictions']:,} · Spilled to disk: {stats['spills']:,}")
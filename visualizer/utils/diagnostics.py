@@ -0,0 +1,292 @@
+"""
+Per-stage instrumentation: spans around the pipeline stages (parsing, flattening, timestamp conversion, figure
+building, table and chart rendering) that record their wall time, the rows they produced, whether they were
+answered from a cache and, optionally, the peak memory they allocated. Spans are summed per stage, shown in the
+sidebar's "Diagnostics" panel and exported as a Prometheus text file and as JSON lines.
+
+Instrumentation is off unless VISUALIZER_DIAGNOSTICS is set, and then costs a flag check per stage call.
+"""
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+import pandas as pd
+
+# "1" records time, rows and cache use; "memory" also traces allocations with tracemalloc, which slows down
+# allocation-heavy stages (the peaks of stages running at the same time in different threads overlap).
+MODE = os.environ.get("VISUALIZER_DIAGNOSTICS", "").strip().lower()
+# Prometheus text file with the per-stage totals (e.g. for node_exporter's textfile collector), rewritten at most
+# every METRICS_INTERVAL_SECONDS and whenever the panel is shown.
+METRICS_FILE = os.environ.get("VISUALIZER_METRICS_FILE")
+METRICS_INTERVAL_SECONDS = 10.0
+# File that every span is appended to as a line of JSON.
+LOG_FILE = os.environ.get("VISUALIZER_DIAGNOSTICS_LOG")
+# Spans listed in the panel, most recent first.
+RECENT_SPANS = 50
+
+_enabled = False
+_trace_memory = False
+_lock = threading.Lock()
+_local = threading.local()
+_totals = {}
+_recent = deque(maxlen=RECENT_SPANS)
+_last_export = 0.0
+
+
+def enable(memory=False):
+    """Turn instrumentation on (with allocation tracing if `memory`), e.g. for tests or a profiling session."""
+    global _enabled, _trace_memory
+    _enabled, _trace_memory = True, memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    global _enabled, _trace_memory
+    if _trace_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _enabled, _trace_memory = False, False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """Forget all recorded spans and totals."""
+    with _lock:
+        _totals.clear()
+        _recent.clear()
+
+
+def rows_of(result):
+    """Rows produced by a stage: the length of a returned DataFrame, or of the first item of a returned tuple."""
+    if isinstance(result, tuple) and result:
+        result = result[0]
+    return len(result) if isinstance(result, pd.DataFrame) else None
+
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+class Span:
+    """
+    A timed stage (see span). `rows` and `cache` ("hit" or "miss", see record_cache) may be set while it runs.
+    With allocation tracing, the peak is tracked across nested spans: an inner span resets tracemalloc's peak,
+    so it hands the peak it saw to the span around it.
+    """
+
+    def __init__(self, stage, rows=None):
+        self.stage = stage
+        self.rows = rows
+        self.cache = None
+        self._peak_seen = 0
+
+    def __enter__(self):
+        stack = _stack()
+        if _trace_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]._peak_seen = max(stack[-1]._peak_seen, peak)
+            tracemalloc.reset_peak()
+            self._start_bytes = current
+        else:
+            self._start_bytes = None
+        stack.append(self)
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self._started
+        stack = _stack()
+        stack.pop()
+        alloc = None
+        if self._start_bytes is not None and tracemalloc.is_tracing():
+            peak = max(tracemalloc.get_traced_memory()[1], self._peak_seen)
+            alloc = max(0, peak - self._start_bytes)
+            if stack:
+                stack[-1]._peak_seen = max(stack[-1]._peak_seen, peak)
+        _record({"time": round(time.time(), 3), "stage": self.stage, "seconds": round(seconds, 6),
+                 "rows": self.rows, "cache": self.cache, "alloc_bytes": alloc,
+                 "thread": threading.current_thread().name, "error": exc_info[0] is not None})
+        return False
+
+
+class _NullSpan:
+    """Stands in for Span while instrumentation is off: entering it and setting its fields do nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(stage, rows=None):
+    """
+    Context manager timing the code it wraps as a span of `stage`, e.g.
+    `with diagnostics.span("Render chart"): st.plotly_chart(fig)`. Set `.rows` on the span for the rows processed.
+    """
+    return Span(stage, rows) if _enabled else _NULL_SPAN
+
+
+def stage(name, rows=rows_of, cached=False):
+    """
+    Decorator recording every call of a pipeline stage as a span of `name`, with `rows(result)` as its rows.
+    Stages memoized by Streamlit are decorated above @st.cache_resource with `cached=True` and call
+    record_cache(hit=False) first thing in their body, so that the calls Streamlit answers count as hits.
+    """
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with Span(name) as current:
+                result = function(*args, **kwargs)
+                current.rows = rows(result)
+                if cached and current.cache is None:
+                    current.cache = "hit"
+            return result
+        return wrapper
+    return decorate
+
+
+def record_cache(hit):
+    """Record a cache lookup for the innermost running span; only the span's first lookup counts."""
+    if not _enabled:
+        return
+    stack = getattr(_local, "stack", None)
+    if stack and stack[-1].cache is None:
+        stack[-1].cache = "hit" if hit else "miss"
+
+
+def _record(entry):
+    with _lock:
+        _recent.appendleft(entry)
+        stage_totals = _totals.setdefault(entry["stage"], {"calls": 0, "seconds": 0.0, "rows": 0, "hits": 0,
+                                                           "misses": 0, "max_alloc_bytes": None})
+        stage_totals["calls"] += 1
+        stage_totals["seconds"] += entry["seconds"]
+        stage_totals["rows"] += entry["rows"] or 0
+        if entry["cache"] is not None:
+            stage_totals["hits" if entry["cache"] == "hit" else "misses"] += 1
+        if entry["alloc_bytes"] is not None:
+            stage_totals["max_alloc_bytes"] = max(stage_totals["max_alloc_bytes"] or 0, entry["alloc_bytes"])
+        if LOG_FILE:
+            with open(LOG_FILE, "a", encoding="utf-8") as sink:
+                sink.write(json.dumps(entry) + "\n")
+        due = METRICS_FILE and time.monotonic() - _last_export >= METRICS_INTERVAL_SECONDS
+    if due:
+        export()
+
+
+def totals():
+    """Return a copy of the per-stage totals: calls, seconds, rows, hits, misses and max_alloc_bytes."""
+    with _lock:
+        return {name: dict(values) for name, values in _totals.items()}
+
+
+def recent():
+    """Return the most recent spans, newest first."""
+    with _lock:
+        return list(_recent)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text(stage_totals=None):
+    """Render the per-stage totals in the Prometheus text exposition format."""
+    stage_totals = totals() if stage_totals is None else stage_totals
+    metrics = [
+        ("visualizer_stage_calls_total", "counter", "Calls of each pipeline stage.", "calls"),
+        ("visualizer_stage_seconds_total", "counter", "Wall time spent in each pipeline stage.", "seconds"),
+        ("visualizer_stage_rows_total", "counter", "Rows produced by each pipeline stage.", "rows"),
+        ("visualizer_stage_alloc_bytes_max", "gauge", "Largest peak allocation of a call of each stage.",
+         "max_alloc_bytes"),
+    ]
+    lines = []
+    for metric, kind, help_text, field in metrics:
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        lines += [f'{metric}{{stage="{_label(name)}"}} {values[field]}'
+                  for name, values in stage_totals.items() if values[field] is not None]
+    lines += ["# HELP visualizer_stage_cache_total Cache lookups of each pipeline stage, by result.",
+              "# TYPE visualizer_stage_cache_total counter"]
+    for name, values in stage_totals.items():
+        if not values["hits"] and not values["misses"]:
+            continue
+        for result in ("hit", "miss"):
+            lines.append(f'visualizer_stage_cache_total{{stage="{_label(name)}",result="{result}"}} '
+                         f'{values["hits" if result == "hit" else "misses"]}')
+    return "\n".join(lines) + "\n"
+
+
+def export(path=None):
+    """Write the Prometheus text to `path` (default METRICS_FILE), replacing the previous file atomically."""
+    global _last_export
+    path = path or METRICS_FILE
+    if not path:
+        return
+    _last_export = time.monotonic()
+    partial = f"{path}.{os.getpid()}.{threading.get_ident()}.partial"
+    with open(partial, "w", encoding="utf-8") as sink:
+        sink.write(prometheus_text())
+    os.replace(partial, path)
+
+
+def stage_frame(stage_totals=None):
+    """The per-stage totals as a table for the panel, slowest stage first."""
+    stage_totals = totals() if stage_totals is None else stage_totals
+    df = pd.DataFrame([{
+        "Stage": name,
+        "Calls": values["calls"],
+        "Total (s)": values["seconds"],
+        "Mean (ms)": values["seconds"] / values["calls"] * 1000,
+        "Rows": values["rows"],
+        "Cache hits": values["hits"],
+        "Cache misses": values["misses"],
+        "Peak alloc (MB)": None if values["max_alloc_bytes"] is None else values["max_alloc_bytes"] / 1024 ** 2,
+    } for name, values in stage_totals.items()])
+    if not len(df):
+        return df
+    if df["Peak alloc (MB)"].isna().all():
+        df = df.drop(columns="Peak alloc (MB)")
+    return df.sort_values("Total (s)", ascending=False, ignore_index=True)
+
+
+def render_panel():
+    """Show the per-stage totals and the most recent spans in the sidebar (nothing while instrumentation is off)."""
+    if not _enabled:
+        return
+    import streamlit as st
+
+    export()
+    with st.sidebar.expander("Diagnostics"):
+        st.dataframe(stage_frame(), hide_index=True)
+        columns = ["stage", "seconds", "rows", "cache"] + ["alloc_bytes"] * _trace_memory + ["thread"]
+        spans = pd.DataFrame(recent(), columns=columns)
+        st.caption("Most recent stages")
+        st.dataframe(spans, hide_index=True)
+        if st.button("Reset", key="diagnostics_reset"):
+            reset()
+
+
+if MODE not in ("", "0", "off", "false"):
+    enable(memory=MODE == "memory")
@@ -0,0 +1,161 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+try:
+    import pyarrow as pa
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# The cache lives outside the app directory so that it survives restarts; point it at a mounted volume in
+# containers. A size of 0 disables the cache.
+CACHE_DIR = os.environ.get("VISUALIZER_CACHE_DIR",
+                           os.path.join(os.path.expanduser("~"), ".cache", "visualizer"))
+CACHE_MAX_BYTES = int(float(os.environ.get("VISUALIZER_CACHE_MAX_MB", "2048")) * 1024 * 1024)
+
+_SUFFIX = ".arrow"
+
+# Digests of the most recently used uploads, keyed by the upload's identity, so reruns do not re-hash the bytes.
+MAX_UPLOAD_DIGESTS = 256
+
+_upload_digests = OrderedDict()
+_upload_digests_lock = threading.Lock()
+
+
+def content_key(data, *parts):
+    """
+    Return a hex digest identifying `data` (bytes-like) together with any extra key parts,
+    such as the parser name or the selected table.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(data)
+    for part in parts:
+        digest.update(b"\0" + repr(part).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def upload_digest(uploaded_file, data):
+    """
+    Return the content digest of an upload whose bytes are `data`.
+    Uploads that carry a Streamlit file id are hashed only once per upload (for the MAX_UPLOAD_DIGESTS most
+    recently used uploads).
+    """
+    file_id = getattr(uploaded_file, "file_id", None)
+    if file_id is None:
+        return content_key(data)
+    identity = (file_id, len(data))
+    with _upload_digests_lock:
+        if identity in _upload_digests:
+            _upload_digests.move_to_end(identity)
+            return _upload_digests[identity]
+    digest = content_key(data)
+    with _upload_digests_lock:
+        _upload_digests[identity] = digest
+        while len(_upload_digests) > MAX_UPLOAD_DIGESTS:
+            _upload_digests.popitem(last=False)
+    return digest
+
+
+class DiskFrameCache:
+    """
+    A content-addressed cache of DataFrames stored as Arrow IPC files in a local directory.
+    Entries are memory-mapped back on a hit, and the least recently used files are evicted once the
+    directory grows past `max_bytes`.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @property
+    def enabled(self):
+        return HAS_PYARROW and self.max_bytes > 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def get(self, key):
+        """Return the cached DataFrame for `key`, or None on a miss."""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with pa.memory_map(path) as source:
+                table = pa.ipc.open_file(source).read_all()
+            # Touching the file marks it as recently used for eviction.
+            os.utime(path)
+        except (OSError, pa.ArrowInvalid):
+            return None
+        return table.to_pandas()
+
+    def put(self, key, df):
+        """
+        Store `df` under `key`. Returns False if the cache is disabled or the frame cannot be
+        represented in Arrow (e.g. object columns holding mixed Python types).
+        """
+        if not self.enabled:
+            return False
+        try:
+            table = pa.Table.from_pandas(df)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError, ValueError, TypeError):
+            return False
+        os.makedirs(self.directory, exist_ok=True)
+        # Write to a temporary file first so that concurrent sessions never read a partial entry.
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        self.evict()
+        return True
+
+    def get_or_build(self, key, builder):
+        """Return the cached frame for `key`, building and storing it with `builder()` on a miss."""
+        df = self.get(key)
+        if df is None:
+            df = builder()
+            self.put(key, df)
+        return df
+
+    def size_bytes(self):
+        """Return the total size of the cached entries."""
+        return sum(size for _, size, _ in self._entries())
+
+    def _entries(self):
+        try:
+            scan = list(os.scandir(self.directory))
+        except OSError:
+            return []
+        entries = []
+        for entry in scan:
+            if entry.name.endswith(_SUFFIX):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def evict(self):
+        """Delete the least recently used entries until the cache fits in `max_bytes`."""
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+
+# Shared instance used by the parsers.
+frame_cache = DiskFrameCache()
@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+
+# Roughly the pixel width of a wide-layout chart; more points than this per trace cannot be told apart on screen.
+DEFAULT_MAX_POINTS = 2000
+
+DOWNSAMPLE_METHODS = ["lttb", "minmax", "none"]
+
+
+def _as_float_axis(series):
+    """
+    Return a float64 array for bucketing the given series.
+    Datetimes are converted to their integer representation; non-numeric values fall back to positions.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.astype("int64").to_numpy(dtype="float64")
+    if pd.api.types.is_numeric_dtype(series):
+        return series.to_numpy(dtype="float64")
+    return np.arange(len(series), dtype="float64")
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Select `n_out` positions from (x, y) using Largest-Triangle-Three-Buckets.
+    The first and last points are always kept; every interior bucket contributes the point that forms the
+    largest triangle with the previously selected point and the average of the next bucket.
+    Returns a sorted int64 array of positions.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n, dtype=np.int64)
+
+    # n_out - 2 interior buckets, each holding at least one point.
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts
+    avg_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    n_buckets = n_out - 2
+    for b in range(n_buckets):
+        lo, hi = edges[b], edges[b + 1]
+        if b + 1 < n_buckets:
+            cx, cy = avg_x[b + 1], avg_y[b + 1]
+        else:
+            cx, cy = x[n - 1], y[n - 1]
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[b + 1] = a
+    return selected
+
+
+def minmax_indices(y, n_out):
+    """
+    Select up to `n_out` positions by keeping the minimum and maximum of `y` in each of `n_out // 2`
+    equal-sized buckets, plus the first and last points.
+    Returns a sorted int64 array of positions.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 2:
+        return np.arange(n, dtype=np.int64)
+
+    size = -(-n // max(n_out // 2, 1))
+    n_buckets = -(-n // size)
+    # Pad the tail with its last value so the buckets form a rectangle; argmin/argmax return the first
+    # occurrence, so padded slots are only picked when they tie with a real value.
+    padded = np.pad(y, (0, n_buckets * size - n), mode="edge").reshape(n_buckets, size)
+    offsets = np.arange(n_buckets, dtype=np.int64) * size
+    picks = np.concatenate([
+        offsets + padded.argmin(axis=1),
+        offsets + padded.argmax(axis=1),
+        [0, n - 1],
+    ])
+    return np.unique(np.minimum(picks, n - 1))
+
+
+def zoom_bounds(series):
+    """
+    Return the (min, max) of a numeric or datetime series as native Python values suitable for a range
+    slider, or None if the series cannot be zoomed.
+    """
+    if series.empty:
+        return None
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.min().to_pydatetime(), series.max().to_pydatetime()
+    if pd.api.types.is_bool_dtype(series) or not pd.api.types.is_numeric_dtype(series):
+        return None
+    lo, hi = series.min(), series.max()
+    if pd.api.types.is_integer_dtype(series):
+        return int(lo), int(hi)
+    return float(lo), float(hi)
+
+
+def _sample_positions(x_values, y_values, max_points, method):
+    """Return the positions to keep for a single trace whose points are in x order."""
+    if y_values is None:
+        # Neither algorithm can rank non-numeric values; fall back to an even stride.
+        return np.arange(0, len(x_values), -(-len(x_values) // max_points), dtype=np.int64)
+    if method == "minmax":
+        return minmax_indices(y_values, max_points)
+    return lttb_indices(x_values, y_values, max_points)
+
+
+def _is_sorted(values):
+    return bool(np.all(values[1:] >= values[:-1]))
+
+
+def downsample_frame(df, x_col, y_col, max_points=DEFAULT_MAX_POINTS, method="lttb", group_col=None,
+                     x_range=None):
+    """
+    Reduce `df` to at most `max_points` rows per trace for plotting.
+
+    - `method` is "lttb" (shape-preserving), "minmax" (keeps per-bucket extremes) or "none".
+    - If `group_col` is given (e.g. "File"), each group is sampled independently so every trace keeps
+      its own point budget.
+    - If `x_range` is a (low, high) tuple, rows outside it are dropped before sampling, so zooming in
+      re-samples at full detail.
+    - Buckets follow the X axis: a trace whose X values are not sorted is sampled in X order, and its kept
+      rows are returned in X order.
+
+    Returns the sampled DataFrame and the number of points it was sampled from.
+    """
+    if x_range is not None:
+        lo, hi = x_range
+        df = df[(df[x_col] >= lo) & (df[x_col] <= hi)]
+    total = len(df)
+    if method == "none" or not max_points or total <= max_points:
+        return df, total
+
+    y_series = df[y_col]
+    if pd.api.types.is_bool_dtype(y_series):
+        y_series = y_series.astype("float64")
+    x_values = _as_float_axis(df[x_col])
+    y_values = y_series.to_numpy(dtype="float64") if pd.api.types.is_numeric_dtype(y_series) else None
+    if group_col is None:
+        traces = [np.arange(total, dtype=np.int64)]
+    else:
+        traces = [np.asarray(positions, dtype=np.int64)
+                  for positions in df.groupby(group_col, sort=False, observed=True).indices.values()]
+    in_order = True
+    parts = []
+    for trace in traces:
+        trace_x = x_values[trace]
+        if not _is_sorted(trace_x):
+            trace = trace[np.argsort(trace_x, kind="stable")]
+            trace_x = x_values[trace]
+            in_order = False
+        keep = _sample_positions(trace_x, None if y_values is None else y_values[trace], max_points, method)
+        parts.append(trace[keep])
+    positions = np.concatenate(parts) if parts else np.arange(0, dtype=np.int64)
+    # Traces already in X order keep the rows' original order.
+    return df.iloc[np.sort(positions) if in_order else positions], total
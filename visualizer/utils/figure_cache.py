@@ -0,0 +1,138 @@
+import hashlib
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.io as pio
+import streamlit as st
+
+from visualizer.utils import diagnostics
+
+# Memory budget for serialized figures, shared by all sessions of the server process.
+MEMORY_BUDGET_BYTES = int(float(os.environ.get("VISUALIZER_FIGURE_CACHE_MB", "256")) * 1024 * 1024)
+
+# Fingerprints of the frames seen so far, by object id; entries are dropped when their frame is collected.
+_fingerprints = {}
+_fingerprints_lock = threading.Lock()
+
+
+def _content_hash(df):
+    """Hash every value of `df` (nested values such as dicts are hashed as text) into one digest."""
+    digest = hashlib.blake2b(digest_size=16)
+    for col in df.columns:
+        try:
+            hashes = pd.util.hash_pandas_object(df[col], index=False).to_numpy()
+        except TypeError:
+            hashes = pd.util.hash_pandas_object(df[col].astype(str), index=False).to_numpy()
+        digest.update(hashes.tobytes())
+    return digest.hexdigest()
+
+
+def fingerprint(df):
+    """
+    Identify the content of a chart frame: its row count, column names and dtypes, and a hash of its values.
+    Chart frames come from the cached pipeline stages and are the same objects on every rerun, so the hash is
+    computed once per frame object and later calls only cost a dictionary lookup.
+    """
+    with _fingerprints_lock:
+        entry = _fingerprints.get(id(df))
+        if entry is not None and entry[0]() is df:
+            return entry[1]
+    identity = (len(df), tuple((str(col), str(dtype)) for col, dtype in df.dtypes.items()))
+    value = (identity, _content_hash(df))
+    with _fingerprints_lock:
+        _fingerprints[id(df)] = (weakref.ref(df), value)
+    weakref.finalize(df, _forget, id(df))
+    return value
+
+
+def _forget(frame_id):
+    with _fingerprints_lock:
+        entry = _fingerprints.get(frame_id)
+        if entry is not None and entry[0]() is None:
+            del _fingerprints[frame_id]
+
+
+def options_key(options):
+    """Return a hashable key for a chart `options` dict (values are plain numbers, strings and tuples)."""
+    return tuple(sorted((name, repr(value)) for name, value in options.items()))
+
+
+class FigureCache:
+    """
+    An LRU cache of Plotly figures stored as JSON text, bounded by the total size of that text rather than the
+    number of figures. Every lookup returns a new figure built from the text, so callers may modify it.
+    """
+
+    def __init__(self, max_bytes=MEMORY_BUDGET_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key):
+        """Return a copy of the figure cached under `key`, or None on a miss."""
+        with self._lock:
+            text = self._entries.get(key)
+            diagnostics.record_cache(hit=text is not None)
+            if text is None:
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+        return pio.from_json(text)
+
+    def put(self, key, fig):
+        """Serialize and store `fig` under `key`, evicting least recently used figures to stay in budget."""
+        text = pio.to_json(fig, validate=False)
+        size = len(text)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            if size > self.max_bytes:
+                return
+            self._entries[key] = text
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.counters["evictions"] += 1
+
+    def get_or_build(self, key, build):
+        """Return the figure cached under `key`, calling `build()` and caching its result on a miss."""
+        fig = self.get(key)
+        if fig is None:
+            fig = build()
+            self.put(key, fig)
+        return fig
+
+    def stats(self):
+        """Return the counters together with the number of figures and the bytes they hold."""
+        with self._lock:
+            return {**self.counters, "entries": len(self._entries), "bytes": self._bytes,
+                    "max_bytes": self.max_bytes}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+# Shared instance used by the chart stage.
+figure_cache = FigureCache()
+
+
+def render_cache_stats():
+    """Show the figure cache's usage and hit rate in the sidebar."""
+    stats = figure_cache.stats()
+    with st.sidebar.expander("Figure cache"):
+        st.progress(min(1.0, stats["bytes"] / stats["max_bytes"]) if stats["max_bytes"] else 0.0,
+                    text=f"{stats['bytes'] / 1024 ** 2:,.1f} of {stats['max_bytes'] / 1024 ** 2:,.0f} MB "
+                         f"({stats['entries']} figures)")
+        lookups = stats["hits"] + stats["misses"]
+        hit_rate = stats["hits"] / lookups if lookups else 0.0
+        st.write(f"Hits: {stats['hits']:,} · Misses: {stats['misses']:,} ({hit_rate:.0%} hit rate) · "
+                 f"Evictions: {stats['evictions']:,}")
@@ -1,12 +1,487 @@
+import codecs
 import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 
-import streamlit as st
+import numpy as np
+import pandas as pd
+
+from visualizer.utils import disk_cache, preview, pushdown
+from visualizer.utils.dataset_cache import dataset_cache
+from visualizer.utils.upload_io import upload_buffer
+
+# Uploads larger than this default to the streaming loader on the JSON pages.
+STREAMING_THRESHOLD_BYTES = 50 * 1024 * 1024
+# Bytes scanned per vectorized pass when indexing a document.
+SCAN_CHUNK_BYTES = 16 * 1024 * 1024
+
+# JSON Lines (NDJSON) files: uploads with these extensions, or whose first lines are JSON objects, are read as
+# a single table of this name.
+NDJSON_EXTENSIONS = (".jsonl", ".ndjson")
+NDJSON_TABLE = "records"
+# Bytes inspected when deciding whether an upload is JSON Lines.
+NDJSON_SNIFF_BYTES = 64 * 1024
+# JSON Lines files are split at newlines into chunks of about this size, each parsed into a DataFrame.
+NDJSON_CHUNK_BYTES = 16 * 1024 * 1024
+# Worker processes parsing chunks; with 1, or for files of a single chunk, parsing runs in-process.
+NDJSON_WORKERS = int(os.environ.get("VISUALIZER_NDJSON_WORKERS", str(min(8, os.cpu_count() or 1))))
+
+_NEWLINE = ord("\n")
+# (workers, executor) of the shared JSON Lines pool, created on first use.
+_ndjson_pool = None
+
+_QUOTE, _BACKSLASH, _COMMA = ord('"'), ord("\\"), ord(",")
+_OPEN_ARRAY, _CLOSE_ARRAY, _OPEN_OBJECT = ord("["), ord("]"), ord("{")
+_WHITESPACE = b" \t\r\n"
+
+_STRUCTURAL = np.zeros(256, dtype=bool)
+_STRUCTURAL[list(b"[]{},:")] = True
+_DEPTH_DELTA = np.zeros(256, dtype=np.int64)
+_DEPTH_DELTA[list(b"[{")] = 1
+_DEPTH_DELTA[list(b"]}")] = -1
+
+
+def decode_buffer(buf):
+    """
+    Decode a JSON document held in a bytes-like buffer to text in one pass, with the encoding detected as
+    json.loads does for bytes, and without first copying the buffer to bytes.
+    """
+    return str(buf, json.detect_encoding(bytes(buf[:4])))
 
 
-@st.cache_data
 def load_json_data(uploaded_file):
-    """Load JSON data from an uploaded file."""
-    return json.load(uploaded_file)
+    """Load JSON data from an uploaded file (held in the shared dataset cache, keyed by content)."""
+    buf = upload_buffer(uploaded_file)
+    key = ("json", disk_cache.upload_digest(uploaded_file, buf))
+    return dataset_cache.get_or_load(key, lambda: json.loads(decode_buffer(buf)))
+
+
+def _count_backslashes(view, pos, lower, carry):
+    """Count the backslashes immediately before `pos`, adding `carry` if the run reaches `lower`."""
+    count = 0
+    while pos - count - 1 >= lower and view[pos - count - 1] == _BACKSLASH:
+        count += 1
+    if pos - count == lower:
+        count += carry
+    return count
+
+
+def _scan_structure(buf, start=0, end=None, chunk_bytes=SCAN_CHUNK_BYTES):
+    """
+    Scan JSON text in buf[start:end] in vectorized chunks.
+    Yields (positions, chars, depths) arrays for the structural characters ([]{},:) outside of strings,
+    where depths is the nesting level before each character, relative to `start`.
+    """
+    view = np.frombuffer(buf, dtype=np.uint8)
+    end = len(view) if end is None else end
+    in_string = False
+    carry = 0
+    depth = 0
+    for lo in range(start, end, chunk_bytes):
+        hi = min(lo + chunk_bytes, end)
+        chunk = view[lo:hi]
+
+        # Quotes preceded by an odd number of backslashes are escaped and do not toggle string state.
+        quotes = np.flatnonzero(chunk == _QUOTE)
+        maybe_escaped = (quotes == 0) & (carry > 0)
+        maybe_escaped[quotes > 0] = chunk[quotes[quotes > 0] - 1] == _BACKSLASH
+        escaped = np.zeros(quotes.size, dtype=bool)
+        for i in np.flatnonzero(maybe_escaped):
+            escaped[i] = _count_backslashes(chunk, quotes[i], 0, carry) % 2 == 1
+        real_quotes = quotes[~escaped]
+
+        # A uint8 running count wraps at 256 but keeps its parity, which is all that is needed here.
+        toggles = np.zeros(len(chunk), dtype=np.uint8)
+        toggles[real_quotes] = 1
+        parity = np.cumsum(toggles, dtype=np.uint8)
+        structural = np.flatnonzero(_STRUCTURAL[chunk])
+        structural = structural[(parity[structural] & 1) == in_string]
+        chars = chunk[structural]
+        delta = _DEPTH_DELTA[chars]
+        after = depth + np.cumsum(delta)
+        yield lo + structural, chars, after - delta
+
+        if after.size:
+            depth = int(after[-1])
+        in_string = bool((in_string + real_quotes.size) % 2)
+        carry = _count_backslashes(chunk, len(chunk), 0, carry)
+
+
+def _key_before(view, pos):
+    """Return the object key of the value starting at `pos` (i.e. the string before the preceding colon)."""
+    p = pos - 1
+    while view[p] in _WHITESPACE:
+        p -= 1
+    p -= 1  # the colon
+    while view[p] in _WHITESPACE:
+        p -= 1
+    close = p
+    p -= 1
+    while view[p] != _QUOTE or _count_backslashes(view, p, 0, 0) % 2 == 1:
+        p -= 1
+    return json.loads(view[p:close + 1].tobytes())
+
+
+def _first_value_byte(view, pos):
+    """Return the first non-whitespace byte after `pos`, or None at the end of the document."""
+    p = pos + 1
+    while p < len(view) and view[p] in _WHITESPACE:
+        p += 1
+    return view[p] if p < len(view) else None
+
+
+def index_json_tables(buf):
+    """
+    Scan a JSON document once without materializing it and index its tables
+    (top-level keys with list-of-dict values, as in extract_json_tables).
+    Returns a dict mapping table names to {"start": byte offset, "end": byte offset, "rows": row count}.
+    The document is not validated here; a malformed table fails when it is loaded, and a document that ends
+    inside a top-level value raises ValueError.
+    """
+    view = np.frombuffer(buf, dtype=np.uint8)
+    tables = {}
+    current = None  # [name, start, is_table, depth-2 commas seen so far]
+    checked_root = False
+    for positions, chars, depths in _scan_structure(buf):
+        if positions.size == 0:
+            continue
+        if not checked_root:
+            if chars[0] != _OPEN_OBJECT or depths[0] != 0:
+                raise ValueError("The JSON document's root must be an object.")
+            checked_root = True
+
+        commas = np.cumsum((depths == 2) & (chars == _COMMA))
+        boundaries = np.flatnonzero(((depths == 1) & (_DEPTH_DELTA[chars] == 1)) |
+                                    ((depths == 2) & (_DEPTH_DELTA[chars] == -1)))
+        last = -1
+        for i in boundaries:
+            if current is None:
+                pos = int(positions[i])
+                is_table = chars[i] == _OPEN_ARRAY and _first_value_byte(view, pos) == _OPEN_OBJECT
+                current = [_key_before(view, pos) if is_table else None, pos, is_table, 0]
+            else:
+                current[3] += int(commas[i] - (commas[last] if last >= 0 else 0))
+                if current[2] and chars[i] == _CLOSE_ARRAY:
+                    tables[current[0]] = {"start": current[1], "end": int(positions[i]) + 1,
+                                          "rows": current[3] + 1}
+                current = None
+            last = i
+        if current is not None:
+            current[3] += int(commas[-1] - (commas[last] if last >= 0 else 0))
+    if current is not None:
+        raise ValueError("Unexpected end of JSON document")
+    return tables
+
+
+def _table_spans(buf, entry):
+    """Return the start and end offsets of each row of a table indexed by index_json_tables."""
+    separators = [
+        positions[(depths == 1) & (chars == _COMMA)]
+        for positions, chars, depths in _scan_structure(buf, entry["start"], entry["end"])
+    ]
+    separators = np.concatenate(separators) if separators else np.empty(0, dtype=np.int64)
+    starts = np.concatenate([[entry["start"] + 1], separators + 1])
+    ends = np.concatenate([separators, [entry["end"] - 1]])
+    return starts, ends
+
+
+def _offer_spans(reservoir, starts, ends):
+    """Offer rows, given by their byte spans, to a reservoir sample."""
+    reservoir.add(len(starts), lambda idx: pd.DataFrame({"start": starts[idx], "end": ends[idx]}))
+
+
+def _parse_sampled(buf, reservoir, filters):
+    """
+    Parse the rows sampled by `reservoir` and apply the conditions and column subset of `filters` to them.
+    Returns the sample and the number of rows it was drawn from.
+    """
+    spans, _ = reservoir.sample()
+    view = np.frombuffer(buf, dtype=np.uint8)
+    records = [json.loads(view[lo:hi].tobytes()) for lo, hi in zip(spans.get("start", []), spans.get("end", []))]
+    return pushdown.records_frame(records, None if filters is None else {**filters, "rows": None}), reservoir.seen
+
+
+def sample_json_table(buf, entry, k=preview.PREVIEW_ROWS, filters=None, seed=0):
+    """
+    Draw a uniform random sample of `k` rows of a table indexed by index_json_tables: the row boundaries are
+    found in one vectorized scan and only the sampled rows are parsed. The sample is drawn from the row range of
+    `filters` before their conditions apply, so it may hold fewer rows. Returns the sample, in table order, and
+    the number of rows it was drawn from.
+    """
+    start, stop = pushdown.row_bounds(filters)
+    starts, ends = _table_spans(buf, entry)
+    reservoir = preview.Reservoir(k, seed)
+    _offer_spans(reservoir, starts[start:stop], ends[start:stop])
+    return _parse_sampled(buf, reservoir, filters)
+
+
+def iter_json_table_chunks(buf, entry, chunk_rows, first_row=0):
+    """
+    Parse a table indexed by index_json_tables `chunk_rows` rows at a time, starting at row `first_row`.
+    Yields lists of row dicts; only one chunk is materialized at a time.
+    """
+    view = np.frombuffer(buf, dtype=np.uint8)
+    starts, ends = _table_spans(buf, entry)
+    for i in range(first_row, len(starts), chunk_rows):
+        j = min(i + chunk_rows, len(starts))
+        yield json.loads(b"[" + view[starts[i]:ends[j - 1]].tobytes() + b"]")
+
+
+def load_json_table(buf, entry, max_rows=None, chunk_rows=10_000):
+    """
+    Parse only the table at the given index entry.
+    If `max_rows` is set, parsing stops after that many rows.
+    """
+    view = np.frombuffer(buf, dtype=np.uint8)
+    if max_rows is None or max_rows >= entry["rows"]:
+        return json.loads(view[entry["start"]:entry["end"]].tobytes())
+    rows = []
+    for chunk in iter_json_table_chunks(buf, entry, min(chunk_rows, max_rows)):
+        rows.extend(chunk)
+        if len(rows) >= max_rows:
+            break
+    return rows[:max_rows]
+
+
+def read_json_table(buf, entry, filters, max_rows=None, chunk_rows=10_000):
+    """
+    Build the frame of the table at the given index entry with load `filters` pushed down (see
+    pushdown.make_filters): rows before the row range are not parsed, each chunk of rows is reduced to the
+    needed keys and filtered as soon as it is parsed, and parsing stops at the end of the range. `max_rows`
+    caps the rows read from the start of the range.
+    """
+    start, stop = pushdown.row_bounds(filters, max_rows)
+    chunks, offset = [], start
+    size = chunk_rows if stop is None else max(1, min(chunk_rows, stop - start))
+    for rows in iter_json_table_chunks(buf, entry, size, first_row=start):
+        if stop is not None:
+            rows = rows[:stop - offset]
+        chunks.append(pushdown.records_frame(rows, filters, offset))
+        offset += len(rows)
+        if stop is not None and offset >= stop:
+            break
+    return pushdown.concat_chunks(chunks, filters["columns"])
+
+
+def index_json_file(uploaded_file):
+    """Index the tables of an uploaded JSON file (see index_json_tables), or of a JSON Lines file (index_ndjson)."""
+    buf = upload_buffer(uploaded_file)
+    key = ("json-index", disk_cache.upload_digest(uploaded_file, buf))
+    index = index_ndjson if is_ndjson_file(uploaded_file) else index_json_tables
+    return dataset_cache.get_or_load(key, lambda: index(buf))
+
+
+def load_json_table_data(uploaded_file, table_name, max_rows=None):
+    """Load a single table from an uploaded JSON file without parsing the rest of the document."""
+    buf = upload_buffer(uploaded_file)
+    key = ("json-table", disk_cache.upload_digest(uploaded_file, buf), table_name, max_rows)
+    return dataset_cache.get_or_load(
+        key, lambda: load_json_table(buf, index_json_file(uploaded_file)[table_name], max_rows=max_rows))
+
+
+def is_ndjson(buf, name=None):
+    """
+    Whether a buffer holds JSON Lines: true for NDJSON_EXTENSIONS file names, otherwise when its first two
+    non-blank lines are each a complete JSON object.
+    """
+    if name and name.lower().endswith(NDJSON_EXTENSIONS):
+        return True
+    head = bytes(buf[:NDJSON_SNIFF_BYTES]).removeprefix(codecs.BOM_UTF8)
+    lines = head.split(b"\n")
+    if len(buf) > NDJSON_SNIFF_BYTES:
+        # The last line may be cut off by the sniff window.
+        lines = lines[:-1]
+    lines = [line for line in lines if line.strip()][:2]
+    if len(lines) < 2:
+        return False
+    try:
+        return all(isinstance(json.loads(line), dict) for line in lines)
+    except ValueError:
+        return False
+
+
+def is_ndjson_file(uploaded_file):
+    """Whether an uploaded file is JSON Lines (see is_ndjson)."""
+    return is_ndjson(upload_buffer(uploaded_file), getattr(uploaded_file, "name", None))
+
+
+def _next_newline(view, pos, window=64 * 1024):
+    """Return the position of the first newline at or after `pos`, or -1 if there is none."""
+    while pos < len(view):
+        found = np.flatnonzero(view[pos:pos + window] == _NEWLINE)
+        if found.size:
+            return pos + int(found[0])
+        pos += window
+    return -1
+
+
+def ndjson_chunks(buf, chunk_bytes=NDJSON_CHUNK_BYTES):
+    """Split JSON Lines text into (start, end) byte ranges of about `chunk_bytes`, ending at newlines."""
+    view = np.frombuffer(buf, dtype=np.uint8)
+    start = len(codecs.BOM_UTF8) if bytes(view[:3]) == codecs.BOM_UTF8 else 0
+    bounds = []
+    while start < len(view):
+        end = start + chunk_bytes
+        if end < len(view):
+            newline = _next_newline(view, end)
+            end = len(view) if newline < 0 else newline + 1
+        end = min(end, len(view))
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+
+def index_ndjson(buf):
+    """Index a JSON Lines buffer as a single table: {NDJSON_TABLE: {"format": "ndjson", "rows": line count}}."""
+    view = np.frombuffer(buf, dtype=np.uint8)
+    rows = sum(int(np.count_nonzero(view[lo:lo + SCAN_CHUNK_BYTES] == _NEWLINE))
+               for lo in range(0, len(view), SCAN_CHUNK_BYTES))
+    if len(view) and view[-1] != _NEWLINE:
+        rows += 1
+    return {NDJSON_TABLE: {"format": "ndjson", "rows": rows}}
+
+
+def parse_ndjson_chunk(data, offset=0, max_rows=None, columns=None):
+    """
+    Parse a chunk of JSON Lines (bytes, `offset` being its position in the file, for error messages) into a
+    DataFrame with one row per non-blank line and one column per key (only `columns`, if given). Keeps at most
+    `max_rows` rows.
+    """
+    if max_rows is not None:
+        # Only the lines needed are split off, unless blank lines are among them.
+        lines = data.split(b"\n", max_rows)
+        kept = [line for line in lines[:max_rows] if line.strip()]
+        if len(kept) < max_rows and len(lines) > max_rows:
+            kept = [line for line in data.split(b"\n") if line.strip()][:max_rows]
+        data = b"\n".join(kept)
+    # All lines are parsed in one call, as the elements of one array.
+    try:
+        records = json.loads(b"[" + data.strip().replace(b"\n", b",") + b"]")
+    except ValueError:
+        records = None
+    if records is None or not all(isinstance(record, dict) for record in records):
+        # Also covers blank lines, which the fast path rejects.
+        return _parse_ndjson_lines(data, offset, columns)
+    return pd.DataFrame.from_records(records, columns=columns)
+
+
+def _parse_ndjson_lines(data, offset, columns=None):
+    """Slow path of parse_ndjson_chunk: parse line by line, skipping blank lines and locating invalid ones."""
+    records, position = [], offset
+    for line in data.split(b"\n"):
+        if line.strip():
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"Invalid JSON Lines record at byte {position}: {e}") from None
+            if not isinstance(record, dict):
+                raise ValueError(f"JSON Lines record at byte {position} is not an object.")
+            records.append(record)
+        position += len(line) + 1
+    return pd.DataFrame.from_records(records, columns=columns)
+
+
+def _pool(workers):
+    """Return the shared process pool for JSON Lines chunks, (re)created with `workers` processes."""
+    global _ndjson_pool
+    if _ndjson_pool is None or _ndjson_pool[0] != workers:
+        if _ndjson_pool is not None:
+            _ndjson_pool[1].shutdown(wait=False, cancel_futures=True)
+        # Spawned rather than forked: the server process runs threads.
+        context = multiprocessing.get_context("spawn")
+        _ndjson_pool = (workers, ProcessPoolExecutor(max_workers=workers, mp_context=context))
+    return _ndjson_pool[1]
+
+
+def _ndjson_line_spans(view, lo, hi):
+    """Return the start and end offsets of the non-blank lines between offsets `lo` and `hi`."""
+    newlines = lo + np.flatnonzero(view[lo:hi] == _NEWLINE)
+    starts = np.concatenate([[lo], newlines + 1])
+    ends = np.concatenate([newlines, [hi]])
+    # Lines holding nothing, or only a carriage return, are blank.
+    lengths = ends - starts
+    blank = (lengths == 0) | ((lengths == 1) & (view[np.minimum(starts, len(view) - 1)] == ord("\r")))
+    return starts[~blank], ends[~blank]
+
+
+def sample_ndjson(buf, k=preview.PREVIEW_ROWS, filters=None, seed=0, chunk_bytes=NDJSON_CHUNK_BYTES):
+    """
+    Draw a uniform random sample of `k` records from a JSON Lines buffer in one streaming pass: each chunk's
+    line boundaries are found vectorized and offered to a reservoir (see preview.Reservoir), and only the
+    sampled lines are parsed. Filters apply as in sample_json_table. Returns the sample, in file order, and the
+    number of records it was drawn from.
+    """
+    view = np.frombuffer(buf, dtype=np.uint8)
+    start, stop = pushdown.row_bounds(filters)
+    reservoir = preview.Reservoir(k, seed)
+    rows = 0
+    for lo, hi in ndjson_chunks(buf, chunk_bytes):
+        if stop is not None and rows >= stop:
+            break
+        starts, ends = _ndjson_line_spans(view, lo, hi)
+        first, last = max(0, start - rows), None if stop is None else max(0, stop - rows)
+        _offer_spans(reservoir, starts[first:last], ends[first:last])
+        rows += len(starts)
+    return _parse_sampled(buf, reservoir, filters)
+
+
+def _parse_ndjson_batch(data, offset, max_rows, filters):
+    """
+    Worker task of read_ndjson: parse a chunk and apply the conditions and column subset of `filters`.
+    Returns the frame, indexed by row position within the chunk, and the number of rows parsed.
+    """
+    df = parse_ndjson_chunk(data, offset, max_rows, pushdown.read_columns(filters))
+    rows = len(df)
+    if filters is not None:
+        # The row range is applied by the caller, which knows where the chunk starts in the table.
+        df = pushdown.filter_chunk(df, {**filters, "rows": None})
+    return df, rows
+
+
+def read_ndjson(buf, max_rows=None, workers=NDJSON_WORKERS, chunk_bytes=NDJSON_CHUNK_BYTES, filters=None):
+    """
+    Read JSON Lines from a bytes-like buffer into one DataFrame.
+    The text is split at newlines into chunks (see ndjson_chunks), the chunks are parsed into DataFrames by a
+    pool of `workers` processes and the batches are concatenated once. With `max_rows`, chunks are only
+    parsed until that many rows have been read (a quick preview of the start of the file).
+    Load `filters` (see pushdown.make_filters) are applied by the workers as each chunk is parsed, so only
+    matching rows of the needed columns are sent back; parsing stops at the end of the row range.
+    """
+    bounds = ndjson_chunks(buf, chunk_bytes)
+    if not bounds:
+        return pd.DataFrame()
+    start, stop = pushdown.row_bounds(filters, max_rows)
+    batches, rows = [], 0
+
+    def keep(batch, parsed):
+        # Drop the rows of the batch outside the row range (rows before it are counted, not kept).
+        nonlocal rows
+        if start or stop is not None:
+            positions = rows + batch.index.to_numpy()
+            batch = batch[(positions >= start) & (positions < (stop if stop is not None else np.inf))]
+        batches.append(batch)
+        rows += parsed
+        return stop is not None and rows >= stop
+
+    if workers <= 1 or len(bounds) == 1:
+        for lo, hi in bounds:
+            if keep(*_parse_ndjson_batch(bytes(buf[lo:hi]), lo, None if stop is None else stop - rows, filters)):
+                break
+    else:
+        pool = _pool(workers)
+        # Chunks are submitted a few at a time so that a row cap stops the work early.
+        pending, next_chunk = [], 0
+        while next_chunk < len(bounds) or pending:
+            while next_chunk < len(bounds) and len(pending) < 2 * workers:
+                lo, hi = bounds[next_chunk]
+                pending.append(pool.submit(_parse_ndjson_batch, bytes(buf[lo:hi]), lo, stop, filters))
+                next_chunk += 1
+            if keep(*pending.pop(0).result()):
+                for future in pending:
+                    future.cancel()
+                break
+    return pushdown.concat_chunks(batches)
 
 
 def extract_json_tables(json_data):
@@ -0,0 +1,75 @@
+import os
+import queue
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Worker threads shared by all sessions. CSV parsing and compaction spend most of their time in pyarrow, pandas
+# and NumPy code that releases the GIL, so threads overlap the files without copying frames between processes.
+# At least two, so that both files of a comparison are always prepared at once. JSON parsing, frame building and
+# flattening hold the GIL (json.loads and per-record Python objects), so threads would not overlap them: JSON
+# files are prepared one after another (concurrent=False below).
+MAX_WORKERS = int(os.environ.get("VISUALIZER_LOAD_WORKERS", str(max(2, min(8, os.cpu_count() or 1)))))
+# How often the calling thread wakes up to report progress while tasks run.
+POLL_SECONDS = 0.1
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="visualizer-load")
+
+
+def submit(task):
+    """Run `task()` on the shared worker pool without waiting for it; returns its Future."""
+    return _executor.submit(task)
+
+
+def run_parallel(tasks, on_progress=None, concurrent=True):
+    """
+    Run `tasks` concurrently on the shared worker pool and return their results in order.
+    Each task is called with a `progress(stage)` callback it may use to name the stage it is starting.
+    `on_progress(index, stage)` is then called in the calling thread, with `stage=None` once task `index`
+    has finished. If a task raises, the first exception (in task order) is re-raised after all tasks are done.
+    With `concurrent=False`, the tasks run one after another in the calling thread instead (for work that holds
+    the GIL), and the first exception is raised at once.
+    """
+    if not concurrent:
+        report = on_progress or (lambda i, stage: None)
+        results = []
+        for i, task in enumerate(tasks):
+            results.append(task(lambda stage, i=i: report(i, stage)))
+            report(i, None)
+        return results
+    updates = queue.SimpleQueue()
+    futures = [_executor.submit(task, lambda stage, i=i: updates.put((i, stage))) for i, task in enumerate(tasks)]
+    index = {future: i for i, future in enumerate(futures)}
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, timeout=POLL_SECONDS, return_when=FIRST_COMPLETED)
+        while not updates.empty():
+            i, stage = updates.get()
+            if on_progress is not None:
+                on_progress(i, stage)
+        if on_progress is not None:
+            for future in done:
+                on_progress(index[future], None)
+    return [future.result() for future in futures]
+
+
+def run_with_progress(tasks, labels, stages, concurrent=True):
+    """
+    Run `tasks` with run_parallel, showing one progress bar per task (titled by `labels`) that advances through
+    the ordered stage names in `stages`. The bars are removed once every task has finished.
+    """
+    import streamlit as st
+
+    placeholder = st.empty()
+    with placeholder.container():
+        bars = [st.progress(0.0, text=f"{label}: waiting") for label in labels]
+
+    def on_progress(i, stage):
+        if stage is None:
+            bars[i].progress(1.0, text=f"{labels[i]}: done")
+        else:
+            position = stages.index(stage) if stage in stages else 0
+            bars[i].progress(position / len(stages), text=f"{labels[i]}: {stage}")
+
+    try:
+        return run_parallel(tasks, on_progress, concurrent)
+    finally:
+        placeholder.empty()
@@ -0,0 +1,370 @@
+"""
+Memoized page pipeline: load (with pushed-down load filters) -> table select -> frame build -> flatten -> compact
+-> projection/convert -> (resample) -> chart. In preview mode, the load and frame build stages are replaced by a
+random sample of the rows while the full load runs in the background.
+
+Each stage is cached on its own inputs, so a widget change only re-runs the stages downstream of it
+(e.g. toggling "Show Markers" only rebuilds the figure). Stages receive their upstream data through an
+underscore-prefixed argument, which Streamlit does not hash, and are keyed by explicit `key` tuples that
+identify that data instead. The load, frame build, flatten and compact stages are held in the memory-bounded
+dataset cache (see dataset_cache) rather than in Streamlit's cache, and make no Streamlit calls, so the
+CSV comparison page runs them for all files at once. Cached frames are shared between reruns and sessions:
+treat them as read-only.
+
+The stages are instrumented (see diagnostics): with diagnostics enabled, every call records its wall time, the
+rows it returned and whether it was answered from a cache.
+"""
+import pandas as pd
+import streamlit as st
+
+from visualizer.utils import (
+    alignment,
+    chart_utils,
+    compact,
+    csv_parser,
+    diagnostics,
+    figure_cache,
+    json_parser,
+    pushdown,
+    resample,
+    row_diff,
+    stats_utils,
+)
+from visualizer.utils.data_utils import (
+    comparison_chart_frame,
+    concat_tagged,
+    convert_timestamp_axis,
+    flatten_json_columns,
+)
+from visualizer.utils.dataset_cache import dataset_cache
+
+
+def upload_key(uploaded_file):
+    """Return a cheap identity for an upload, so that stages never hash its content."""
+    file_id = getattr(uploaded_file, "file_id", None)
+    if file_id is not None:
+        return file_id
+    return getattr(uploaded_file, "name", None), getattr(uploaded_file, "size", None), id(uploaded_file)
+
+
+def file_labels(uploaded_files):
+    """Return a unique display name for each upload: its file name, numbered when several uploads share it."""
+    names = [getattr(f, "name", None) or f"File {i}" for i, f in enumerate(uploaded_files, start=1)]
+    labels = []
+    for name in names:
+        label, n = name, 1
+        while label in labels:
+            n += 1
+            label = f"{name} ({n})"
+        labels.append(label)
+    return labels
+
+
+@st.cache_resource(max_entries=16)
+def csv_columns(file_key, _uploaded_file):
+    """Column names of a CSV upload, read from its header, for the load filter panel."""
+    return csv_parser.csv_columns(_uploaded_file)
+
+
+@diagnostics.stage("Parse CSV")
+def csv_frame(file_key, filters, _uploaded_file):
+    """
+    Load stage for CSV uploads, with `filters` pushed into the parse (cached by the parser, keyed by content).
+    Parse errors are raised as ValueError, for the page to show.
+    """
+    return csv_parser.load_csv(_uploaded_file, filters)
+
+
+@diagnostics.stage("Sample CSV")
+def csv_preview(file_key, filters, _uploaded_file):
+    """Preview stage for CSV uploads: a random sample of the rows and their total count (dataset cache)."""
+    return dataset_cache.get_or_load(("csv-preview", file_key, pushdown.filters_key(filters)),
+                                     lambda: csv_parser.sample_csv(_uploaded_file, filters))
+
+
+@diagnostics.stage("Load JSON")
+def json_tables(file_key, streaming, _uploaded_file):
+    """
+    Load stage for JSON uploads (cached by the parser, keyed by content).
+    Returns a dict mapping table names to their index entries (streaming, and always for JSON Lines files) or
+    their rows (full load).
+    """
+    if streaming or json_parser.is_ndjson_file(_uploaded_file):
+        return json_parser.index_json_file(_uploaded_file)
+    return json_parser.extract_json_tables(json_parser.load_json_data(_uploaded_file))
+
+
+@diagnostics.stage("Build table frame")
+def table_frame(file_key, table_name, streaming, max_rows, filters, _uploaded_file):
+    """
+    Table select and frame build stage for JSON uploads (JSON Lines files are read in parallel chunks).
+    Load `filters` are pushed into the frame build, so only matching rows of the needed keys become columns.
+    """
+    if pushdown.filters_key(filters) is None:
+        filters = None
+
+    def build():
+        if streaming or json_parser.is_ndjson_file(_uploaded_file):
+            entry = json_tables(file_key, True, _uploaded_file)[table_name]
+            buf = json_parser.upload_buffer(_uploaded_file)
+            if entry.get("format") == "ndjson":
+                return json_parser.read_ndjson(buf, max_rows=max_rows, filters=filters)
+            if filters is None:
+                return pd.DataFrame(json_parser.load_json_table(buf, entry, max_rows=max_rows))
+            return json_parser.read_json_table(buf, entry, filters, max_rows=max_rows)
+        rows = json_tables(file_key, False, _uploaded_file).get(table_name, [])
+        start, stop = pushdown.row_bounds(filters, max_rows)
+        if filters is None:
+            return pd.DataFrame(rows if stop is None else rows[:stop])
+        return pushdown.records_frame(rows[start:stop], filters, start)
+
+    key = ("table-frame", file_key, table_name, streaming, max_rows, pushdown.filters_key(filters))
+    return dataset_cache.get_or_load(key, build)
+
+
+@diagnostics.stage("Sample JSON table")
+def table_preview(file_key, table_name, max_rows, filters, _uploaded_file):
+    """
+    Preview stage for indexed JSON tables and JSON Lines files: a random sample of the rows (among the first
+    `max_rows`, if set) and the number of rows it was drawn from (dataset cache).
+    """
+    def sample():
+        entry = json_tables(file_key, True, _uploaded_file)[table_name]
+        buf = json_parser.upload_buffer(_uploaded_file)
+        # The row cap becomes part of the row range.
+        given = filters or pushdown.NO_FILTERS
+        capped = pushdown.make_filters(given["columns"], *pushdown.row_bounds(given, max_rows), given["predicates"])
+        if entry.get("format") == "ndjson":
+            return json_parser.sample_ndjson(buf, filters=capped)
+        return json_parser.sample_json_table(buf, entry, filters=capped)
+
+    key = ("table-preview", file_key, table_name, max_rows, pushdown.filters_key(filters))
+    return dataset_cache.get_or_load(key, sample)
+
+
+def table_columns(file_key, table_name, streaming, _uploaded_file):
+    """
+    Column names of a JSON table for the load filter panel, from its first pushdown.SCHEMA_SAMPLE_ROWS rows
+    (keys that only appear further down are not listed).
+    """
+    sample = table_frame(file_key, table_name, streaming, pushdown.SCHEMA_SAMPLE_ROWS, None, _uploaded_file)
+    return list(sample.columns)
+
+
+@diagnostics.stage("Flatten")
+def flattened_frame(frame_key, flatten, max_depth, _df):
+    """Flatten stage, held in the dataset cache. Returns the frame and the mapping of flattened columns."""
+    if not flatten:
+        return _df, {}
+    return dataset_cache.get_or_load(("flatten", frame_key, max_depth),
+                                     lambda: flatten_json_columns(_df, max_depth=max_depth))
+
+
+@diagnostics.stage("Compact")
+def compacted_frame(frame_key, enabled, _df):
+    """
+    Compaction stage (see compact.compact_frame), held in the dataset cache.
+    Returns the frame and the compaction report (None when compaction is disabled).
+    """
+    if not enabled:
+        return _df, None
+    return dataset_cache.get_or_load(("compact", frame_key), lambda: compact.compact_frame(_df))
+
+
+def _no_progress(stage):
+    pass
+
+
+# Stage names reported by the per-file chains below, in order.
+CSV_STAGES = ["Loading", "Compacting"]
+JSON_STAGES = ["Building frame", "Flattening", "Compacting"]
+
+
+def prepared_csv_frame(file_key, filters, compact_enabled, _uploaded_file, progress=_no_progress):
+    """
+    Per-file chain for CSV comparisons: load (with load `filters`) -> compact. Free of Streamlit calls, so that
+    files can be prepared concurrently (see parallel.run_parallel); `progress` is called with each stage in
+    CSV_STAGES. Returns the frame key, the frame and the compaction report. Parse errors are raised, and
+    run_parallel re-raises them in the calling thread.
+    """
+    progress("Loading")
+    load_key = (file_key, pushdown.filters_key(filters))
+    df = csv_frame(file_key, filters, _uploaded_file)
+    progress("Compacting")
+    df, report = compacted_frame(load_key, compact_enabled, df)
+    return (load_key, compact_enabled), df, report
+
+
+def prepared_json_frame(file_key, table_name, filters, flatten, max_depth, compact_enabled, _uploaded_file,
+                        progress=_no_progress):
+    """
+    Per-file chain for JSON comparisons: frame build (with load `filters`) -> flatten -> compact, with the same
+    properties as prepared_csv_frame (stages in JSON_STAGES). Returns the table frame and its key, then the frame
+    key, frame, flattened column mapping and compaction report of the prepared frame.
+    """
+    progress("Building frame")
+    table_key = (file_key, table_name, False, None, pushdown.filters_key(filters))
+    table_df = table_frame(file_key, table_name, False, None, filters, _uploaded_file)
+    progress("Flattening")
+    df, mapping = flattened_frame(table_key, flatten, max_depth, table_df)
+    frame_key = table_key + (flatten, max_depth)
+    progress("Compacting")
+    df, report = compacted_frame(frame_key, compact_enabled, df)
+    return table_df, table_key, (frame_key, compact_enabled), df, mapping, report
+
+
+def _project(df, x_col, y_col):
+    return df[[x_col, y_col]].dropna()
+
+
+@diagnostics.stage("Chart frame", cached=True)
+@st.cache_resource(max_entries=32)
+def chart_frame(frame_key, x_col, y_col, _df):
+    """
+    Projection/convert stage: keep the two chart columns, drop missing values and convert timestamp axes.
+    Returns the chart frame and an error message (None on success).
+    """
+    diagnostics.record_cache(hit=False)
+    chart_df = _project(_df, x_col, y_col)
+    try:
+        return convert_timestamp_axis(chart_df, x_col), None
+    except (ValueError, OverflowError) as e:
+        return chart_df, f"Timestamp conversion failed: {e}"
+
+
+@diagnostics.stage("Comparison frame", cached=True)
+@st.cache_resource(max_entries=32)
+def comparison_frame(frame_keys, x_col, y_col, _dfs, names=None):
+    """
+    Projection/convert stage for comparisons: project each file to the chart columns, concatenate them and tag
+    the rows with a categorical "File" column (see data_utils.comparison_chart_frame).
+    Returns the combined frame, the per-file slices of it and an error message.
+    """
+    diagnostics.record_cache(hit=False)
+    return comparison_chart_frame(_dfs, x_col, y_col, names)
+
+
+@diagnostics.stage("Resample", cached=True)
+@st.cache_resource(max_entries=16)
+def resampled_frame(frame_key, x_col, y_col, bucket, aggregation, group_col, x_range, _df):
+    """
+    Resampling stage for time-series mode (see resample.resample_frame).
+    Returns the resampled frame, the bucket used and an error message (None on success).
+    """
+    diagnostics.record_cache(hit=False)
+    try:
+        df, used_bucket = resample.resample_frame(_df, x_col, y_col, bucket, aggregation, group_col, x_range)
+    except (ValueError, TypeError, OverflowError) as e:
+        return _df, None, str(e)
+    return df, used_bucket, None
+
+
+def chart_figure(x_col, y_col, chart_type, options, comparison, df):
+    """
+    Chart stage: build the Plotly figure for a chart frame. Figures are held in the figure cache, keyed by the
+    fingerprint of the frame's content together with the axes, chart type and options, so reruns that change
+    none of these (e.g. paging a table) reuse the serialized figure instead of rebuilding it.
+    """
+    with diagnostics.span("Build figure", rows=len(df)):
+        key = (figure_cache.fingerprint(df), x_col, y_col, chart_type, figure_cache.options_key(options), comparison)
+        if comparison:
+            return figure_cache.figure_cache.get_or_build(
+                key, lambda: chart_utils.build_comparison_chart(df, x_col, y_col, chart_type, options))
+        return figure_cache.figure_cache.get_or_build(
+            key, lambda: chart_utils.build_plotly_chart(df, x_col, y_col, chart_type, options))
+
+
+@diagnostics.stage("Align", cached=True)
+@st.cache_resource(max_entries=64)
+def alignment_positions(frame_keys, mode, keys, on, tolerance, _dfs):
+    """
+    Alignment stage: the row positions pairing the first file of a pair (the baseline) with the second
+    (see alignment.align_positions).
+    Returns the positions and an error message (None on success).
+    """
+    diagnostics.record_cache(hit=False)
+    try:
+        return alignment.align_positions(*_dfs, mode, keys=keys, on=on, tolerance=tolerance), None
+    except (ValueError, KeyError, TypeError) as e:
+        return None, str(e)
+
+
+@diagnostics.stage("Statistics", cached=True)
+@st.cache_resource(max_entries=64)
+def comparison_stats(align_key, columns, _dfs, _positions):
+    """Statistics stage: error metrics of the second file against the first (the baseline) on aligned rows."""
+    diagnostics.record_cache(hit=False)
+    df1, df2 = _dfs
+    columns = [col for col in columns if col in df1.columns and col in df2.columns]
+    left = alignment.take_aligned(df1, _positions[0], columns)
+    right = alignment.take_aligned(df2, _positions[1], columns)
+    return stats_utils.comparison_stats(left, right, columns)
+
+
+@diagnostics.stage("Row diff", cached=True)
+@st.cache_resource(max_entries=8)
+def row_differences(frame_keys, keys, _dfs):
+    """
+    Row diff stage: the rows added, removed and modified in the second file of a pair relative to the first
+    (the baseline), matched on the `keys` columns (see row_diff.diff_rows).
+    Returns the diff and an error message (None on success).
+    """
+    diagnostics.record_cache(hit=False)
+    try:
+        return row_diff.diff_rows(*_dfs, keys=keys), None
+    except (ValueError, TypeError) as e:
+        return None, str(e)
+
+
+def baseline_alignment(frame_keys, baseline, mode, keys, on, tolerance, _dfs):
+    """
+    Align every file with the baseline file (index `baseline`) through the pairwise alignment stage.
+    Returns a dict mapping each other file's index to its positions, and an error message per failed file.
+    """
+    positions, errors = {}, {}
+    for i, (frame_key, df) in enumerate(zip(frame_keys, _dfs)):
+        if i == baseline:
+            continue
+        pair_keys = (frame_keys[baseline], frame_key)
+        positions[i], error = alignment_positions(pair_keys, mode, keys, on, tolerance, (_dfs[baseline], df))
+        if error:
+            errors[i] = error
+    return positions, errors
+
+
+@st.cache_resource(max_entries=32)
+def baseline_stats(align_key, columns, names, baseline, _dfs, _positions):
+    """
+    Statistics stage for N files: error metrics of every file against the baseline on aligned rows, as one
+    frame with a leading "File" column.
+    """
+    frames = []
+    for i, pair_positions in _positions.items():
+        pair_key = align_key + (i,)
+        stats_df = comparison_stats(pair_key, columns, (_dfs[baseline], _dfs[i]), pair_positions)
+        frames.append(stats_df.assign(File=names[i]))
+    if not frames:
+        return pd.DataFrame(columns=["File"] + stats_utils.STATS_COLUMNS)
+    stats_df = pd.concat(frames, ignore_index=True)
+    return stats_df[["File"] + stats_utils.STATS_COLUMNS]
+
+
+@st.cache_resource(max_entries=16)
+def baseline_difference_frame(align_key, x_col, y_col, names, baseline, _dfs, _positions):
+    """
+    Difference stage for N files: each file's `y_col` minus the baseline's on aligned rows, against the
+    baseline's `x_col`, tagged with a categorical "File" column.
+    Returns the frame, the name of the difference column and an error message (None on success).
+    """
+    parts, diff_col = [], f"{y_col} difference"
+    for i, pair_positions in _positions.items():
+        diff_df, diff_col = alignment.difference_frame(_dfs[baseline], _dfs[i], pair_positions, x_col, y_col)
+        parts.append(diff_df)
+    others = [names[i] for i in _positions]
+    if not parts:
+        return pd.DataFrame(columns=[x_col, diff_col, "File"]), diff_col, None
+    diff_df = concat_tagged(parts, others)
+    try:
+        return convert_timestamp_axis(diff_df, x_col), diff_col, None
+    except (ValueError, OverflowError) as e:
+        return diff_df, diff_col, f"Timestamp conversion failed: {e}"
@@ -0,0 +1,115 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from visualizer.utils import parallel
+
+# Rows drawn for a preview sample.
+PREVIEW_ROWS = 10_000
+# Uploads larger than this open in preview mode by default.
+PREVIEW_THRESHOLD_BYTES = 100 * 1024 * 1024
+# How often a page showing a preview checks whether the full dataset has finished loading.
+REFRESH_SECONDS = 1.0
+# Background loads remembered, finished or not; the loaded frames themselves live in the dataset cache.
+MAX_BACKGROUND_LOADS = 32
+
+_loads = OrderedDict()
+_loads_lock = threading.Lock()
+
+
+class Reservoir:
+    """
+    A uniform random sample of at most `k` rows from a stream of batches, kept in one pass.
+    Each row gets a random key and the `k` rows with the smallest keys are kept, which is a uniform sample
+    without replacement; once the reservoir is full, only rows whose key beats the largest kept one are
+    materialized, so the cost per batch shrinks as the stream goes on.
+    """
+
+    def __init__(self, k=PREVIEW_ROWS, seed=0):
+        self.k = k
+        self.seen = 0
+        self._rng = np.random.default_rng(seed)
+        self._keys = np.empty(0)
+        self._positions = np.empty(0, dtype=np.int64)
+        self._rows = None
+
+    def add(self, n, take):
+        """
+        Offer the next `n` rows of the stream. `take(indices)` is called with the positions (within the batch)
+        of the candidate rows and must return them as a DataFrame.
+        """
+        keys = self._rng.random(n)
+        positions = self.seen + np.arange(n)
+        self.seen += n
+        chosen = np.flatnonzero(keys < self._keys.max()) if len(self._keys) >= self.k else np.arange(n)
+        if not len(chosen):
+            return
+        rows = take(chosen).reset_index(drop=True)
+        keys = np.concatenate([self._keys, keys[chosen]])
+        positions = np.concatenate([self._positions, positions[chosen]])
+        rows = rows if self._rows is None else pd.concat([self._rows, rows], ignore_index=True)
+        if len(keys) > self.k:
+            keep = np.argpartition(keys, self.k - 1)[:self.k]
+            keys, positions, rows = keys[keep], positions[keep], rows.iloc[keep].reset_index(drop=True)
+        self._keys, self._positions, self._rows = keys, positions, rows
+
+    def sample(self):
+        """Return the sampled rows in stream order (empty if nothing was offered) and the stream positions."""
+        if self._rows is None:
+            return pd.DataFrame(), self._positions
+        order = np.argsort(self._positions, kind="stable")
+        return self._rows.iloc[order].reset_index(drop=True), self._positions[order]
+
+
+def schema_frame(df):
+    """Describe the columns of a (sample) frame: dtype, share of non-missing values and an example value."""
+    present = df.notna()
+    examples = [df[col][present[col]].iloc[0] if present[col].any() else None for col in df.columns]
+    return pd.DataFrame({
+        "Column": [str(col) for col in df.columns],
+        "Type": [str(dtype) for dtype in df.dtypes],
+        "Non-null": [f"{share:.0%}" for share in (present.mean() if len(df) else np.zeros(len(df.columns)))],
+        "Example": ["" if value is None else str(value) for value in examples],
+    })
+
+
+def load_in_background(key, loader):
+    """
+    Start `loader()` on the shared worker pool unless a load with the same `key` was already started, so that
+    the full dataset is loaded (into the dataset cache) while the page shows a preview. Returns the Future.
+    """
+    def run():
+        # The result is not kept here: the loader caches it.
+        loader()
+
+    with _loads_lock:
+        if key in _loads:
+            _loads.move_to_end(key)
+            return _loads[key]
+        future = parallel.submit(run)
+        _loads[key] = future
+        # Forget the oldest finished loads; their frames stay in the dataset cache.
+        for old_key in [k for k, f in _loads.items() if f.done()][:max(0, len(_loads) - MAX_BACKGROUND_LOADS)]:
+            del _loads[old_key]
+        return future
+
+
+def is_loaded(key):
+    """Return True once the background load for `key` has finished (successfully or not)."""
+    with _loads_lock:
+        future = _loads.get(key)
+    return future is not None and future.done()
+
+
+def refresh_when_loaded(key):
+    """Rerun the page once the background load for `key` has finished, checking every REFRESH_SECONDS."""
+    import streamlit as st
+
+    @st.fragment(run_every=REFRESH_SECONDS)
+    def watch():
+        if is_loaded(key):
+            st.rerun()
+
+    watch()
@@ -0,0 +1,210 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from visualizer.utils.data_utils import FILTER_OPERATORS, epoch_unit, filter_mask
+
+# Operators accepted in row conditions: those of the table filter, plus "in" (a list of values) and "between"
+# (two bounds, inclusive).
+CONDITION_OPERATORS = ["between", "in"] + FILTER_OPERATORS
+# Rows parsed per chunk when a file is filtered while it is read.
+CHUNK_ROWS = 100_000
+# Rows sampled to list the columns offered by the filter panel for JSON tables.
+SCHEMA_SAMPLE_ROWS = 1000
+
+# Load filters that read the whole file.
+NO_FILTERS = {"columns": None, "rows": None, "predicates": ()}
+
+_NS_PER_UNIT = {"s": 1e9, "ms": 1e6, "us": 1e3, "ns": 1.0}
+# Word operators need a space after them; symbols are tried longest first.
+_OPERATOR_RE = re.compile(r"\s*(between\s|in\s|contains\s|!=|>=|<=|=|>|<)\s*(.*)$", re.IGNORECASE | re.DOTALL)
+
+
+def make_filters(columns=None, start=0, stop=None, predicates=()):
+    """
+    Build load filters: the `columns` to keep (None for all), the half-open range of file rows
+    [`start`, `stop`) to read (`stop` None for the end of the file) and the row conditions, as
+    (column, operator, value) tuples with an operator from CONDITION_OPERATORS. All parts are hashable.
+    """
+    rows = None if not start and stop is None else (int(start), None if stop is None else int(stop))
+    return {"columns": tuple(columns) if columns else None, "rows": rows, "predicates": tuple(predicates)}
+
+
+def filters_key(filters):
+    """Return a hashable key identifying `filters` (None when nothing is filtered)."""
+    if filters is None or filters == NO_FILTERS:
+        return None
+    return filters["columns"], filters["rows"], filters["predicates"]
+
+
+def row_bounds(filters, max_rows=None):
+    """Return the (start, stop) file rows to read; `max_rows` caps the rows read from `start` on."""
+    start, stop = (filters or NO_FILTERS)["rows"] or (0, None)
+    if max_rows is not None:
+        stop = start + max_rows if stop is None else min(stop, start + max_rows)
+    return start, stop
+
+
+def read_columns(filters):
+    """Return the columns a reader must parse: the kept columns plus those tested by conditions (None for all)."""
+    if filters is None or filters["columns"] is None:
+        return None
+    tested = [column for column, _, _ in filters["predicates"]]
+    return list(dict.fromkeys(list(filters["columns"]) + tested))
+
+
+def parse_condition(text, columns):
+    """
+    Parse one row condition such as `value >= 10`, `cat in a, b`, `timestamp between 2024-01-01 and 2024-01-02`
+    or `name contains foo` into a (column, operator, value) tuple. The column must be one of `columns` (names may
+    contain spaces). Raises ValueError if the condition cannot be parsed.
+    """
+    text = text.strip()
+    for column in sorted(columns, key=lambda c: len(str(c)), reverse=True):
+        name = str(column)
+        if not text.startswith(name):
+            continue
+        match = _OPERATOR_RE.match(text[len(name):])
+        if match is None:
+            continue
+        operator, value = match.group(1).strip().lower(), match.group(2).strip()
+        if operator == "in":
+            values = tuple(v.strip().strip("'\"") for v in value.split(",") if v.strip())
+            if not values:
+                raise ValueError(f"No values given in {text!r}.")
+            return column, operator, values
+        if operator == "between":
+            bounds = re.split(r"\s+and\s+", value, maxsplit=1, flags=re.IGNORECASE)
+            if len(bounds) != 2 or not all(bounds):
+                raise ValueError(f"Expected `{name} between <low> and <high>`, got {text!r}.")
+            return column, operator, tuple(b.strip().strip("'\"") for b in bounds)
+        if not value:
+            raise ValueError(f"No value given in {text!r}.")
+        return column, operator, value.strip("'\"")
+    raise ValueError(f"Cannot parse condition {text!r}: expected `<column> <operator> <value>` with an operator "
+                     f"from {', '.join(CONDITION_OPERATORS)}.")
+
+
+def _bound(series, value):
+    """
+    Return the condition value as text comparable with `series`: dates given for a numeric epoch column are
+    converted to the column's unit (see epoch_unit), so time windows work on raw timestamps.
+    """
+    if not pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+        return value
+    try:
+        float(value)
+        return value
+    except ValueError:
+        pass
+    try:
+        timestamp = pd.Timestamp(value)
+    except ValueError:
+        message = f"Cannot compare column {series.name!r} with {value!r}: expected a number or a date."
+        raise ValueError(message) from None
+    return repr(timestamp.value / _NS_PER_UNIT[epoch_unit(series)])
+
+
+def condition_mask(series, operator, value):
+    """Return a boolean NumPy mask of the rows of `series` satisfying one parsed condition."""
+    if operator == "in":
+        mask = np.zeros(len(series), dtype=bool)
+        for item in value:
+            mask |= filter_mask(series, "=", _bound(series, item))
+        return mask
+    if operator == "between":
+        low, high = (_bound(series, bound) for bound in value)
+        return filter_mask(series, ">=", low) & filter_mask(series, "<=", high)
+    if operator == "contains":
+        return filter_mask(series, operator, value)
+    return filter_mask(series, operator, _bound(series, value))
+
+
+def predicate_mask(df, predicates):
+    """Return the mask of the rows of `df` satisfying every condition. Raises ValueError for unknown columns."""
+    mask = np.ones(len(df), dtype=bool)
+    for column, operator, value in predicates:
+        if column not in df.columns:
+            raise ValueError(f"Unknown column in condition: {column!r}")
+        mask &= condition_mask(df[column], operator, value)
+    return mask
+
+
+def filter_chunk(df, filters, offset=0):
+    """
+    Apply load filters to a chunk of rows whose first row is row `offset` of the file: rows outside the row
+    range and rows failing a condition are dropped (the index is kept), then only the kept columns remain.
+    """
+    if filters is None:
+        return df
+    mask = None
+    if filters["rows"] is not None:
+        start, stop = filters["rows"]
+        positions = offset + np.arange(len(df))
+        mask = positions >= start
+        if stop is not None:
+            mask &= positions < stop
+    if filters["predicates"]:
+        conditions = predicate_mask(df, filters["predicates"])
+        mask = conditions if mask is None else mask & conditions
+    if mask is not None and not mask.all():
+        df = df[mask]
+    if filters["columns"] is not None:
+        missing = [column for column in filters["columns"] if column not in df.columns]
+        if missing:
+            raise ValueError(f"Unknown columns: {', '.join(map(str, missing))}")
+        df = df[list(filters["columns"])]
+    return df
+
+
+def concat_chunks(chunks, columns=None):
+    """Concatenate filtered chunks into one frame with a fresh index."""
+    if not chunks:
+        return pd.DataFrame(columns=columns)
+    if len(chunks) == 1:
+        return chunks[0].reset_index(drop=True)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def records_frame(records, filters, offset=0):
+    """Build a frame from row dicts, reading only the needed keys, then apply `filters` (see filter_chunk)."""
+    return filter_chunk(pd.DataFrame.from_records(records, columns=read_columns(filters)), filters, offset)
+
+
+def render_filter_panel(columns, key):
+    """
+    Show the load filter panel for a file with the given `columns` and return the filters it describes.
+    The filters are applied while the file is read, so only the matching rows of the needed columns are ever
+    materialized. `key` prefixes the widget keys.
+    """
+    # Imported here so that the readers can use this module without Streamlit (e.g. in the report command).
+    import streamlit as st
+
+    with st.expander("Load filter (applied while reading the file)"):
+        kept = st.multiselect("Columns to load (none selected = all)", columns, key=f"{key}_cols")
+        first, count = st.columns(2)
+        start = first.number_input("First row", min_value=0, value=0, step=1000, key=f"{key}_start")
+        n_rows = count.number_input("Rows to read (0 = all)", min_value=0, value=0, step=1000, key=f"{key}_rows")
+        window_col, window_from, window_to = st.columns(3)
+        time_col = window_col.selectbox("Time window column", ["(none)"] + list(columns), key=f"{key}_time_col")
+        time_from = window_from.text_input("From", key=f"{key}_time_from")
+        time_to = window_to.text_input("To", key=f"{key}_time_to")
+        conditions = st.text_area("Row conditions, one per line (e.g. `value >= 10`, `cat in a, b`, "
+                                  "`value between 1 and 5`)", key=f"{key}_where")
+
+        predicates = []
+        if time_col != "(none)":
+            if time_from and time_to:
+                predicates.append((time_col, "between", (time_from, time_to)))
+            elif time_from:
+                predicates.append((time_col, ">=", time_from))
+            elif time_to:
+                predicates.append((time_col, "<=", time_to))
+        for line in conditions.splitlines():
+            if line.strip():
+                try:
+                    predicates.append(parse_condition(line, columns))
+                except ValueError as e:
+                    st.error(f"Ignored condition: {e}")
+    return make_filters(kept, start, start + n_rows if n_rows else None, predicates)
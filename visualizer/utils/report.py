@@ -0,0 +1,237 @@
+"""
+Headless batch reports: the charts and statistics of the comparison pages, rendered for a directory of CSV and
+JSON files into standalone HTML files with an index, without Streamlit. Each report (one file, or a pair of
+files) is rendered by its own task on a pool of worker processes.
+"""
+import html
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import plotly.offline
+
+from visualizer.utils import (
+    alignment,
+    chart_utils,
+    csv_parser,
+    json_parser,
+    resample,
+    stats_utils,
+    upload_io,
+)
+from visualizer.utils.data_utils import comparison_chart_frame, flatten_json_columns
+
+# File types read from the input directory.
+REPORT_EXTENSIONS = (".csv", ".json") + json_parser.NDJSON_EXTENSIONS
+# Worker processes rendering reports.
+REPORT_WORKERS = int(os.environ.get("VISUALIZER_REPORT_WORKERS", str(os.cpu_count() or 1)))
+# Plotly's JavaScript bundle, written once next to the reports so that they open offline.
+PLOTLY_JS = "plotly.min.js"
+
+# Spec used for the keys a spec file leaves out.
+DEFAULT_SPEC = {
+    "files": None,         # file names to read (default: every REPORT_EXTENSIONS file, sorted)
+    "table": None,         # table of JSON files (default: the first one)
+    "flatten": True,       # flatten nested JSON columns
+    "max_depth": None,     # flatten depth (None for no limit)
+    "baseline": None,      # compare every other file with this one ...
+    "pairs": None,         # ... or only these [file, file] pairs; neither: one report per file
+    "charts": [],          # {"x", "y", "type", "options", "bucket", "aggregation"}; "bucket" resamples
+    "stats": None,         # numeric columns compared in pairs (default: all shared numeric columns)
+    "align": {"mode": "Row position", "keys": [], "on": None, "tolerance": ""},
+}
+
+_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>{script}
+<style>body{{font-family:sans-serif;margin:2em}}table{{border-collapse:collapse}}
+td,th{{border:1px solid #ccc;padding:4px 8px;text-align:right}}.error{{color:#b00}}</style></head>
+<body><h1>{title}</h1>{body}</body></html>
+"""
+
+
+def load_spec(spec):
+    """
+    Return the report spec given as a dict or as the path of a JSON file, completed with DEFAULT_SPEC.
+    Raises ValueError for an invalid spec.
+    """
+    if not isinstance(spec, dict):
+        with open(spec, encoding="utf-8") as source:
+            spec = json.load(source)
+    unknown = sorted(set(spec) - set(DEFAULT_SPEC))
+    if unknown:
+        raise ValueError(f"Unknown spec keys: {', '.join(unknown)}")
+    spec = {**DEFAULT_SPEC, **spec, "align": {**DEFAULT_SPEC["align"], **spec.get("align", {})}}
+    if spec["baseline"] and spec["pairs"]:
+        raise ValueError("Give either a baseline or comparison pairs, not both.")
+    if spec["pairs"] and any(len(pair) != 2 for pair in spec["pairs"]):
+        raise ValueError("Each comparison pair must name two files.")
+    for chart in spec["charts"]:
+        if "x" not in chart or "y" not in chart:
+            raise ValueError(f"Chart {chart} needs an \"x\" and a \"y\" column.")
+    if spec["align"]["mode"] not in alignment.ALIGNMENT_MODES:
+        raise ValueError(f"Alignment mode must be one of {', '.join(alignment.ALIGNMENT_MODES)}.")
+    return spec
+
+
+def plan_reports(directory, spec):
+    """
+    Return the reports to render for the files of `directory`: a list of (name, file names) tasks, one per
+    comparison pair, per file compared with the baseline, or per file. Raises ValueError for unknown files.
+    """
+    present = sorted(name for name in os.listdir(directory)
+                     if name.lower().endswith(REPORT_EXTENSIONS) and os.path.isfile(os.path.join(directory, name)))
+    files = spec["files"] or present
+    named = list(files) + [spec["baseline"]] * bool(spec["baseline"]) + [f for p in spec["pairs"] or [] for f in p]
+    missing = sorted(set(named) - set(present))
+    if missing:
+        raise ValueError(f"Files not found in {directory}: {', '.join(missing)}")
+    if spec["pairs"]:
+        groups = [tuple(pair) for pair in spec["pairs"]]
+    elif spec["baseline"]:
+        groups = [(spec["baseline"], name) for name in files if name != spec["baseline"]]
+    else:
+        groups = [(name,) for name in files]
+    tasks, used = [], set()
+    for group in groups:
+        name = base = "_vs_".join(re.sub(r"[^\w.-]+", "_", file_name) for file_name in group)
+        suffix = 1
+        while name in used:
+            suffix += 1
+            name = f"{base}-{suffix}"
+        used.add(name)
+        tasks.append((name, group))
+    return tasks
+
+
+def load_frame(path, spec):
+    """Load a CSV or JSON file as a DataFrame, with the parsers of the app (see csv_parser and json_parser)."""
+    upload = upload_io.FileUpload(path)
+    if path.lower().endswith(".csv"):
+        return csv_parser.load_csv(upload)
+    tables = json_parser.index_json_file(upload)
+    if not tables:
+        raise ValueError(f"No tables found in {upload.name}.")
+    table = spec["table"] or next(iter(tables))
+    if table not in tables:
+        raise ValueError(f"Table {table!r} not found in {upload.name}; it has {', '.join(map(str, tables))}.")
+    buf = upload.getbuffer()
+    if tables[table].get("format") == "ndjson":
+        # Reports already run one per worker process, so the lines are parsed in this process.
+        df = json_parser.read_ndjson(buf, workers=1)
+    else:
+        df = pd.DataFrame(json_parser.load_json_table(buf, tables[table]))
+    if spec["flatten"]:
+        df, _ = flatten_json_columns(df, max_depth=spec["max_depth"])
+    return df
+
+
+def _chart_html(dfs, names, chart):
+    """Render one chart of the spec for the report's files as HTML elements (several for comparison pies)."""
+    x_col, y_col = chart["x"], chart["y"]
+    chart_type, options = chart.get("type", "Line Chart"), chart.get("options", {})
+    missing = [f"{name}: {col}" for df, name in zip(dfs, names) for col in (x_col, y_col) if col not in df.columns]
+    if missing:
+        raise ValueError(f"Chart columns not found ({', '.join(missing)}).")
+    chart_df, parts, error = comparison_chart_frame(dfs, x_col, y_col, names)
+    if error:
+        raise ValueError(error)
+    group_col = "File" if len(dfs) > 1 else None
+    if "bucket" in chart:
+        chart_df, _ = resample.resample_frame(chart_df, x_col, y_col, chart["bucket"],
+                                              chart.get("aggregation", "mean"), group_col)
+        parts = [chart_df]
+    if group_col is None:
+        figures = [chart_utils.build_plotly_chart(parts[0], x_col, y_col, chart_type, options)]
+    elif chart_type == "Pie Chart":
+        figures = [chart_utils.build_plotly_chart(part, x_col, y_col, chart_type, options).update_layout(
+            title=f"{name} - Pie Chart") for name, part in zip(names, parts)]
+    else:
+        figures = [chart_utils.build_comparison_chart(chart_df, x_col, y_col, chart_type, options)]
+    return "".join(fig.to_html(full_html=False, include_plotlyjs=False) for fig in figures)
+
+
+def _stats_html(dfs, names, spec):
+    """Align the second file with the first and render the comparison metrics as an HTML table."""
+    columns = spec["stats"] or stats_utils.common_numeric_columns(*dfs)
+    align = spec["align"]
+    pos1, pos2 = alignment.align_positions(*dfs, align["mode"], keys=tuple(align["keys"]), on=align["on"],
+                                           tolerance=align["tolerance"])
+    stats_df = stats_utils.comparison_stats(alignment.take_aligned(dfs[0], pos1, columns),
+                                            alignment.take_aligned(dfs[1], pos2, columns), columns)
+    caption = (f"<p>{len(pos1):,} rows aligned ({html.escape(align['mode'])}); metrics of "
+               f"{html.escape(names[1])} against {html.escape(names[0])}.</p>")
+    return caption + stats_df.to_html(index=False, float_format=lambda v: f"{v:.6g}", na_rep="")
+
+
+def render_report(directory, name, group, spec, out_dir):
+    """
+    Render the report of one group of files to `out_dir`/`name`.html. Runs in a worker process; failures are
+    reported in the returned summary (name, files, file, status, error, rows, seconds) rather than raised.
+    """
+    started = time.perf_counter()
+    summary = {"name": name, "files": list(group), "file": f"{name}.html", "status": "ok", "error": None,
+               "rows": []}
+    sections = []
+    try:
+        dfs = [load_frame(os.path.join(directory, file_name), spec) for file_name in group]
+        summary["rows"] = [len(df) for df in dfs]
+        for chart in spec["charts"]:
+            sections.append(_chart_html(dfs, list(group), chart))
+        if len(dfs) == 2:
+            sections.append("<h2>Statistics</h2>" + _stats_html(dfs, list(group), spec))
+    except Exception as e:  # noqa: BLE001 - one failing report must not stop the batch
+        summary["status"], summary["error"] = "error", f"{type(e).__name__}: {e}"
+        sections.append(f'<p class="error">{html.escape(summary["error"])}</p>')
+    body = '<p><a href="index.html">All reports</a></p>' + "".join(sections)
+    script = f'<script src="{PLOTLY_JS}"></script>'
+    with open(os.path.join(out_dir, summary["file"]), "w", encoding="utf-8") as sink:
+        sink.write(_PAGE.format(title=html.escape(" vs ".join(group)), script=script, body=body))
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def write_index(out_dir, results):
+    """Write the report index: index.html, linking every report with its status, and index.json."""
+    rows = "".join(
+        f'<tr><td style="text-align:left"><a href="{html.escape(r["file"])}">{html.escape(" vs ".join(r["files"]))}'
+        f'</a></td><td class="{"error" if r["error"] else ""}">{html.escape(r["error"] or r["status"])}</td>'
+        f'<td>{" / ".join(f"{n:,}" for n in r["rows"])}</td><td>{r["seconds"]:.2f}</td></tr>'
+        for r in results)
+    failed = sum(r["status"] != "ok" for r in results)
+    body = (f"<p>{len(results)} reports, {failed} failed.</p><table><tr><th>Report</th><th>Status</th>"
+            f"<th>Rows</th><th>Seconds</th></tr>{rows}</table>")
+    with open(os.path.join(out_dir, "index.html"), "w", encoding="utf-8") as sink:
+        sink.write(_PAGE.format(title="Visualizer reports", script="", body=body))
+    with open(os.path.join(out_dir, "index.json"), "w", encoding="utf-8") as sink:
+        json.dump(results, sink, indent=2)
+
+
+def run_reports(directory, spec, out_dir, workers=REPORT_WORKERS, on_result=None):
+    """
+    Render every report planned for `directory` (see plan_reports) into `out_dir` on `workers` processes
+    (in this process for 1) and write the index. `on_result(summary)` is called for each finished report, in
+    plan order. Returns the report summaries in plan order.
+    """
+    spec = load_spec(spec)
+    tasks = plan_reports(directory, spec)
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, PLOTLY_JS), "w", encoding="utf-8") as sink:
+        sink.write(plotly.offline.get_plotlyjs())
+    results = []
+    if workers <= 1:
+        for name, group in tasks:
+            results.append(render_report(directory, name, group, spec, out_dir))
+            if on_result is not None:
+                on_result(results[-1])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(render_report, directory, name, group, spec, out_dir) for name, group in tasks]
+            for future in futures:
+                results.append(future.result())
+                if on_result is not None:
+                    on_result(results[-1])
+    write_index(out_dir, results)
+    return results
@@ -0,0 +1,105 @@
+import pandas as pd
+
+from visualizer.utils.data_utils import epoch_unit
+
+# Chart types that can be drawn in time-series mode.
+RESAMPLED_CHART_TYPES = ["Line Chart", "Scatter Chart", "Area Chart"]
+# Bucket sizes offered in time-series mode (pandas offset aliases); "auto" picks one of AUTO_BUCKETS.
+RESAMPLE_BUCKETS = ["auto", "1s", "1min", "1h", "1D"]
+# Candidates for "auto", finest first: the finest that gives at most AUTO_MAX_BUCKETS buckets is used. A chosen
+# bucket that would give more than AUTO_MAX_BUCKETS (empty ones included) is coarsened the same way.
+AUTO_BUCKETS = ["1ms", "10ms", "100ms", "1s", "10s", "1min", "10min", "1h", "6h", "1D", "7D"]
+AUTO_MAX_BUCKETS = 2000
+RESAMPLE_AGGREGATIONS = ["mean", "min/max band", "p50", "p95", "p99", "count"]
+
+_QUANTILES = {"p50": 0.5, "p95": 0.95, "p99": 0.99}
+
+
+def band_columns(y_col):
+    """Names of the columns holding the per-bucket minimum and maximum for the "min/max band" aggregation."""
+    return f"{y_col} (min)", f"{y_col} (max)"
+
+
+def to_datetimes(series):
+    """
+    Return `series` as datetimes: datetime columns are kept, and numeric epoch timestamps are converted with
+    the unit detected from the whole column (see epoch_unit). Raises ValueError for other columns.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return pd.to_datetime(series, unit=epoch_unit(series))
+    raise ValueError(f"Column {series.name!r} holds neither datetimes nor epoch timestamps.")
+
+
+def auto_bucket(start, end, max_buckets=AUTO_MAX_BUCKETS):
+    """Return the finest of AUTO_BUCKETS that splits the span from `start` to `end` into at most `max_buckets`."""
+    span = end - start
+    for bucket in AUTO_BUCKETS:
+        if span / pd.Timedelta(bucket) <= max_buckets:
+            return bucket
+    return AUTO_BUCKETS[-1]
+
+
+def _resample_series(values, bucket, aggregation, y_col):
+    """Aggregate a float Series on a sorted DatetimeIndex into time buckets; returns a frame indexed by bucket."""
+    buckets = values.resample(bucket)
+    if aggregation == "count":
+        return buckets.count().to_frame(y_col)
+    if aggregation in _QUANTILES:
+        return buckets.quantile(_QUANTILES[aggregation]).to_frame(y_col)
+    if aggregation == "min/max band":
+        low, high = band_columns(y_col)
+        return pd.DataFrame({y_col: buckets.mean(), low: buckets.min(), high: buckets.max()})
+    return buckets.mean().to_frame(y_col)
+
+
+def resample_frame(df, x_col, y_col, bucket="auto", aggregation="mean", group_col=None, x_range=None):
+    """
+    Time-series mode: aggregate `y_col` into time buckets of the timestamps in `x_col`, separately per
+    `group_col` value if given (e.g. "File").
+    Each series is set on a sorted DatetimeIndex and resampled to `bucket` (one of RESAMPLE_BUCKETS; "auto"
+    picks the bucket from the time span, and a bucket that would give more than AUTO_MAX_BUCKETS is coarsened)
+    with `aggregation` (one of RESAMPLE_AGGREGATIONS). Empty buckets are kept, so gaps in the data stay visible. If `x_range` is a (low, high) tuple, rows outside it are dropped
+    first, so that zooming in resamples at a finer bucket.
+
+    Returns a frame with `x_col` (bucket start), `y_col` (the aggregate; the mean for "min/max band", which
+    adds the columns named by band_columns) and `group_col`, and the bucket used.
+    """
+    if x_range is not None:
+        # Bounds are in the column's own units (e.g. epoch numbers from the zoom slider).
+        df = df[df[x_col].between(*x_range)]
+    times = to_datetimes(df[x_col])
+    if aggregation == "count":
+        # Every row with a value counts, numeric or not.
+        values = df[y_col].notna().astype("float64").where(df[y_col].notna())
+    else:
+        values = pd.to_numeric(df[y_col], errors="coerce").astype("float64")
+    frame = pd.DataFrame({x_col: times.to_numpy(), y_col: values.to_numpy()})
+    if group_col is not None:
+        frame[group_col] = df[group_col].to_numpy()
+    frame = frame[frame[x_col].notna()]
+    if not len(frame):
+        bucket = AUTO_BUCKETS[-1] if bucket == "auto" else bucket
+    elif bucket == "auto" or (frame[x_col].max() - frame[x_col].min()) / pd.Timedelta(bucket) > AUTO_MAX_BUCKETS:
+        bucket = auto_bucket(frame[x_col].min(), frame[x_col].max())
+
+    groups = [(None, frame)] if group_col is None else frame.groupby(group_col, sort=False, observed=True)
+    parts = []
+    for name, part in groups:
+        series = pd.Series(part[y_col].to_numpy(), index=pd.DatetimeIndex(part[x_col]))
+        if not series.index.is_monotonic_increasing:
+            series = series.sort_index(kind="stable")
+        resampled = _resample_series(series, bucket, aggregation, y_col)
+        resampled.index.name = x_col
+        resampled = resampled.reset_index()
+        if group_col is not None:
+            resampled[group_col] = name
+        parts.append(resampled)
+    if not parts:
+        columns = [x_col, y_col] + (list(band_columns(y_col)) if aggregation == "min/max band" else [])
+        return pd.DataFrame(columns=columns + ([group_col] if group_col else [])), bucket
+    result = pd.concat(parts, ignore_index=True)
+    if group_col is not None:
+        result[group_col] = result[group_col].astype(df[group_col].dtype)
+    return result, bucket
@@ -0,0 +1,179 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from visualizer.utils import table_view
+
+# Kinds of rows the diff view can list.
+DIFF_KINDS = ["Modified", "Added", "Removed"]
+
+
+def _comparable(a, b):
+    """
+    Return the two columns with dtypes whose hashes agree for equal values. Hashes see the raw bytes, so numeric
+    columns of different types are widened first: integer pairs to int64 (e.g. a column compacted to int8 in one
+    file and int16 in the other, where -1 would otherwise hash as 255 and 65535), other numeric pairs to float64.
+    All string dtypes already hash alike.
+    """
+    numeric = [pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s) for s in (a, b)]
+    if not all(numeric) or a.dtype == b.dtype:
+        return a, b
+    if pd.api.types.is_integer_dtype(a) and pd.api.types.is_integer_dtype(b):
+        # Nullable integers keep their missing values as pd.NA; Int64 hashes like int64 for the others.
+        nullable = not (isinstance(a.dtype, np.dtype) and isinstance(b.dtype, np.dtype))
+        dtype = "Int64" if nullable else "int64"
+        return a.astype(dtype), b.astype(dtype)
+    return a.astype("float64"), b.astype("float64")
+
+
+# Odd multiplier used to combine per-column hashes into one hash per row.
+_HASH_MULTIPLIER = np.uint64(0x100000001B3)
+
+
+def _hash_series(series):
+    """Hash each value of `series`; nested values (dicts and lists of unflattened JSON) are hashed as text."""
+    try:
+        return pd.util.hash_pandas_object(series, index=False).to_numpy()
+    except TypeError:
+        return pd.util.hash_pandas_object(series.astype(str), index=False).to_numpy()
+
+
+def _hash_rows(df_a, df_b, columns, rows_a=None, rows_b=None):
+    """
+    Hash the values of `columns` of each row of both frames (or of the rows at positions `rows_a` / `rows_b`)
+    into one uint64 per row: each column is hashed in one vectorized pass and the hashes are combined.
+    """
+    hashes = [np.zeros(len(df_a) if rows_a is None else len(rows_a), dtype=np.uint64),
+              np.zeros(len(df_b) if rows_b is None else len(rows_b), dtype=np.uint64)]
+    for col in columns:
+        a, b = df_a[col], df_b[col]
+        if rows_a is not None:
+            a, b = a.iloc[rows_a], b.iloc[rows_b]
+        for i, series in enumerate(_comparable(a, b)):
+            hashes[i] = hashes[i] * _HASH_MULTIPLIER ^ _hash_series(series)
+    return hashes
+
+
+def _occurrence_hashes(hashes):
+    """
+    Make row hashes unique within a frame by mixing in how many times the hash has already occurred, so that
+    the n-th row with a key pairs with the n-th row with the same key in the other frame.
+    """
+    occurrence = pd.Series(hashes).groupby(hashes).cumcount().to_numpy()
+    return hashes * _HASH_MULTIPLIER ^ pd.util.hash_array(occurrence.astype(np.uint64))
+
+
+def _pair(hashes_a, hashes_b):
+    """
+    Return, for each row of the first frame, the position of the row of the second frame with the same hash
+    (-1 if none). Repeated hashes pair in order of occurrence.
+    """
+    index_b = pd.Index(hashes_b)
+    if index_b.is_unique:
+        match = index_b.get_indexer(hashes_a)
+        # Repeated hashes in the first frame only matter when they found a partner.
+        if not len(match) or np.bincount(match[match >= 0], minlength=1).max() <= 1:
+            return match
+    return pd.Index(_occurrence_hashes(hashes_b)).get_indexer(_occurrence_hashes(hashes_a))
+
+
+def diff_rows(df_a, df_b, keys=(), columns=None):
+    """
+    Row-level diff of `df_b` against `df_a`. Rows are paired by the hash of their `keys` columns (repeated keys
+    pair in order of occurrence); paired rows whose `columns` (default: the other columns both frames share)
+    hash differently are modified, and each of their columns is then compared on its own. Without keys, rows
+    are paired by the hash of all compared columns, so a changed row shows as one removed and one added row.
+    Everything runs on whole columns: no Python code runs per row.
+
+    Returns a dict with the row positions "removed" (in `df_a`) and "added" (in `df_b`), the positions
+    "modified_a" / "modified_b" of the modified pairs, "changes" (a boolean frame with one row per modified
+    pair and one column per compared column, True where the values differ), the number of "unchanged" pairs
+    and the compared "columns". Raises ValueError for key columns missing from either frame.
+    """
+    keys = list(keys)
+    missing = [key for key in keys if key not in df_a.columns or key not in df_b.columns]
+    if missing:
+        raise ValueError(f"Key columns missing from a file: {', '.join(map(str, missing))}")
+    if columns is None:
+        columns = [col for col in df_a.columns if col in df_b.columns and col not in keys]
+    columns = list(columns)
+
+    hashes_a, hashes_b = _hash_rows(df_a, df_b, keys or columns)
+    match = _pair(hashes_a, hashes_b)
+    paired_a = np.flatnonzero(match >= 0)
+    paired_b = match[paired_a]
+    in_a = np.zeros(len(df_b), dtype=bool)
+    in_a[paired_b] = True
+
+    modified = np.zeros(len(paired_a), dtype=bool)
+    if keys and columns and len(paired_a):
+        values_a, values_b = _hash_rows(df_a, df_b, columns, paired_a, paired_b)
+        modified = values_a != values_b
+    modified_a, modified_b = paired_a[modified], paired_b[modified]
+    changes = {}
+    for col in columns:
+        if len(modified_a):
+            values_a, values_b = _hash_rows(df_a, df_b, [col], modified_a, modified_b)
+            changes[col] = values_a != values_b
+        else:
+            changes[col] = np.zeros(0, dtype=bool)
+    return {
+        "removed": np.flatnonzero(match < 0),
+        "added": np.flatnonzero(~in_a),
+        "modified_a": modified_a,
+        "modified_b": modified_b,
+        "changes": pd.DataFrame(changes, columns=columns),
+        "unchanged": int(len(paired_a) - modified.sum()),
+        "columns": columns,
+    }
+
+
+def diff_page(df_a, df_b, diff, kind, keys, names, page, page_size):
+    """
+    Return page `page` (1-based) of the rows of one `kind` (see DIFF_KINDS). Added and removed rows are shown
+    as they are in their file; modified rows show the key columns, the names of the changed columns and, for
+    each column changed on the page, its value in both files (headers suffixed with the file `names`).
+    """
+    rows = slice((page - 1) * page_size, page * page_size)
+    shown = list(keys) + diff["columns"]
+    if kind == "Added":
+        return df_b[shown].iloc[diff["added"][rows]]
+    if kind == "Removed":
+        return df_a[shown].iloc[diff["removed"][rows]]
+    pos_a, pos_b = diff["modified_a"][rows], diff["modified_b"][rows]
+    changes = diff["changes"].iloc[rows]
+    page_df = pd.DataFrame({f"Row ({names[0]})": pos_a, f"Row ({names[1]})": pos_b})
+    for key in keys:
+        page_df[key] = df_a[key].iloc[pos_a].to_numpy()
+    labels = pd.Index([f"{col}, " for col in changes.columns], dtype=object)
+    page_df["Changed columns"] = changes.astype(object).dot(labels).str.removesuffix(", ") if len(changes) else []
+    for col in changes.columns[changes.any().to_numpy()]:
+        page_df[f"{col} ({names[0]})"] = df_a[col].iloc[pos_a].to_numpy()
+        page_df[f"{col} ({names[1]})"] = df_b[col].iloc[pos_b].to_numpy()
+    return page_df
+
+
+def render_diff(df_a, df_b, diff, keys, names, key):
+    """
+    Show the counts of a row diff (see diff_rows) of `df_b` (`names[1]`) against `df_a` (`names[0]`) and list
+    the added, removed or modified rows one page at a time. `key` prefixes the widget keys.
+    """
+    counts = {"Modified": len(diff["modified_a"]), "Added": len(diff["added"]), "Removed": len(diff["removed"])}
+    for column, (label, count) in zip(st.columns(4), list(counts.items()) + [("Unchanged", diff["unchanged"])]):
+        column.metric(label, f"{count:,}")
+    if not keys:
+        st.caption("No key columns selected: rows are matched on their whole content, so changed rows count as "
+                   "removed and added.")
+    kind_col, size_col = st.columns(2)
+    kind = kind_col.radio("Show", DIFF_KINDS, horizontal=True, key=f"{key}_kind")
+    page_size = size_col.selectbox("Rows per page", table_view.PAGE_SIZES,
+                                   index=table_view.PAGE_SIZES.index(table_view.DEFAULT_PAGE_SIZE),
+                                   key=f"{key}_page_size")
+    n_rows = counts[kind]
+    n_pages = max(1, -(-n_rows // page_size))
+    page = st.number_input(f"Page (of {n_pages:,})", min_value=1, max_value=n_pages, value=1, step=1,
+                           key=f"{key}_page")
+    page = min(page, n_pages)
+    st.dataframe(diff_page(df_a, df_b, diff, kind, keys, names, page, page_size))
+    first = min((page - 1) * page_size + 1, n_rows)
+    st.caption(f"{kind} rows {first:,}–{min(page * page_size, n_rows):,} of {n_rows:,}")
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+STATS_COLUMNS = ["Column", "MAPE (%)", "sMAPE (%)", "MAE", "RMSE", "Bias", "Max Error", "R²", "Correlation",
+                 "Count"]
+
+
+def common_numeric_columns(*dfs):
+    """Return the sorted numeric columns present in all the frames."""
+    numeric = [{col for col in df.columns if pd.api.types.is_numeric_dtype(df[col])} for df in dfs]
+    return sorted(set.intersection(*numeric), key=str) if numeric else []
+
+
+def numeric_matrix(df, columns):
+    """Return the given columns as a float64 2-D array; values that are not numeric become NaN."""
+    if not len(columns):
+        return np.empty((len(df), 0))
+    subset = df[columns]
+    if all(pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_extension_array_dtype(dtype)
+           for dtype in subset.dtypes):
+        return subset.to_numpy(dtype="float64")
+    return np.column_stack([
+        pd.to_numeric(subset[col], errors="coerce").to_numpy(dtype="float64", na_value=np.nan) for col in columns
+    ])
+
+
+def _first_valid(values):
+    """Return the first non-NaN value of each column (0 for all-NaN columns)."""
+    valid = ~np.isnan(values)
+    first = valid.argmax(axis=0)
+    picked = values[first, np.arange(values.shape[1])]
+    return np.where(valid.any(axis=0), picked, 0.0)
+
+
+def compare_arrays(actual, forecast):
+    """
+    Compute error metrics column-wise for two aligned 2-D arrays in one vectorized pass: the masked error
+    arrays are built once for all columns and reduced with NumPy. Rows where either value is NaN are ignored
+    per column.
+    Returns a dict mapping metric names to 1-D arrays (one value per column).
+    """
+    valid = ~(np.isnan(actual) | np.isnan(forecast))
+    # Zeroing the invalid cells lets every sum below run over the whole array.
+    a = np.where(valid, actual, 0.0)
+    f = np.where(valid, forecast, 0.0)
+    # Moments are taken around a per-column shift to avoid cancellation on large values such as timestamps.
+    sa = np.where(valid, actual - _first_valid(actual), 0.0)
+    sf = np.where(valid, forecast - _first_valid(forecast), 0.0)
+    counts = valid.sum(axis=0)
+    diff = f - a
+    abs_diff = np.abs(diff)
+    abs_a = np.abs(a)
+    denom = abs_a + np.abs(f)
+    nonzero = abs_a > 0
+    positive = denom > 0
+    ape = np.divide(abs_diff, abs_a, out=np.zeros_like(abs_diff), where=nonzero).sum(axis=0)
+    sape = np.divide(2 * abs_diff, denom, out=np.zeros_like(abs_diff), where=positive).sum(axis=0)
+    sq_diff = np.einsum("ij,ij->j", diff, diff)
+    sum_a, sum_f = sa.sum(axis=0), sf.sum(axis=0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        n = np.where(counts > 0, counts, np.nan)
+        ss_a = np.einsum("ij,ij->j", sa, sa) - sum_a ** 2 / n
+        ss_f = np.einsum("ij,ij->j", sf, sf) - sum_f ** 2 / n
+        cov = np.einsum("ij,ij->j", sa, sf) - sum_a * sum_f / n
+        ape_count, sape_count = nonzero.sum(axis=0), positive.sum(axis=0)
+        return {
+            "MAPE (%)": ape / np.where(ape_count > 0, ape_count, np.nan) * 100,
+            "sMAPE (%)": sape / np.where(sape_count > 0, sape_count, np.nan) * 100,
+            "MAE": abs_diff.sum(axis=0) / n,
+            "RMSE": np.sqrt(sq_diff / n),
+            "Bias": diff.sum(axis=0) / n,
+            "Max Error": np.where(counts > 0, abs_diff.max(axis=0, initial=0.0), np.nan),
+            "R²": np.where(ss_a > 0, 1 - sq_diff / ss_a, np.nan),
+            "Correlation": np.where((ss_a > 0) & (ss_f > 0), cov / np.sqrt(ss_a * ss_f), np.nan),
+            "Count": counts,
+        }
+
+
+def comparison_stats(df1, df2, columns):
+    """
+    Compare the given columns of File 1 (actual) and File 2 (forecast), pairing rows by index.
+    Returns a DataFrame with one row per column that has overlapping numeric data and the metrics in
+    STATS_COLUMNS (MAPE, sMAPE, MAE, RMSE, Bias = mean(File 2 - File 1), Max Error, R², Correlation, Count).
+    """
+    columns = [col for col in columns if col in df1.columns and col in df2.columns]
+    left, right = df1[columns], df2[columns]
+    if not left.index.equals(right.index):
+        index = left.index.intersection(right.index)
+        left, right = left.loc[index], right.loc[index]
+    metrics = compare_arrays(numeric_matrix(left, columns), numeric_matrix(right, columns))
+    stats_df = pd.DataFrame({"Column": columns, **metrics}, columns=STATS_COLUMNS)
+    return stats_df[stats_df["Count"] > 0].reset_index(drop=True)
@@ -0,0 +1,85 @@
+import numpy as np
+import streamlit as st
+
+from visualizer.utils import diagnostics
+from visualizer.utils.data_utils import FILTER_OPERATORS, filter_mask
+
+PAGE_SIZES = [25, 100, 500, 1000]
+DEFAULT_PAGE_SIZE = 100
+
+
+def view_positions(df, sort_by=None, ascending=True, filter_col=None, operator="contains", value=""):
+    """
+    Return the row positions of `df` to display, after the optional filter and sort, or None for all rows in
+    their original order. Missing values sort last.
+    """
+    positions = None
+    if filter_col is not None and value != "":
+        positions = np.flatnonzero(filter_mask(df[filter_col], operator, value))
+    if sort_by is not None:
+        column = df[sort_by].reset_index(drop=True)
+        if positions is not None:
+            column = column.iloc[positions]
+        # After the reset, index labels are row positions.
+        positions = column.sort_values(ascending=ascending, kind="stable", na_position="last").index.to_numpy()
+    return positions
+
+
+def page_slice(df, positions, columns, page, page_size):
+    """Return the rows of page `page` (1-based) of the view, restricted to `columns`."""
+    start = (page - 1) * page_size
+    rows = slice(start, start + page_size) if positions is None else positions[start:start + page_size]
+    return df[list(columns)].iloc[rows]
+
+
+@st.cache_resource(max_entries=16)
+def _cached_positions(frame_key, sort_by, ascending, filter_col, operator, value, _df):
+    """Sort/filter stage, cached per frame and view settings so that paging does not redo the work."""
+    return view_positions(_df, sort_by, ascending, filter_col, operator, value)
+
+
+def render_table(df, key, frame_key=None):
+    """
+    Display `df` one page at a time. Only the current page, restricted to the selected columns, is sent to the
+    browser; sorting and filtering run on the server. `key` prefixes the widget keys, and `frame_key` (the
+    pipeline key of `df`) enables caching of the sorted/filtered row order across reruns.
+    """
+    columns = list(df.columns)
+    with st.expander("Table options"):
+        shown = st.multiselect("Columns", columns, default=columns, key=f"{key}_cols") or columns
+        sort_col, sort_dir = st.columns(2)
+        sort_by = sort_col.selectbox("Sort by", ["(none)"] + columns, key=f"{key}_sort")
+        ascending = sort_dir.radio("Order", ["Ascending", "Descending"], horizontal=True,
+                                   key=f"{key}_order") == "Ascending"
+        filter_col, filter_op, filter_value = st.columns(3)
+        filter_by = filter_col.selectbox("Filter column", ["(none)"] + columns, key=f"{key}_filter_col")
+        operator = filter_op.selectbox("Operator", FILTER_OPERATORS, key=f"{key}_filter_op")
+        value = filter_value.text_input("Value", key=f"{key}_filter_value")
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE),
+                                 key=f"{key}_page_size")
+
+    sort_by = None if sort_by == "(none)" else sort_by
+    filter_by = None if filter_by == "(none)" else filter_by
+    try:
+        if frame_key is None:
+            positions = view_positions(df, sort_by, ascending, filter_by, operator, value)
+        else:
+            positions = _cached_positions(frame_key, sort_by, ascending, filter_by, operator, value, df)
+    except ValueError as e:
+        st.error(f"Invalid filter: {e}")
+        positions = None
+
+    n_rows = len(df) if positions is None else len(positions)
+    n_pages = max(1, -(-n_rows // page_size))
+    page = st.number_input(f"Page (of {n_pages:,})", min_value=1, max_value=n_pages, value=1, step=1,
+                           key=f"{key}_page")
+    page = min(page, n_pages)
+    page_df = page_slice(df, positions, shown, page, page_size)
+    with diagnostics.span("Render table", rows=len(page_df)):
+        st.dataframe(page_df)
+    first = min((page - 1) * page_size + 1, n_rows)
+    last = min(page * page_size, n_rows)
+    summary = f"Rows {first:,}–{last:,} of {n_rows:,}"
+    if n_rows != len(df):
+        summary += f" (filtered from {len(df):,})"
+    st.caption(f"{summary} · {len(shown)} of {len(columns)} columns")
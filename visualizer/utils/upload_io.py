@@ -0,0 +1,120 @@
+import codecs
+import contextlib
+import io
+import mmap
+import os
+import tempfile
+
+# Streams without a buffer of their own are spooled in memory up to this size, and to a memory-mapped
+# temporary file beyond it.
+SPOOL_THRESHOLD_BYTES = int(float(os.environ.get("VISUALIZER_SPOOL_MB", "64")) * 1024 * 1024)
+# Size of the reads used to spool streams and to feed parsers from a buffer.
+READ_CHUNK_BYTES = 1024 * 1024
+
+
+class BufferReader(io.RawIOBase):
+    """A read-only, seekable binary file over a bytes-like buffer; reads copy only the requested bytes."""
+
+    def __init__(self, buf):
+        self._view = memoryview(buf).cast("B")
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = min(len(b), len(self._view) - self._pos)
+        if n <= 0:
+            return 0
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+
+def open_buffer(buf):
+    """Return a buffered binary file reading from `buf` (bytes, memoryview or mmap) without copying it."""
+    return io.BufferedReader(BufferReader(buf), buffer_size=READ_CHUNK_BYTES)
+
+
+def spool_stream(stream, threshold=SPOOL_THRESHOLD_BYTES):
+    """
+    Read a binary or text stream chunk by chunk into a bytes-like buffer. Text is encoded to UTF-8
+    incrementally. Content up to `threshold` bytes is returned as bytes; larger content is written to an
+    anonymous temporary file and returned as a read-only memory map, so it never sits on the Python heap.
+    """
+    encoder = codecs.getincrementalencoder("utf-8")()
+    chunks, size = [], 0
+    spool = None
+    # The spool is closed on the way out, also if reading the stream fails.
+    with contextlib.ExitStack() as stack:
+        while True:
+            chunk = stream.read(READ_CHUNK_BYTES)
+            if isinstance(chunk, str):
+                chunk = encoder.encode(chunk, final=not chunk)
+            if not chunk:
+                break
+            if spool is None and size + len(chunk) > threshold:
+                spool = stack.enter_context(tempfile.TemporaryFile())
+                spool.writelines(chunks)
+                chunks = []
+            if spool is None:
+                chunks.append(chunk)
+            else:
+                spool.write(chunk)
+            size += len(chunk)
+        if spool is None:
+            return b"".join(chunks)
+        spool.flush()
+        # The mapping stays valid after the (already unlinked) file is closed.
+        return mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def upload_buffer(uploaded_file):
+    """
+    Return the upload's content as a bytes-like buffer without copying it: Streamlit uploads expose their
+    in-memory buffer directly, and other streams are spooled (see spool_stream).
+    """
+    if hasattr(uploaded_file, "getbuffer"):
+        return uploaded_file.getbuffer()
+    if hasattr(uploaded_file, "seek"):
+        uploaded_file.seek(0)
+    return spool_stream(uploaded_file)
+
+
+class FileUpload:
+    """
+    A file on disk presented like an upload (name, size, file id and getbuffer()), so that the parsers read it
+    from a read-only memory map, as they read Streamlit uploads from memory.
+    """
+
+    def __init__(self, path):
+        stat = os.stat(path)
+        self.path = path
+        self.name = os.path.basename(path)
+        self.size = stat.st_size
+        # Lets the parse cache hash the content only once per version of the file.
+        self.file_id = f"{os.path.abspath(path)}:{stat.st_mtime_ns}"
+        self._buffer = None
+
+    def getbuffer(self):
+        if self._buffer is None:
+            if not self.size:
+                self._buffer = b""
+            else:
+                with open(self.path, "rb") as source:
+                    self._buffer = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._buffer